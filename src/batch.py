@@ -0,0 +1,153 @@
+"""
+Running layouts headlessly (no tkinter), many at a time on a process pool
+
+Every layout file is evolved for --generations generations (or until it is empty, a still life or a cycle
+with --until-stasis) and a JSON line per layout is written: final population, bounding box,
+generations/sec and wall time. Directories are searched for layout files recursively
+
+ python batch.py layouts/ --generations 1000 --until-stasis
+ python batch.py layouts/methuselahs/diehard.csv huge.rle --engine dense --generations 10000 -o results.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engines import ENGINES, make_engine, run_until_cycle
+from patterns import READERS, read_pattern
+
+SNAPSHOT_EXTENSION = ".snap"
+
+
+def find_layouts(paths):
+    """Layout files in the given files and directories (searched recursively), sorted within directories"""
+    extensions = set(READERS) | {SNAPSHOT_EXTENSION}
+
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories.sort()
+            for filename in sorted(filenames):
+                if filename.lower().startswith("readme"):  # README.txt isn't a Plaintext pattern
+                    continue
+                if os.path.splitext(filename)[1].lower() in extensions:
+                    yield os.path.join(directory, filename)
+
+
+def load_engine(filename, engine_name, wrap, rule=None):
+    """rule overrides the layout's own rule (which is Life if it doesn't have one)"""
+    if filename.lower().endswith(SNAPSHOT_EXTENSION):
+        from snapshot import load_snapshot  # needs NumPy, only imported when there are snapshots
+
+        engine = make_engine(engine_name, wrap=wrap)
+        load_snapshot(filename, engine)
+        if rule is not None:
+            engine.rule = rule
+        return engine
+
+    rows, columns, cells, layout_rule = read_pattern(filename)
+    engine = make_engine(engine_name, rows=rows, columns=columns, wrap=wrap,
+                         rule=rule if rule is not None else layout_rule)
+    engine.load(cells)
+    return engine
+
+
+def run_layout(filename, engine_name="sparse", generations=1000, until_stasis=False, max_period=1024, wrap=False,
+               rule=None):
+    """Evolves one layout file, returns a dict of results (or of the error, if it couldn't be run)"""
+    start = time.perf_counter()
+    result = {"file": filename, "engine": engine_name}
+
+    try:
+        engine = load_engine(filename, engine_name, wrap, rule)
+        result["rule"] = str(engine.rule)
+        start_generation = engine.generation
+
+        evolve_start = time.perf_counter()
+        if until_stasis:
+            cycle = run_until_cycle(engine, generations, max_period)
+            result["stasis"] = str(cycle) if cycle else None
+        else:
+            engine.step(generations)
+        evolve_seconds = time.perf_counter() - evolve_start
+
+        evolved = engine.generation - start_generation
+        result.update({
+            "rows": engine.rows,
+            "columns": engine.columns,
+            "generation": engine.generation,
+            "population": engine.population,
+            "bounding_box": engine.bounding_box(),
+            "gens_per_sec": round(evolved / evolve_seconds, 2) if evolve_seconds > 0 else None,
+        })
+        if engine_name == "adaptive":  # which representations it went through, and when
+            result["switches"] = engine.switches
+    except (ValueError, IndexError, OSError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def run_batch(filenames, workers=None, **options):
+    """Yields results in the order of filenames, as soon as they are ready"""
+    if workers == 1:  # no pool, easier to debug and profile
+        for filename in filenames:
+            yield run_layout(filename, **options)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_layout, filename, **options) for filename in filenames]
+        for future in futures:
+            yield future.result()
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Run Game of Life layouts headlessly, results as JSON lines")
+
+    parser.add_argument("paths", nargs="+", help="layout files (csv, rle, mc, cells, txt, snap) or directories of them")
+    # the striped engine starts processes of its own, which pool workers can't do
+    parser.add_argument("--engine", choices=[name for name in ENGINES if name != "striped"], default="sparse",
+                        help="simulation engine (default: sparse)")
+    parser.add_argument("--generations", type=int, default=1000,
+                        help="generations to evolve (the most, with --until-stasis) (default: 1000)")
+    parser.add_argument("--until-stasis", action="store_true",
+                        help="stop early when the board is empty, a still life or a cycle")
+    parser.add_argument("--max-period", type=int, default=1024, help="longest cycle looked for (default: 1024)")
+    parser.add_argument("--wrap", action="store_true", help="boards loop around their edges")
+    parser.add_argument("--rule", help="Life-like rule for every layout, e.g. B36/S23 (default: the layout's own or B3/S23)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: cpu count)")
+    parser.add_argument("-o", "--output", help="file to write the JSON lines to (default: stdout)")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    filenames = list(find_layouts(args.paths))
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    failed = 0
+    try:
+        for result in run_batch(filenames, workers=args.workers, engine_name=args.engine,
+                                generations=args.generations, until_stasis=args.until_stasis,
+                                max_period=args.max_period, wrap=args.wrap, rule=args.rule):
+            failed += "error" in result
+            output.write(json.dumps(result) + "\n")
+            output.flush()  # results show up as they come, even from overnight runs
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
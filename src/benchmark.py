@@ -0,0 +1,427 @@
+"""
+Benchmarks of engines and renderers on fixed workloads, stored as JSON baselines to compare against
+
+Workloads: the bundled layouts, random soups of several densities and board sizes from 100x100 to 8192x8192
+(pure Python engines only up to the sizes they can do in reasonable time). Every workload runs in a process
+of its own and peak memory (RSS) is how much it grew over the workload, the striped engine's workers included. Reported: generations/sec, cells updated/sec (board area
+x generations/sec), peak RSS and per-generation latency percentiles (p50, p90, p99, max).
+Every workload is repeated on a fresh board (--repeats times, and until --min-seconds were measured) and the
+median run is reported; compare ignores changes smaller than NOISE_FLOOR before applying the threshold
+
+ python benchmark.py run --quick -o baseline.json          # a few minutes, or without --quick: overnight
+ python benchmark.py run --quick --compare baseline.json   # exit code 1 if anything got slower than --threshold
+ python benchmark.py compare baseline.json current.json
+ python benchmark.py scaling --size 4096                    # striped engine: gens/sec by worker count
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import sys
+import time
+from collections import namedtuple
+
+from engines import ENGINES, make_engine
+from patterns import read_pattern
+from batch import find_layouts
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+LAYOUTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts")
+
+SIZES = [100, 512, 2048, 8192]
+QUICK_SIZES = [100, 512]
+DENSITIES = [0.1, 0.35, 0.5]
+QUICK_DENSITIES = [0.35]
+
+# biggest soup for engines that loop over cells in Python (a 35% soup of 1024x1024 is ~370k cells)
+MAX_SOUP_SIZE = {"sparse": 1024, "tiled": 1024, "hashlife": 512}
+RENDERER_MAX_SIZE = {"pool": 100}
+
+LAYOUT_GENERATIONS = 200
+CANVAS_SIZE = 800
+COLORS = {"canvas_bg": "#545454", "gridline": "#707070", "cell_fill": "#EFEA5A", "cell_outline": "#858585"}
+
+# what counts as a regression in compare: higher is better for rates, lower is better for the rest
+METRICS = {"gens_per_sec": "higher", "p99_ms": "lower", "peak_rss_mb": "lower"}
+
+# changes smaller than these are timer and allocator noise, whatever they are relative to the baseline
+# (gens_per_sec by the time of a generation it adds or saves)
+NOISE_FLOOR = {"gens_per_sec": 0.05, "p99_ms": 0.5, "peak_rss_mb": 5.0}  # ms, ms, MB
+
+REPEATS = 5
+MIN_SECONDS = 0.5  # measured in total, quick workloads are repeated more often than REPEATS
+LONG_SECONDS = 10  # measured in total, slow workloads stop repeating (they're steady enough)
+MAX_REPEATS = 100
+
+
+class Workload(namedtuple("Workload", ["kind", "target", "pattern", "size", "density", "generations"])):
+    """kind is "engine" or "renderer", target is its name, pattern is "soup" or a layout file"""
+
+    @property
+    def id(self):
+        if self.pattern == "soup":
+            return f"{self.kind}:{self.target}/soup/{self.size}/{self.density}"
+        return f"{self.kind}:{self.target}/{self.pattern}"
+
+
+def soup_generations(size):
+    """Fewer generations for bigger boards, so every soup takes roughly as long (at least 3)"""
+    return max(3, min(200, int(2e7 / size ** 2)))
+
+
+def workloads(engines, renderers, sizes, densities):
+    layouts = [os.path.relpath(filename, LAYOUTS_FOLDER) for filename in find_layouts([LAYOUTS_FOLDER])]
+
+    for engine in engines:
+        for layout in layouts:
+            yield Workload("engine", engine, layout, None, None, LAYOUT_GENERATIONS)
+        for size in sizes:
+            if size > MAX_SOUP_SIZE.get(engine, size):
+                continue
+            for density in densities:
+                yield Workload("engine", engine, "soup", size, density, soup_generations(size))
+
+    for renderer in renderers:
+        for size in sizes:
+            if size > RENDERER_MAX_SIZE.get(renderer, size):
+                continue
+            yield Workload("renderer", renderer, "soup", size, 0.35, min(soup_generations(size), 50))
+
+
+## Running
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile, q in 0..100"""
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb(children=False):
+    """Peak RSS of this process, or of its largest child process that has been waited for"""
+    if not children:
+        # ru_maxrss is kept over fork and exec on Linux (a new process starts with its parent's peak),
+        # VmHWM is this process's own
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 2**10
+        except OSError:
+            pass
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def rss_increase_mb(start):
+    """How much the peak RSS grew since start (MB), worker processes (striped engine) included"""
+    if start is None:
+        return None
+
+    increase = peak_rss_mb() - start
+    children = peak_rss_mb(children=True)
+    if children:  # workers are forked from this process, so they start at about its size too
+        increase += max(0.0, children - start)
+    return round(increase, 1)
+
+
+def make_board(workload, engine_name):
+    if workload.pattern != "soup":
+        rows, columns, cells, rule = read_pattern(os.path.join(LAYOUTS_FOLDER, workload.pattern))
+        engine = make_engine(engine_name, rows=rows, columns=columns, rule=rule)
+        engine.load(cells)
+        return engine
+
+    size = workload.size
+    engine = make_engine(engine_name, rows=size, columns=size)
+    if np is not None:
+        soup = (np.random.default_rng(0).random((size, size)) < workload.density).astype(np.uint8)
+        if hasattr(engine, "load_array"):
+            engine.load_array(soup)
+        else:
+            xs, ys = np.nonzero(soup)
+            engine.load(zip(xs.tolist(), ys.tolist()))
+    else:
+        rng = random.Random(0)
+        engine.load([(x, y) for x in range(size) for y in range(size) if rng.random() < workload.density])
+    return engine
+
+
+def time_engine(workload):
+    engine = make_board(workload, workload.target)
+    engine.step()  # warm up (caches, first allocations)
+
+    latencies = []
+    for _ in range(workload.generations):
+        start = time.perf_counter()
+        engine.step()
+        latencies.append(time.perf_counter() - start)
+
+    if hasattr(engine, "close"):
+        engine.close()
+    return latencies, engine.rows * engine.columns
+
+
+def time_renderer(workload):
+    import tkinter as tk
+    from renderers import RENDERERS
+
+    root = tk.Tk()
+    root.withdraw()
+    canvas = tk.Canvas(root, width=CANVAS_SIZE, height=CANVAS_SIZE)
+    renderer = RENDERERS[workload.target](canvas, CANVAS_SIZE, CANVAS_SIZE, COLORS)
+    renderer.resize(workload.size, workload.size)
+
+    engine = make_board(workload, "dense" if "dense" in ENGINES else "sparse")
+    renderer.sync(engine)
+    root.update_idletasks()
+
+    # only drawing is timed, evolving the board in between isn't
+    latencies = []
+    for _ in range(workload.generations):
+        if renderer.prefers_deltas:
+            delta = engine.step_delta()
+            start = time.perf_counter()
+            renderer.update(delta.births, delta.deaths)
+        else:
+            engine.step()
+            start = time.perf_counter()
+            renderer.sync(engine)
+        root.update_idletasks()
+        latencies.append(time.perf_counter() - start)
+
+    root.destroy()
+    return latencies, engine.rows * engine.columns
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def run_workload(workload, repeats=REPEATS, min_seconds=MIN_SECONDS):
+    """
+    Times a workload in this process, returns a dict of results: the median of repeated runs, at least repeats
+    of them and min_seconds measured (fewer if a run is slow, see LONG_SECONDS)
+    """
+    time_workload = time_engine if workload.kind == "engine" else time_renderer
+    start_rss = peak_rss_mb()
+
+    runs = []
+    measured = 0.0
+    while len(runs) < MAX_REPEATS and measured < LONG_SECONDS:
+        latencies, area = time_workload(workload)
+        latencies.sort()
+        runs.append(latencies)
+        measured += sum(latencies)
+        if len(runs) >= repeats and measured >= min_seconds:
+            break
+
+    def typical(statistic):
+        return median(statistic(latencies) for latencies in runs)
+
+    seconds = typical(sum)
+    gens_per_sec = workload.generations / seconds if seconds > 0 else None
+    return {
+        "id": workload.id,
+        **workload._asdict(),
+        "repeats": len(runs),
+        "seconds": round(seconds, 4),
+        "gens_per_sec": round(gens_per_sec, 2) if gens_per_sec else None,
+        "cells_per_sec": round(area * gens_per_sec) if gens_per_sec else None,
+        "p50_ms": round(typical(lambda latencies: percentile(latencies, 50)) * 1000, 3),
+        "p90_ms": round(typical(lambda latencies: percentile(latencies, 90)) * 1000, 3),
+        "p99_ms": round(typical(lambda latencies: percentile(latencies, 99)) * 1000, 3),
+        "max_ms": round(typical(lambda latencies: latencies[-1]) * 1000, 3),
+        "peak_rss_mb": rss_increase_mb(start_rss),
+    }
+
+
+def _child(workload, connection, options):
+    try:
+        connection.send(run_workload(workload, **options))
+    except Exception as e:  # reported as a result, one failing workload doesn't stop the rest
+        connection.send({"id": workload.id, **workload._asdict(), "error": f"{type(e).__name__}: {e}"})
+    connection.close()
+
+
+def run_isolated(workload, **options):
+    """Runs a workload in a new process (not a pool: the striped engine starts processes of its own)"""
+    parent_end, child_end = mp.Pipe(duplex=False)
+    process = mp.Process(target=_child, args=(workload, child_end, options))
+    process.start()
+    child_end.close()
+
+    try:
+        result = parent_end.recv()
+    except EOFError:  # crashed, e.g. out of memory
+        result = {"id": workload.id, **workload._asdict(), "error": f"exit code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__ if np is not None else None,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def run_benchmarks(workload_list, log=sys.stderr, **options):
+    """options are passed on to run_workload (repeats, min_seconds)"""
+    results = []
+    for i, workload in enumerate(workload_list, start=1):
+        result = run_isolated(workload, **options)
+        results.append(result)
+
+        if "error" in result:
+            print(f"[{i}/{len(workload_list)}] {workload.id}: {result['error']}", file=log)
+        else:
+            print(f"[{i}/{len(workload_list)}] {workload.id}: {result['gens_per_sec']} gen/s, "
+                  f"p99 {result['p99_ms']} ms, {result['peak_rss_mb']} MB", file=log)
+
+    return {"machine": machine_info(), "results": results}
+
+
+## Comparing
+
+def below_noise_floor(metric, old, new, noise_floor=NOISE_FLOOR):
+    floor = noise_floor.get(metric, 0.0)
+    if metric == "gens_per_sec":  # as milliseconds per generation
+        return abs(1000 / new - 1000 / old) < floor if new else False
+    return abs(new - old) < floor
+
+
+def compare(baseline, current, threshold=0.1, noise_floor=NOISE_FLOOR):
+    """
+    Rows of (id, metric, baseline value, current value, relative change, regression?) for workloads in both.
+    A regression is a change for the worse by more than threshold (0.1 == 10%) and more than the metric's
+    noise floor
+    """
+    baseline_results = {result["id"]: result for result in baseline["results"] if "error" not in result}
+
+    rows = []
+    for result in current["results"]:
+        before = baseline_results.get(result["id"])
+        if before is None or "error" in result:
+            continue
+
+        for metric, better in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            worse = -change if better == "higher" else change
+            regression = worse > threshold and not below_noise_floor(metric, old, new, noise_floor)
+            rows.append((result["id"], metric, old, new, change, regression))
+
+    return rows
+
+
+def print_comparison(rows, file=sys.stdout, only_regressions=False):
+    print(f"{'workload':<60} {'metric':<13} {'baseline':>10} {'current':>10} {'change':>8}", file=file)
+    for (id, metric, old, new, change, regression) in rows:
+        if only_regressions and not regression:
+            continue
+        flag = "  REGRESSION" if regression else ""
+        print(f"{id:<60} {metric:<13} {old:>10} {new:>10} {change:>+8.1%}{flag}", file=file)
+
+
+def load_json(filename):
+    with open(filename) as file:
+        return json.load(file)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Game of Life engine and renderer benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="run benchmarks")
+    run.add_argument("--quick", action="store_true", help=f"sizes {QUICK_SIZES} and density {QUICK_DENSITIES} only")
+    run.add_argument("--engines", nargs="*", choices=list(ENGINES), default=list(ENGINES))
+    run.add_argument("--renderers", nargs="*", default=[],
+                     help="renderers to benchmark too (pool, raster), they need a display")
+    run.add_argument("--sizes", type=int, nargs="*", help=f"soup board sizes (default: {SIZES})")
+    run.add_argument("-o", "--output", help="file to store the results in (a baseline)")
+    run.add_argument("--compare", metavar="BASELINE", help="compare results to a baseline file")
+    run.add_argument("--threshold", type=float, default=0.1, help="regression threshold (default: 0.1 == 10%%)")
+    run.add_argument("--repeats", type=int, default=REPEATS,
+                     help=f"runs of every workload, the median is reported (default: {REPEATS})")
+    run.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                     help=f"quick workloads are repeated until this much was measured (default: {MIN_SECONDS})")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="regression threshold (default: 0.1 == 10%%)")
+    compare_parser.add_argument("--regressions", action="store_true", help="show regressions only")
+
+    scaling = subparsers.add_parser("scaling", help="striped engine scaling report (needs NumPy)")
+    scaling.add_argument("--size", type=int, default=4096, help="board is size x size (default: 4096)")
+    scaling.add_argument("--generations", type=int, default=20)
+    scaling.add_argument("--workers", type=int, nargs="*",
+                         help="worker counts to try (default: powers of 2 up to cpu count)")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    if args.command == "compare":
+        rows = compare(load_json(args.baseline), load_json(args.current), args.threshold)
+        print_comparison(rows, only_regressions=args.regressions)
+        return 1 if any(row[-1] for row in rows) else 0
+
+    if args.command == "scaling":
+        from engines.striped import scaling_report
+
+        print(f"{'workers':>8} {'seconds':>10} {'gens/sec':>10} {'speedup':>8} {'efficiency':>10}")
+        for row in scaling_report(args.size, args.generations, args.workers):
+            print(f"{row['workers']:>8} {row['seconds']:>10} {row['gens_per_sec']:>10} {row['speedup']:>8} "
+                  f"{row['efficiency']:>10}")
+        return 0
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    densities = QUICK_DENSITIES if args.quick else DENSITIES
+    report = run_benchmarks(list(workloads(args.engines, args.renderers, sizes, densities)),
+                            repeats=args.repeats, min_seconds=args.min_seconds)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.compare:
+        rows = compare(load_json(args.compare), report, args.threshold)
+        print_comparison(rows, file=sys.stderr, only_regressions=True)
+        return 1 if any(row[-1] for row in rows) else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Pattern browser: a searchable list of every pattern in the layouts folder, with a thumbnail and what it is
+
+Opens straight from the catalog's index (catalog.py), nothing is read or evolved before it shows.
+The folder is then rescanned from tkinter's main loop a few milliseconds per frame, only new and changed
+files are analysed (on a process pool, the window only takes in the results), and the list is refreshed
+when that's done
+
+ browser = PatternBrowser(root, "layouts", on_load=lambda filename: ...)
+"""
+
+import multiprocessing as mp
+import tkinter as tk
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from catalog import Catalog, describe, thumbnail_cells
+
+THUMBNAIL_PIXELS = 160
+RESCAN_BUDGET = 0.02  # seconds of rescanning per frame
+
+
+class PatternBrowser(tk.Toplevel):
+    def __init__(self, master, folder, on_load, colors=None, on_other_file=None):
+        super().__init__(master)
+        self.title("Patterns")
+        self.on_load = on_load  # called with the filename of the pattern to load
+        self.on_other_file = on_other_file  # file dialog for files that aren't in the folder
+        self.colors = colors or {"canvas_bg": "#545454", "cell_fill": "#EFEA5A"}
+
+        self.catalog = Catalog(folder)
+        self.results = []
+        # workers are only started once there's something to analyse, spawned: a fork would share the window's
+        # connection to the display
+        self._executor = ProcessPoolExecutor(mp_context=mp.get_context("spawn"))
+        self._rescan = self.catalog.rescan(self._executor)
+        self._search_after_id = None
+
+        ## Search box: every word has to match (path, rule, kind like "oscillator", period like "p2")
+        self.query = tk.StringVar(self)
+        self.search_box = tk.Entry(self, textvariable=self.query)
+        self.search_box.grid(column=0, row=0, columnspan=2, sticky="EW", padx=10, pady=10)
+        # typing only searches once it stops for a moment, not on every key
+        self.query.trace_add("write", lambda *_: self.search_later())
+
+        ## List of matches and a thumbnail of the selected one
+        self.listbox = tk.Listbox(self, width=50, height=20, exportselection=0, activestyle="none")
+        self.listbox.grid(column=0, row=1, sticky="NEWS", padx=(10, 0))
+        scrollbar = tk.Scrollbar(self, command=self.listbox.yview)
+        scrollbar.grid(column=1, row=1, sticky="NS", padx=(0, 10))
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        self.listbox.bind("<<ListboxSelect>>", lambda _: self.show_selected())
+        self.listbox.bind("<Double-Button-1>", lambda _: self.load_selected())
+
+        self.thumbnail = tk.Canvas(self, width=THUMBNAIL_PIXELS, height=THUMBNAIL_PIXELS,
+                                   bg=self.colors.get("canvas_bg"), highlightthickness=0)
+        self.thumbnail.grid(column=2, row=1, sticky="N", padx=10)
+
+        self.info_label = tk.Label(self, text="", wraplength=THUMBNAIL_PIXELS, justify="left")
+        self.info_label.grid(column=2, row=1, sticky="S", padx=10)
+
+        ## Buttons and scan progress
+        buttons = tk.Frame(self)
+        buttons.grid(column=0, row=2, columnspan=3, sticky="EW", padx=10, pady=10)
+        tk.Button(buttons, text="Load (Enter)", command=self.load_selected).pack(side="left")
+        if on_other_file is not None:
+            tk.Button(buttons, text="Other file...", command=self.other_file).pack(side="left", padx=10)
+        self.status_label = tk.Label(buttons, text="")
+        self.status_label.pack(side="right")
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        self.bind("<Return>", lambda _: self.load_selected())
+        self.bind("<Escape>", lambda _: self.destroy())
+        # arrow keys move through the list while typing in the search box
+        self.search_box.bind("<Down>", lambda _: self.move_selection(1))
+        self.search_box.bind("<Up>", lambda _: self.move_selection(-1))
+
+        self.search()
+        self.search_box.focus_set()
+        self.after(1, self.rescan_step)
+
+    ## Searching
+
+    def search_later(self):
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(150, self.search)
+
+    def search(self):
+        self._search_after_id = None
+        selected = self.selected()
+        self.results = self.catalog.search(self.query.get())
+        paths = [path for path, _ in self.results]
+
+        self.listbox.delete(0, tk.END)
+        if paths:
+            self.listbox.insert(tk.END, *paths)  # one call, not one per pattern
+            # the same pattern stays selected if it's still there
+            index = paths.index(selected[0]) if selected is not None and selected[0] in paths else 0
+            self.listbox.selection_set(index)
+            self.listbox.see(index)
+        self.show_selected()
+
+    def move_selection(self, step):
+        if not self.results:
+            return
+        selection = self.listbox.curselection()
+        index = min(max((selection[0] if selection else -1) + step, 0), len(self.results) - 1)
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        self.show_selected()
+
+    def selected(self):
+        selection = self.listbox.curselection()
+        return self.results[selection[0]] if selection else None
+
+    ## Thumbnail and info
+
+    def show_selected(self):
+        self.thumbnail.delete("all")
+        selected = self.selected()
+        if selected is None:
+            self.info_label["text"] = "No patterns found" if not self.results else ""
+            return
+
+        path, entry = selected
+        self.info_label["text"] = describe(entry)
+
+        thumbnail = entry.get("thumbnail")
+        if not thumbnail:
+            return
+        # thumbnail cells as squares, centered (x across, y down, like on the board)
+        cell = THUMBNAIL_PIXELS // max(thumbnail["rows"], thumbnail["columns"])
+        left = (THUMBNAIL_PIXELS - cell * thumbnail["rows"]) // 2
+        top = (THUMBNAIL_PIXELS - cell * thumbnail["columns"]) // 2
+        fill = self.colors.get("cell_fill")
+        for x, y in thumbnail_cells(thumbnail):
+            self.thumbnail.create_rectangle(left + x * cell, top + y * cell, left + (x + 1) * cell,
+                                            top + (y + 1) * cell, fill=fill, width=0)
+
+    ## Loading
+
+    def load_selected(self):
+        selected = self.selected()
+        if selected is None:
+            return
+        path, _ = selected
+        self.destroy()
+        self.on_load(self.catalog.path(path))
+
+    def other_file(self):
+        self.destroy()
+        self.on_other_file()
+
+    def destroy(self):
+        self._stop_workers()
+        super().destroy()
+
+    def _stop_workers(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    ## Rescanning
+
+    def rescan_step(self):
+        """Rescans for RESCAN_BUDGET seconds, then lets tkinter draw and handle keys until the next frame"""
+        if not self.winfo_exists():
+            return
+
+        start = perf_counter()
+        last = None
+        try:
+            while perf_counter() - start < RESCAN_BUDGET:
+                done, total = next(self._rescan)
+                if (done, total) == last:  # waiting for the workers, nothing to do until the next frame
+                    break
+                last = done, total
+        except StopIteration:
+            self._stop_workers()
+            self.status_label["text"] = f"{len(self.catalog.entries)} patterns"
+            self.search()
+            return
+
+        self.status_label["text"] = f"Scanning {done}/{total}..."
+        self.after(10, self.rescan_step)
@@ -0,0 +1,295 @@
+"""
+Pattern catalog: what every layout in a folder is, without loading it onto the board
+
+Every pattern file is analysed once: board size, rule, population, bounding box, period and displacement
+(evolved on an unbounded plane until it looks like generation 0 again, shifted or not: still life, oscillator
+or spaceship) and a small thumbnail. Results are kept in an index file (CACHE_FOLDER) keyed by path, with
+the file's size, mtime and SHA-1: a rescan only stats files and re-analyses the ones that changed (a moved or
+copied file is found by its hash and not analysed again)
+
+ catalog = Catalog("layouts")
+ for _ in catalog.rescan(): pass   # or a step at a time from tkinter's main loop, see browser.py
+ for _ in catalog.rescan(executor): pass   # files analysed on a process pool (concurrent.futures)
+ catalog.search("oscillator p15")  # entries with every word in their path, rule or kind
+
+ python catalog.py layouts/ oscillator    # rescans and lists matches
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import find_layouts
+from engines import make_engine, parse_rule
+from patterns import read_pattern
+
+CACHE_FOLDER = os.path.join(os.path.expanduser("~"), ".cache", "game-of-life")
+INDEX_VERSION = 2  # 2: periods of patterns away from (0, 0) and bigger than 20x20 were missed
+
+THUMBNAIL_SIZE = 32  # cells of the longer side, bigger patterns are scaled down (a thumbnail cell is alive if any is)
+MAX_PERIOD = 256  # generations evolved looking for a period
+MAX_ANALYSED_POPULATION = 5000  # bigger patterns only get size and thumbnail
+
+
+def file_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def normalized(cells):
+    """Cells moved to start at (0, 0), and how far they were moved"""
+    min_x = min(x for x, _ in cells)
+    min_y = min(y for _, y in cells)
+    return frozenset((x - min_x, y - min_y) for x, y in cells), (min_x, min_y)
+
+
+def find_period(cells, rule, max_period=MAX_PERIOD):
+    """(period, (dx, dy)) if the pattern is itself again within max_period generations (shifted or not), else None"""
+    start, _ = normalized(cells)
+    # moved to a board with max_period cells of room on every side, so all of it is loaded
+    width = max(x for x, _ in start) + 1
+    height = max(y for _, y in start) + 1
+    engine = make_engine("tiled", rows=width + 2 * max_period, columns=height + 2 * max_period, rule=rule)
+    engine.load((x + max_period, y + max_period) for x, y in start)
+    start_x = start_y = max_period
+
+    for generation in range(1, max_period + 1):
+        engine.step()
+        now = list(engine.iter_cells())  # the whole plane, not just the board
+        if len(now) != len(start):
+            continue
+        shape, (x, y) = normalized(now)
+        if shape == start:
+            return generation, (x - start_x, y - start_y)
+    return None
+
+
+def kind_of(period, displacement):
+    if period is None:
+        return ""
+    if displacement != [0, 0]:
+        return "spaceship"
+    return "still life" if period == 1 else "oscillator"
+
+
+def make_thumbnail(cells, bounding_box, size=THUMBNAIL_SIZE):
+    """Bounding box scaled to fit size x size: {"rows", "columns", "bits"} with bit x * columns + y as hex"""
+    min_x, min_y, max_x, max_y = bounding_box
+    height, width = max_x - min_x + 1, max_y - min_y + 1
+    scale = max(1, -(-max(height, width) // size))  # pattern cells per thumbnail cell
+    rows, columns = -(-height // scale), -(-width // scale)
+
+    bits = 0
+    for x, y in cells:
+        bits |= 1 << ((x - min_x) // scale * columns + (y - min_y) // scale)
+    return {"rows": rows, "columns": columns, "bits": format(bits, "x")}
+
+
+def thumbnail_cells(thumbnail):
+    """Live cells of a thumbnail made by make_thumbnail"""
+    bits, columns = int(thumbnail["bits"], 16), thumbnail["columns"]
+    cells = []
+    index = 0
+    while bits:
+        if bits & 1:
+            cells.append(divmod(index, columns))
+        bits >>= 1
+        index += 1
+    return cells
+
+
+def analyse(filename, data=None):
+    """Catalog entry of a pattern file (without the path, size and mtime), or of the error reading it"""
+    if data is None:
+        with open(filename, "rb") as file:
+            data = file.read()
+    entry = {"hash": file_hash(data)}
+
+    try:
+        rows, columns, cells, rule = read_pattern(filename)
+        rule = parse_rule(rule if rule is not None else "B3/S23")
+    except (ValueError, IndexError, OSError) as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+        return entry
+
+    cells = list(set(cells))
+    entry.update({"rows": rows, "columns": columns, "rule": str(rule), "population": len(cells),
+                  "bounding_box": None, "period": None, "displacement": None, "thumbnail": None})
+    if not cells:
+        return entry
+
+    xs = [x for x, _ in cells]
+    ys = [y for _, y in cells]
+    entry["bounding_box"] = [min(xs), min(ys), max(xs), max(ys)]
+    entry["thumbnail"] = make_thumbnail(cells, entry["bounding_box"])
+
+    if len(cells) <= MAX_ANALYSED_POPULATION:
+        found = find_period(cells, rule)
+        if found:
+            entry["period"], entry["displacement"] = found[0], list(found[1])
+    return entry
+
+
+class Catalog:
+    """Index of the pattern files in a folder (and its subfolders)"""
+
+    def __init__(self, folder, index_folder=CACHE_FOLDER):
+        self.folder = os.path.abspath(folder)
+        # one index per catalogued folder
+        name = hashlib.sha1(self.folder.encode()).hexdigest()[:12]
+        self.index_filename = os.path.join(index_folder, f"catalog-{name}.json") if index_folder else None
+
+        self.entries = dict()  # path relative to folder -> entry
+        self.load()
+
+    def load(self):
+        """Entries from the index file as they were saved (nothing is scanned), False if there isn't one"""
+        if self.index_filename is None:
+            return False
+        try:
+            with open(self.index_filename) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if index.get("version") != INDEX_VERSION:
+            return False  # analysed differently, rescanned from scratch
+
+        self.entries = index["entries"]
+        return True
+
+    def save(self):
+        if self.index_filename is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_filename), exist_ok=True)
+            # written under another name first, so a half-written index is never loaded
+            temporary = f"{self.index_filename}.{os.getpid()}.tmp"
+            with open(temporary, "w") as file:
+                json.dump({"version": INDEX_VERSION, "folder": self.folder, "entries": self.entries}, file)
+            os.replace(temporary, self.index_filename)
+        except OSError:  # read-only home etc, rescanned next time
+            pass
+
+    def rescan(self, executor=None):
+        """
+        Brings the index up to date, a file at a time: yields (files done, files), re-analyses only new and
+        changed files and saves the index at the end. With an executor (e.g. a ProcessPoolExecutor) files are
+        analysed on it and the generator never blocks: while it waits for them it yields the same files done
+        """
+        filenames = [filename for filename in find_layouts([self.folder])
+                     if not filename.lower().endswith(".snap")]  # snapshots are board states, not patterns
+        by_hash = {entry["hash"]: entry for entry in self.entries.values()}
+        entries = dict()
+        pending = dict()  # future -> (path, stat) of files being analysed
+        done = 0
+
+        for filename in filenames:
+            path = os.path.relpath(filename, self.folder)
+            try:
+                stat = os.stat(filename)
+            except OSError:  # gone since it was listed
+                continue
+
+            entry = self.entries.get(path)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+                with open(filename, "rb") as file:
+                    data = file.read()
+                known = by_hash.get(file_hash(data))  # moved, copied or touched
+                if known is not None:
+                    entry = dict(known)
+                elif executor is not None:
+                    pending[executor.submit(analyse, filename, data)] = (path, stat)
+                    entries[path] = None  # keeps the order, filled in when it's done
+                    continue
+                else:
+                    entry = analyse(filename, data)
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            entries[path] = entry
+            done += 1
+            yield done, len(filenames)
+
+        while pending:
+            for future in [future for future in pending if future.done()]:
+                path, stat = pending.pop(future)
+                done += 1
+                try:
+                    entry = future.result()
+                except Exception:  # the pool broke (a worker died): not indexed, analysed again next time
+                    del entries[path]
+                    continue
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+                entries[path] = entry
+            yield done, len(filenames)
+
+        self.entries = entries  # files that are gone are dropped
+        self.save()
+
+    def search(self, query=""):
+        """(path, entry) of every pattern with all words of the query in its path, rule or kind (p2: period 2)"""
+        words = query.lower().split()
+        results = []
+        for path, entry in sorted(self.entries.items()):
+            if "error" in entry:
+                keywords = f"{path} error"
+            else:
+                period = entry["period"]
+                keywords = f"{path} {entry['rule']} {kind_of(period, entry['displacement'])}"
+                if period is not None:
+                    keywords += f" p{period}"
+            keywords = keywords.lower()
+            if all(word in keywords for word in words):
+                results.append((path, entry))
+        return results
+
+    def path(self, path):
+        """Full filename of a catalogued path"""
+        return os.path.join(self.folder, path)
+
+
+def describe(entry):
+    """One line about a pattern, e.g. "Oscillator p2, 3 cells, 9x9 board, B3/S23" """
+    if "error" in entry:
+        return entry["error"]
+
+    period = entry["period"]
+    kind = kind_of(period, entry["displacement"]).capitalize()
+    if kind == "Spaceship":
+        dx, dy = entry["displacement"]
+        kind += f" ({dx}, {dy})/{period}"
+    elif kind == "Oscillator":
+        kind += f" p{period}"
+    parts = [kind] if kind else []
+    parts.append(f"{entry['population']} cells")
+    parts.append(f"{entry['rows']}x{entry['columns']} board")
+    parts.append(entry["rule"])
+    return ", ".join(parts)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Index pattern files and search them")
+    parser.add_argument("folder", nargs="?", default="layouts", help="folder of pattern files (default: layouts)")
+    parser.add_argument("query", nargs="*", help="words to search for, e.g. oscillator p2")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    catalog = Catalog(args.folder)
+    with ProcessPoolExecutor() as executor:
+        last = None
+        for progress in catalog.rescan(executor):
+            if progress == last:  # waiting for the pool, nothing else to do
+                time.sleep(0.01)
+            last = progress
+
+    for path, entry in catalog.search(" ".join(args.query)):
+        print(f"{path}: {describe(entry)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Converting pattern files in bulk: Plaintext, RLE, Macrocell (read only), csv and binary snapshots
+
+Files and directories (searched recursively) are converted on a process pool, every file is read and written
+line by line (snapshots a stripe of rows at a time). By default the converted file goes next to the original
+(layouts/spaceships/mwss.cells.txt -> layouts/spaceships/mwss.cells.csv), with -o into another folder with the
+same tree. Files that are already there are skipped unless --overwrite, only errors and a summary are printed
+Files that would get the same name (diehard.txt and diehard.csv) keep their extension in it: diehard.txt.rle
+
+ python convert.py layouts/ --to csv
+ python convert.py ~/lifewiki/ --to rle -o converted/ --padding 20
+ python convert.py glider.cells --to csv --size 60 --shift 25 25
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from batch import find_layouts, SNAPSHOT_EXTENSION
+from engines import make_engine
+from patterns import PADDING, WRITERS, Layout, read_pattern
+
+try:
+    import snapshot  # needs NumPy
+except ImportError:
+    snapshot = None
+
+FORMATS = {"csv": ".csv", "rle": ".rle", "cells": ".cells", "snap": SNAPSHOT_EXTENSION}
+
+
+def read_layout(filename, padding=PADDING):
+    if filename.lower().endswith(SNAPSHOT_EXTENSION):
+        if snapshot is None:
+            raise ValueError("Snapshots need NumPy (pip install numpy)")
+        engine = make_engine("dense")
+        snapshot.load_snapshot(filename, engine)
+        return Layout(engine.rows, engine.columns, engine.cells, str(engine.rule))
+    return read_pattern(filename, padding)
+
+
+def write_layout(filename, layout):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == SNAPSHOT_EXTENSION:
+        if snapshot is None:
+            raise ValueError("Snapshots need NumPy (pip install numpy)")
+        engine = make_engine("dense", rows=layout.rows, columns=layout.columns, rule=layout.rule)
+        engine.load(layout.cells)
+        snapshot.save_snapshot(filename, engine)
+    else:
+        WRITERS[extension](filename, layout.rows, layout.columns, layout.cells, layout.rule)
+
+
+def place(layout, shift=(0, 0), size=None):
+    """Cells shifted by (dx, dy) on a size x size board (or the layout's own), cells off the board are dropped"""
+    dx, dy = shift
+    rows, columns = (size, size) if size else (layout.rows, layout.columns)
+    if (dx, dy) == (0, 0) and (rows, columns) == (layout.rows, layout.columns):
+        return layout, 0
+
+    cells = [(x + dx, y + dy) for (x, y) in layout.cells]
+    on_board = [(x, y) for (x, y) in cells if 0 <= x < rows and 0 <= y < columns]
+    return Layout(rows, columns, on_board, layout.rule), len(cells) - len(on_board)
+
+
+def convert_file(source, destination, padding=PADDING, shift=(0, 0), size=None, overwrite=False):
+    """Converts one file, returns a dict of what happened (converted, skipped or the error)"""
+    start = time.perf_counter()
+    result = {"file": source, "output": destination}
+
+    if os.path.abspath(source) == os.path.abspath(destination):
+        result["skipped"] = "same file"
+        return result
+    if not overwrite and os.path.exists(destination):
+        result["skipped"] = "already there"
+        return result
+
+    try:
+        layout, dropped = place(read_layout(source, padding), shift, size)
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        write_layout(destination, layout)
+        result["cells"] = len(layout.cells)
+        if dropped:
+            result["dropped"] = dropped  # shifted off (or didn't fit) the board
+    except (ValueError, IndexError, OSError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def jobs(paths, extension, output=None):
+    """
+    List of (source, destination) of every file in paths, destinations under output mirror the folders given.
+    Files that would end up with the same name (diehard.txt and diehard.csv -> diehard.rle) keep their own
+    extension in it (diehard.txt.rle, diehard.csv.rle), also returns a list of those sources
+    """
+    def destination(source, root, name):
+        return os.path.join(output, os.path.relpath(name, root)) if output else name
+
+    planned = []
+    for path in paths:
+        root = path if os.path.isdir(path) else os.path.dirname(path)
+        for source in find_layouts([path]):
+            planned.append((source, root, destination(source, root, os.path.splitext(source)[0] + extension)))
+
+    def key(filename):
+        return os.path.normcase(os.path.abspath(filename))
+
+    sharing = dict()  # destination -> how many sources go there
+    for _, _, name in planned:
+        sharing[key(name)] = sharing.get(key(name), 0) + 1
+
+    job_list, renamed = [], []
+    for source, root, name in planned:
+        # a file that already is in the format is left as it is (skipped), the others get the longer name
+        if sharing[key(name)] > 1 and key(name) != key(source):
+            name = destination(source, root, source + extension)
+            renamed.append(source)
+        job_list.append((source, name))
+    return job_list, renamed
+
+
+def run_conversions(job_list, workers=None, **options):
+    """Yields results in order, as soon as they're ready"""
+    if workers == 1:  # no pool, easier to debug and profile
+        for source, destination in job_list:
+            yield convert_file(source, destination, **options)
+        return
+
+    convert = partial(_convert_job, options=options)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # pattern files are small, chunks keep the pool from spending more time on passing them than converting them
+        yield from executor.map(convert, job_list, chunksize=max(1, min(256, len(job_list) // (4 * workers))))
+
+
+def _convert_job(job, options):
+    return convert_file(*job, **options)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Convert pattern files in bulk (Plaintext, RLE, Macrocell, csv, snapshots)")
+
+    parser.add_argument("paths", nargs="+", help="pattern files (csv, rle, mc, cells, txt, snap) or directories of them")
+    parser.add_argument("--to", choices=list(FORMATS), default="csv", help="format to convert to (default: csv)")
+    parser.add_argument("-o", "--output", help="folder to write into, with the same tree (default: next to every file)")
+    parser.add_argument("--padding", type=int, default=PADDING,
+                        help=f"empty cells around patterns without a board size: Plaintext, RLE, Macrocell (default: {PADDING})")
+    parser.add_argument("--shift", type=int, nargs=2, default=(0, 0), metavar=("DX", "DY"),
+                        help="move every cell by DX, DY (e.g. to give a spaceship room in the direction it flies)")
+    parser.add_argument("--size", type=int, help="board of SIZE x SIZE instead of the pattern's own (cells off it are dropped)")
+    parser.add_argument("--overwrite", action="store_true", help="convert files that are already converted again")
+    parser.add_argument("--workers", type=int, help="worker processes (default: cpu count)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="a line for every file, not just errors")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    job_list, renamed = jobs(args.paths, FORMATS[args.to], args.output)
+    if renamed:
+        print(f"{len(renamed)} files share their name with another one, their extension is kept in the new name "
+              f"(e.g. {os.path.basename(renamed[0])}{FORMATS[args.to]})", file=sys.stderr)
+    counts = {"converted": 0, "skipped": 0, "failed": 0}
+    start = time.perf_counter()
+
+    for result in run_conversions(job_list, workers=args.workers, padding=args.padding, shift=tuple(args.shift),
+                                  size=args.size, overwrite=args.overwrite):
+        if "error" in result:
+            counts["failed"] += 1
+            print(f"{result['file']}: {result['error']}", file=sys.stderr)
+        elif "skipped" in result:
+            counts["skipped"] += 1
+            if args.verbose:
+                print(f"{result['file']}: skipped ({result['skipped']})")
+        else:
+            counts["converted"] += 1
+            if args.verbose:
+                print(f"{result['file']} -> {result['output']}: {result['cells']} cells")
+            if "dropped" in result:
+                print(f"{result['file']}: {result['dropped']} cells were off the board", file=sys.stderr)
+
+    seconds = time.perf_counter() - start
+    files_per_sec = len(job_list) / seconds if seconds > 0 else 0.0
+    print(f"{counts['converted']} converted, {counts['skipped']} skipped, {counts['failed']} failed "
+          f"in {seconds:.1f} s ({files_per_sec:.0f} files/sec)", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Simulation engines: the rules of the game, without any tkinter (can be run headless)
+
+Usage:
+ engine = make_engine("sparse", rows=20, columns=20)
+ engine.add(5, 3); engine.add(5, 4); engine.add(5, 5)
+ engine.step()     # one generation
+ engine.step(100)  # 100 generations
+ print(engine.cells)
+ for frame in engine.iter_generations(stop=1000):  # births, deaths and population of every generation, lazily
+     print(frame.generation, frame.population)
+
+ engine = make_engine("dense", rows=100, columns=100, rule="B36/S23")  # HighLife instead of Life
+"""
+
+from engines.base import Engine, Delta, Frame
+from engines.rules import Rule, LIFE, NAMED_RULES, parse_rule
+from engines.sparse import SparseEngine
+from engines.hashlife import HashLifeEngine
+from engines.tiled import TiledEngine
+from engines.adaptive import AdaptiveEngine
+from engines.cycles import Cycle, CycleDetector, run_until_cycle
+
+# name -> engine class, engines that need NumPy are only listed if it is installed
+ENGINES = {
+    SparseEngine.name: SparseEngine,
+    HashLifeEngine.name: HashLifeEngine,
+    TiledEngine.name: TiledEngine,
+}
+
+try:
+    from engines.dense import DenseEngine
+    from engines.bitpacked import BitPackedEngine
+    from engines.striped import StripedEngine
+    from engines.blocks import BlockEngine
+    from engines.batched import BatchEngine  # many boards at once, not a single-board engine (not in ENGINES)
+except ImportError:  # no NumPy
+    DenseEngine = BitPackedEngine = StripedEngine = BlockEngine = BatchEngine = None
+else:
+    ENGINES[DenseEngine.name] = DenseEngine
+    ENGINES[BitPackedEngine.name] = BitPackedEngine
+    ENGINES[StripedEngine.name] = StripedEngine
+    ENGINES[BlockEngine.name] = BlockEngine
+
+# sparse, dense and hashlife in one, whichever is cheapest at the time
+ENGINES[AdaptiveEngine.name] = AdaptiveEngine
+
+
+def make_engine(name="sparse", rows=20, columns=20, wrap=False, rule=None, **options):
+    """options are passed on to the engine, e.g. workers=8 for the striped engine. rule defaults to B3/S23"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}', available: {', '.join(ENGINES)}")
+
+    engine = ENGINES[name](rows=rows, columns=columns, wrap=wrap, **options)
+    if rule is not None:
+        engine.rule = rule
+    return engine
@@ -0,0 +1,269 @@
+"""
+Adaptive engine: one board that moves between the sparse, dense and hashlife engines as it evolves
+
+A methuselah like the R-pentomino starts as a few cells (sparse is cheapest), turns into chaos over
+a big part of the board (dense is cheapest) and settles into a few still lifes and blinkers again.
+Every check_interval generations the engine looks at the population (and how much it changed), the
+bounding box and how many cells changed in a generation, predicts the cost of a generation in every representation and migrates the board (through its
+list of cells) when another one is cheaper by more than the hysteresis factor and the saving pays for the
+migration within min_dwell generations. A switch is never undone within min_dwell generations.
+
+HashLife is used for long runs (step(n) with a big n, jumping) of settled patterns far from the edges only.
+Its plane is unbounded, so it only gets as many generations at a time as it takes for the pattern to
+reach an edge (a pattern grows at most 1 cell per generation), which keeps it exact on a bounded board.
+
+ engine = make_engine("adaptive", rows=1000, columns=1000)       # or mode="sparse" / "dense" / "hashlife"
+ engine.representation  # "sparse", "dense" or "hashlife", what the board is in right now
+ engine.stats           # what the last decision was based on
+"""
+
+import time
+
+from engines.base import Engine
+from engines.sparse import SparseEngine
+from engines.hashlife import HashLifeEngine
+
+try:
+    from engines.dense import DenseEngine
+except ImportError:  # no NumPy: sparse and hashlife only
+    DenseEngine = None
+
+MODES = ("auto", "sparse", "dense", "hashlife")
+
+# starting guesses of seconds per generation (refined by timing every step): sparse pays per live cell,
+# dense per board cell, both a fixed overhead per generation
+UNIT_COST = {"sparse": 2.5e-6, "dense": 6e-10}
+OVERHEAD = {"sparse": 5e-6, "dense": 2e-5}
+MIGRATION_COST_PER_CELL = 1e-6  # seconds per live cell to move a board between representations
+
+# hashlife: only for runs of at least this many generations, of boards whose population changed by less
+# than this share since the last check (settled: still lifes, oscillators, slow growth), chaos would only
+# fill its caches with squares that never come back
+HASHLIFE_MIN_GENERATIONS = 64
+HASHLIFE_MAX_GROWTH = 0.05
+
+
+class AdaptiveEngine(Engine):
+    name = "adaptive"
+
+    def __init__(self, rows=20, columns=20, wrap=False, mode="auto", check_interval=16, min_dwell=64,
+                 hysteresis=1.5):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}', available: {', '.join(MODES)}")
+        if mode == "dense" and DenseEngine is None:
+            raise ValueError("Dense representation needs NumPy (pip install numpy)")
+
+        super().__init__(rows, columns, wrap)
+        self.mode = mode
+        self.check_interval = check_interval
+        self.min_dwell = min_dwell  # generations before a switch can be undone
+        self.hysteresis = hysteresis  # other representation has to be this many times cheaper
+
+        self.unit_cost = dict(UNIT_COST)
+        self.switches = []  # (generation, from, to) of every migration
+        self.stats = dict()
+
+        self._engines = dict()  # representation -> engine, kept for reuse (hashlife keeps its caches)
+        self.current = self._engine("dense" if mode == "dense" else "sparse")
+        self._switched_at = 0
+        self._next_check = 0
+        self._change_rate = 1.0  # share of live cells that changed in the last measured generation
+        self._checked_population = None  # population at the last check
+
+    @property
+    def representation(self):
+        return self.current.name
+
+    def cache_report(self):
+        """Hashlife engine's node cache (see HashLifeEngine.cache_report), None if hashlife hasn't been used"""
+        engine = self._engines.get("hashlife")
+        return engine.cache_report() if engine is not None else None
+
+    def _engine(self, representation):
+        engine = self._engines.get(representation)
+        if engine is None:
+            engine = self._engines[representation] = {
+                "sparse": SparseEngine, "dense": DenseEngine, "hashlife": HashLifeEngine,
+            }[representation](rows=self.rows, columns=self.columns, wrap=self.wrap)
+        elif (engine.rows, engine.columns) != (self.rows, self.columns):
+            engine.resize(self.rows, self.columns)
+        if engine.rule != self.rule:  # setting it drops hashlife's results
+            engine.rule = self.rule
+        return engine
+
+    ## Cell access (whatever the board is in right now)
+
+    @property
+    def cells(self):
+        return self.current.cells
+
+    @property
+    def population(self):
+        return self.current.population
+
+    def is_alive(self, x, y):
+        return self.current.is_alive(x, y)
+
+    def set_cell(self, x, y, alive):
+        self.current.set_cell(x, y, alive)
+
+    def _clear(self):
+        self.current.clear()
+
+    def load(self, cells):
+        cells = list(cells)
+        self.clear()
+        if self.mode == "auto":
+            # start in whatever suits this many cells best, no migration needed
+            best = min(self._candidates(), key=lambda representation: self.predicted_cost(representation, len(cells)))
+            self.current = self._engine(best)
+        self.current.load(cells)
+        self._switched_at = self._next_check = 0
+        self._checked_population = None
+
+    def resize(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.current.resize(rows, columns)
+        self.clear()
+        self._switched_at = self._next_check = 0
+
+    def to_array(self):
+        return self.current.to_array()
+
+    def bounding_box(self):
+        return self.current.bounding_box()
+
+    def _rule_changed(self):
+        self.current.rule = self.rule
+
+    ## Cost model
+
+    def _candidates(self):
+        if self.mode != "auto":
+            return [self.mode if self.mode != "hashlife" else "sparse"]
+        return ["sparse", "dense"] if DenseEngine is not None else ["sparse"]
+
+    def predicted_cost(self, representation, population):
+        """Seconds per generation"""
+        driver = population if representation == "sparse" else self.rows * self.columns
+        return OVERHEAD[representation] + self.unit_cost[representation] * driver
+
+    def _learn(self, representation, seconds, generations, population):
+        # running average of the measured cost per live cell (sparse) or board cell (dense)
+        if representation not in self.unit_cost or generations <= 0:
+            return
+        driver = population if representation == "sparse" else self.rows * self.columns
+        measured = max(seconds / generations - OVERHEAD[representation], 0.0) / max(driver, 1)
+        self.unit_cost[representation] += 0.2 * (measured - self.unit_cost[representation])
+
+    def _hashlife_budget(self):
+        """How many generations hashlife can run exactly: until the pattern could reach an edge"""
+        box = self.current.bounding_box()
+        if box is None:
+            return 0
+        min_x, min_y, max_x, max_y = box
+        return min(min_x, min_y, self.rows - 1 - max_x, self.columns - 1 - max_y) - 1
+
+    def _choose(self, generations):
+        """Picks a representation for the next generations (up to generations of them) and migrates to it"""
+        population = self.population
+        box = self.current.bounding_box() if population else None
+        box_area = (box[2] - box[0] + 1) * (box[3] - box[1] + 1) if box else 0
+        last_population, self._checked_population = self._checked_population, population
+        growth = abs(population - last_population) / max(last_population, 1) if last_population is not None else 1.0
+        self.stats = {
+            "generation": self.generation,
+            "population": population,
+            "growth": round(growth, 4),
+            "box_density": round(population / box_area, 4) if box_area else 0.0,
+            "change_rate": round(self._change_rate, 4),
+            "costs": {representation: self.predicted_cost(representation, population)
+                      for representation in self._candidates()},
+        }
+        self._next_check = self.generation + self.check_interval
+
+        hashlife_allowed = (self.mode in ("auto", "hashlife") and not self.wrap
+                            and generations >= HASHLIFE_MIN_GENERATIONS)
+        settled = growth <= HASHLIFE_MAX_GROWTH and self.generation - self._switched_at >= self.min_dwell
+        if hashlife_allowed and (self.mode == "hashlife" or settled or self.representation == "hashlife"):
+            # compact enough to run a long stretch unbounded
+            if self._hashlife_budget() >= HASHLIFE_MIN_GENERATIONS and 4 * box_area <= self.rows * self.columns:
+                self._migrate("hashlife")
+                return
+
+        costs = self.stats["costs"]
+        best = min(costs, key=costs.get)
+        if self.representation == "hashlife" or best == self.representation:
+            if self.representation == "hashlife":
+                self._migrate(best)
+            return
+        if self.mode != "auto" or self.generation - self._switched_at < self.min_dwell:
+            return
+
+        current_cost = costs.get(self.representation, float("inf"))
+        saving = (current_cost - costs[best]) * self.min_dwell
+        if current_cost > self.hysteresis * costs[best] and saving > MIGRATION_COST_PER_CELL * population:
+            self._migrate(best)
+
+    def _migrate(self, representation):
+        if representation == self.representation:
+            return
+
+        engine = self._engine(representation)
+        engine.load(self.current.cells)
+        engine.generation = self.generation
+        self.switches.append((self.generation, self.representation, representation))
+        self.current.clear()  # frees the old representation's cells (its buffers are kept)
+        self.current = engine
+        self._switched_at = self.generation
+
+    ## Evolution
+
+    def step(self, n=1):
+        while n > 0:
+            if self.generation >= self._next_check:
+                self._choose(n)
+
+            if self.representation == "hashlife":
+                generations = min(n, self._hashlife_budget())
+                if generations < 1:  # about to reach an edge, back to a bounded representation
+                    self._next_check = self.generation
+                    self._choose(0)
+                    continue
+            else:
+                generations = min(n, max(self._next_check - self.generation, 1))
+                if self.generation + generations >= self._next_check:
+                    # last generation before a check is measured, the rest are plain steps
+                    self._step_measured(generations)
+                    n -= generations
+                    continue
+
+            population = self.population
+            start = time.perf_counter()
+            self.current.step(generations)
+            self._learn(self.representation, time.perf_counter() - start, generations, population)
+            self.generation += generations
+            n -= generations
+
+    def _step_measured(self, generations):
+        """Steps with the last generation's births and deaths counted (for the change rate)"""
+        population = self.population
+        start = time.perf_counter()
+        if generations > 1:
+            self.current.step(generations - 1)
+        delta = self.current.step_delta()
+        self._learn(self.representation, time.perf_counter() - start, generations, population)
+
+        changed = len(delta.births) + len(delta.deaths)
+        self._change_rate = changed / max(self.population, 1)
+        self.generation += generations
+        return delta
+
+    def step_delta(self, n=1):
+        if n == 1 and self.generation >= self._next_check:
+            self._choose(n)
+        if n != 1 or self.representation == "hashlife":
+            return super().step_delta(n)  # compares whole boards, only for several generations at once
+
+        return self._step_measured(1)
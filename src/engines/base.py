@@ -0,0 +1,237 @@
+"""
+Common interface for simulation engines (no tkinter in here, engines have to run headless)
+
+Coordinates are (x, y) tuples like in Game: x is in range(rows), y is in range(columns)
+"""
+
+from collections import namedtuple
+
+from engines.rules import LIFE, parse_rule
+
+# 8 neighbours of a cell, excludes itself
+NEIGHBOUR_OFFSETS = tuple((dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if (dx, dy) != (0, 0))
+
+
+# Bit-parallel adders for engines that pack many cells into one integer (works on ints and NumPy arrays)
+
+def half_add(a, b):
+    return a ^ b, a & b
+
+
+def full_add(a, b, c):
+    a_xor_b = a ^ b
+    return a_xor_b ^ c, (a & b) | (c & a_xor_b)
+
+
+def life_bits(north_west, north, north_east, west, east, south_west, south, south_east, alive, rule=LIFE):
+    """Next generation of every bit at once, given the 8 neighbour bits and the bit itself"""
+    # adder tree: 8 one-bit neighbours per cell -> neighbour count (bits s0, s1, s2, s3)
+    sum_a, carry_a = full_add(north_west, north, north_east)
+    sum_b, carry_b = full_add(west, east, south_west)
+    sum_c, carry_c = half_add(south, south_east)
+
+    s0, carry_d = full_add(sum_a, sum_b, sum_c)
+    twos, carry_e = full_add(carry_a, carry_b, carry_c)
+    s1, carry_f = half_add(twos, carry_d)
+    s2 = carry_e ^ carry_f
+
+    if rule.is_life:
+        # B3/S23: count is 2 or 3 (s1 set, s2 not set), and either 3 (s0 set) or the cell is alive
+        # (count 8 is 0 modulo 8 and stays dead, which is right)
+        return s1 & ~s2 & (s0 | alive)
+
+    # other rules need to tell 8 from 0
+    s3 = carry_e & carry_f
+    return rule_bits(rule, (s0, s1, s2, s3), alive)
+
+
+def rule_bits(rule, count_bits, alive):
+    """
+    Bit-parallel table lookup: next state of every bit from its neighbour count bits (s0..s3) and itself.
+    For every count in the rule the count bits are compared at once, births and survivals are or-ed together
+    """
+    def equals(count):
+        # s_i where count has bit i set, ~s_i where it hasn't (B0 isn't allowed, so ~s0 & ~s1 ... is only
+        # ever and-ed with alive, which keeps Python ints from going negative)
+        result = None
+        for i, bit in enumerate(count_bits):
+            term = bit if count >> i & 1 else ~bit
+            result = term if result is None else result & term
+        return result
+
+    born = survives = None
+    for count in range(9):
+        in_birth, in_survival = rule.table[count], rule.table[9 + count]
+        if not (in_birth or in_survival):
+            continue
+        match = equals(count)
+        if in_birth:
+            born = match if born is None else born | match
+        if in_survival:
+            survives = match if survives is None else survives | match
+
+    result = alive & 0  # zeros of the right type and shape
+    if born is not None:
+        result = result | (born & ~alive)
+    if survives is not None:
+        result = result | (survives & alive)
+    return result
+
+
+# Cells that were born and cells that died between two states of the board (iterables of (x, y))
+Delta = namedtuple("Delta", ["births", "deaths"])
+
+# A generation streamed by Engine.iter_generations: cells born and dead since the previous frame and the population
+Frame = namedtuple("Frame", ["generation", "births", "deaths", "population"])
+
+
+class Engine:
+    """
+    Base class: subclasses implement cells, is_alive, set_cell, _clear and _step_once
+    """
+    name = "base"
+
+    def __init__(self, rows=20, columns=20, wrap=False):
+        self.rows = rows
+        self.columns = columns
+        self.wrap = wrap  # True: board loops around its edges (a torus)
+        self.generation = 0
+        self._rule = LIFE
+
+    @property
+    def rule(self):
+        """Life-like rule the board evolves by (engines.rules.Rule), B3/S23 by default"""
+        return self._rule
+
+    @rule.setter
+    def rule(self, rule):
+        self._rule = parse_rule(rule)
+        self._rule_changed()
+
+    def _rule_changed(self):
+        """For engines that cache results of the old rule"""
+        pass
+
+    ## To be implemented by subclasses
+
+    @property
+    def cells(self):
+        """Iterable of live cells' (x, y) coordinates"""
+        raise NotImplementedError
+
+    def is_alive(self, x, y):
+        raise NotImplementedError
+
+    def set_cell(self, x, y, alive):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _step_once(self):
+        raise NotImplementedError
+
+    ## Shared logic
+
+    @property
+    def population(self):
+        return sum(1 for _ in self.cells)
+
+    def __len__(self):
+        return self.population
+
+    def __contains__(self, cell):
+        return self.is_alive(*cell)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.rows and 0 <= y < self.columns
+
+    def add(self, x, y):
+        self.set_cell(x, y, True)
+
+    def remove(self, x, y):
+        self.set_cell(x, y, False)
+
+    def toggle(self, x, y):
+        """Flips a cell, returns its new state"""
+        alive = not self.is_alive(x, y)
+        self.set_cell(x, y, alive)
+        return alive
+
+    def clear(self):
+        """Kills all cells and starts counting generations from 0 again"""
+        self._clear()
+        self.generation = 0
+
+    def load(self, cells):
+        """Replaces the board with given live cells (cells outside of the board are ignored)"""
+        self.clear()
+        for (x, y) in cells:
+            if self.in_bounds(x, y):
+                self.set_cell(x, y, True)
+
+    def resize(self, rows, columns):
+        """Changes board size, live cells are wiped out (like in the original Game)"""
+        self.rows = rows
+        self.columns = columns
+        self.clear()
+
+    def to_array(self):
+        """Board as a (rows, columns) NumPy uint8 array of 0s and 1s (for renderers and file formats)"""
+        import numpy as np  # optional dependency, only needed by callers of to_array
+
+        board = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        coords = np.array([cell for cell in self.cells if self.in_bounds(*cell)], dtype=np.intp).reshape(-1, 2)
+        board[coords[:, 0], coords[:, 1]] = 1
+        return board
+
+    def bounding_box(self):
+        """(min_x, min_y, max_x, max_y) of live cells or None if board is empty"""
+        cells = list(self.cells)
+        if not cells:
+            return None
+
+        xs = [x for (x, _) in cells]
+        ys = [y for (_, y) in cells]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def step(self, n=1):
+        """Evolves the board n generations forward"""
+        for _ in range(n):
+            self._step_once()
+            self.generation += 1
+
+    def step_delta(self, n=1):
+        """Like step, but returns a Delta of cells that changed (for redrawing only what changed)"""
+        # generic version (hashlife, O(population)), engines override this with something cheaper than comparing
+        # whole boards
+        before = set(self.cells)
+        self.step(n)
+        after = set(self.cells)
+        return Delta(births=after - before, deaths=before - after)
+
+    def iter_generations(self, start=None, stop=None, step=1):
+        """
+        Evolves the board lazily, yielding a Frame for every generation in range(start, stop, step) (stop None:
+        forever, start defaults to the next generation). Births and deaths are since the previous frame (the first
+        one since the board as it was), the population is counted once and kept up to date from them.
+        A frame costs one step_delta: sparse, bitpacked and tiled only look at what changed, dense engines compare
+        against their spare buffer (a copy of the board only when step > 1) and the rest compare sets of cells
+
+         for frame in engine.iter_generations(stop=1000, step=10):
+             print(frame.generation, frame.population)
+        """
+        if step < 1:
+            raise ValueError(f"step has to be at least 1, got {step}")
+        if start is None:
+            start = self.generation + step
+        if start <= self.generation:
+            raise ValueError(f"Engines only go forward, can't start at generation {start} (at {self.generation})")
+
+        population = self.population
+        generation = start
+        while stop is None or generation < stop:
+            births, deaths = self.step_delta(generation - self.generation)
+            population += len(births) - len(deaths)
+            yield Frame(self.generation, births, deaths, population)
+            generation += step
@@ -0,0 +1,248 @@
+"""
+Batched engine: many boards of the same size evolved together, one (boards, rows, columns) NumPy array
+
+For parameter sweeps and soup searches: a generation of every board is one set of array operations
+(the dense engine's shifted-slice adds over a whole stack of boards), so the Python overhead of a step
+is paid once per batch instead of once per board. Every generation a 64-bit hash of every board is compared
+to its last max_period hashes: a board that is empty, a still life or a cycle is retired (its final state
+and the Cycle are kept) and a mask keeps it out of the results from then on. Retired boards are still
+computed until enough of them have piled up to be worth copying out of the working arrays
+
+ batch = BatchEngine(boards=10000, rows=20, columns=20)
+ batch.load_array(soups)        # (10000, 20, 20) array of 0s and 1s
+ batch.step(1000)               # stops early when every board has settled
+ batch.active                   # mask of boards still going
+ batch.cycle(7)                 # Cycle(period=2, start_generation=93, empty=False) or None
+ batch.board(7)                 # (20, 20) array
+"""
+
+import numpy as np
+
+from engines.cycles import Cycle
+from engines.dense import cell_array, padded_neighbour_counts, apply_rule
+from engines.rules import LIFE, parse_rule
+
+# splitmix64 finalizer
+MIX_SHIFTS = (np.uint64(30), np.uint64(27), np.uint64(31))
+MIX_MULTIPLIERS = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+# working arrays are compacted when this share of the boards in them has been retired
+COMPACT_RETIRED_SHARE = 0.25
+
+
+class BatchEngine:
+    name = "batch"
+
+    def __init__(self, boards=1000, rows=20, columns=20, wrap=False, rule=None, max_period=64):
+        self.count = boards
+        self.rows = rows
+        self.columns = columns
+        self.wrap = wrap
+        self.max_period = max_period  # longer cycles aren't noticed (the boards just keep going)
+        self.rule = LIFE if rule is None else rule
+
+        # a random 64-bit key for every bit-packed word of a board, mixed into the word when hashing
+        self._word_count = -(-rows * columns // 64)
+        self._keys = np.random.default_rng(0).integers(0, 2**64, self._word_count, dtype=np.uint64, endpoint=False)
+
+        self.clear()
+
+    @property
+    def rule(self):
+        """Life-like rule every board evolves by (engines.rules.Rule)"""
+        return self._rule
+
+    @rule.setter
+    def rule(self, rule):
+        self._rule = parse_rule(rule)
+
+    def clear(self):
+        """Every board empty and running again, generation 0"""
+        self.generation = 0
+        self.boards = np.zeros((self.count, self.rows, self.columns), dtype=np.uint8)  # retired boards' final states
+
+        # per board: still running, generation it settled at (-1 while running), period it repeats with
+        self._active = np.ones(self.count, dtype=bool)
+        self.lifespans = np.full(self.count, -1, dtype=np.int64)
+        self.periods = np.zeros(self.count, dtype=np.int64)
+        self.empty = np.zeros(self.count, dtype=bool)
+
+        self._set_working(np.arange(self.count))
+
+    def _set_working(self, ids):
+        """Boards ids (their current states) are the ones stepped from now on"""
+        self._ids = ids
+        self._board = self.boards[ids]  # a copy
+        self._running = np.ones(len(ids), dtype=bool)  # retired ones stay in the working arrays for a while
+        # generation every working board was loaded at, hashes from before that aren't its own
+        self._since = np.full(len(ids), self.generation, dtype=np.int64)
+
+        # hashes of the last max_period generations, column generation % max_period
+        self._hashes = np.zeros((len(ids), self.max_period), dtype=np.uint64)
+        self._hash_generations = np.full(self.max_period, -1, dtype=np.int64)
+        self._remember(self._hash(self._board))
+        self._allocate()
+
+    def _allocate(self):
+        """Scratch arrays for stepping the working boards (their contents don't carry over)"""
+        k = len(self._ids)
+        self._padded = np.zeros((k, self.rows + 2, self.columns + 2), dtype=np.uint8)
+        self._counts = np.zeros((k, self.rows, self.columns), dtype=np.uint8)
+        self._spare = np.zeros((k, self.rows, self.columns), dtype=np.uint8)
+
+    ## Boards
+
+    def load(self, index, cells):
+        """
+        Replaces board index with cells, it runs (again) from the current generation on (its lifespan counts from
+        generation 0 like the others'), the other boards and their results stay as they are
+        """
+        board = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        coords = cell_array(cells, self.rows, self.columns)
+        board[coords[:, 0], coords[:, 1]] = 1
+
+        self.boards[index] = board
+        self._active[index] = True
+        self.lifespans[index] = -1
+        self.periods[index] = 0
+        self.empty[index] = False
+
+        position = int(np.searchsorted(self._ids, index))
+        if position == len(self._ids) or self._ids[position] != index:  # retired and compacted away, back in
+            self._ids = np.insert(self._ids, position, index)
+            self._board = np.insert(self._board, position, board, axis=0)
+            self._running = np.insert(self._running, position, True)
+            self._since = np.insert(self._since, position, self.generation)
+            self._hashes = np.insert(self._hashes, position, 0, axis=0)
+            self._allocate()
+
+        self._board[position] = board
+        self._running[position] = True
+        self._since[position] = self.generation
+        self._hashes[position, self.generation % self.max_period] = self._hash(board[None])[0]
+
+    def load_array(self, boards):
+        """Replaces every board with a (boards, rows, columns) array of 0s and 1s, generation 0"""
+        if boards.shape != self.boards.shape:
+            raise ValueError(f"Expected boards of shape {self.boards.shape}, got {boards.shape}")
+
+        self.clear()
+        self.boards[:] = boards != 0
+        self._set_working(np.arange(self.count))
+
+    def _write_back(self):
+        """Current states of the boards still running into boards"""
+        running = self._running
+        self.boards[self._ids[running]] = self._board[running]
+
+    @property
+    def active(self):
+        """Mask of the boards that haven't settled yet"""
+        return self._active.copy()
+
+    def board(self, index):
+        """(rows, columns) array of a board, its final state if it has been retired"""
+        if self._active[index]:
+            return self._board[np.searchsorted(self._ids, index)].copy()
+        return self.boards[index].copy()
+
+    def to_array(self):
+        """(boards, rows, columns) array of every board as it is now"""
+        self._write_back()
+        return self.boards.copy()
+
+    def populations(self):
+        self._write_back()
+        return np.count_nonzero(self.boards.reshape(self.count, -1), axis=1)
+
+    def cycle(self, index):
+        """Cycle a retired board settled into (or None while it's running)"""
+        if self._active[index]:
+            return None
+        return Cycle(period=int(self.periods[index]), start_generation=int(self.lifespans[index]),
+                     empty=bool(self.empty[index]))
+
+    ## Evolution
+
+    def _hash(self, board):
+        """64-bit hash of every board: its cells bit-packed into words, every word (plus its key) splitmix64-ed"""
+        k = len(board)
+        words = np.zeros((k, self._word_count * 8), dtype=np.uint8)
+        packed = np.packbits(board.reshape(k, self.rows * self.columns), axis=1, bitorder="little")
+        words[:, :packed.shape[1]] = packed
+
+        # same mixing as engines.cycles.cell_key, a word at a time (uint64 arithmetic wraps around)
+        z = words.view("<u8") + self._keys
+        z ^= z >> MIX_SHIFTS[0]
+        z *= MIX_MULTIPLIERS[0]
+        z ^= z >> MIX_SHIFTS[1]
+        z *= MIX_MULTIPLIERS[1]
+        z ^= z >> MIX_SHIFTS[2]
+        return z.sum(axis=1, dtype=np.uint64)
+
+    def _remember(self, hashes):
+        column = self.generation % self.max_period
+        self._hashes[:, column] = hashes
+        self._hash_generations[column] = self.generation
+
+    def _neighbour_counts(self):
+        board, padded = self._board, self._padded
+
+        padded[:, 1:-1, 1:-1] = board
+        if self.wrap:
+            padded[:, 0, 1:-1] = board[:, -1]
+            padded[:, -1, 1:-1] = board[:, 0]
+            padded[:, :, 0] = padded[:, :, -2]  # corners come along with the columns
+            padded[:, :, -1] = padded[:, :, 1]
+
+        return padded_neighbour_counts(padded, self._counts)
+
+    def step(self, n=1):
+        """Evolves every running board up to n generations, returns how many are still running"""
+        for _ in range(n):
+            if not self._running.any():
+                break
+
+            apply_rule(self._neighbour_counts(), self._board, self._spare, self.rule)
+            self._board, self._spare = self._spare, self._board
+            self.generation += 1
+            self._check()
+
+        return int(self._active.sum())
+
+    def _check(self):
+        """Retires the boards that became empty or repeat a board of the last max_period generations"""
+        hashes = self._hash(self._board)
+
+        seen = (self._hashes == hashes[:, None]) & (self._hash_generations >= self._since[:, None])
+        repeated = seen.any(axis=1) & self._running
+        empty = ~self._board.any(axis=(1, 2)) & self._running
+        self._remember(hashes)
+
+        settled = repeated | empty
+        if settled.any():
+            positions = np.flatnonzero(settled)
+            ids = self._ids[positions]
+
+            seen_at = self._hash_generations[seen[positions].argmax(axis=1)]
+            is_empty = empty[positions]
+            self.lifespans[ids] = np.where(is_empty, self.generation, seen_at)
+            self.periods[ids] = np.where(is_empty, 1, self.generation - seen_at)
+            self.empty[ids] = is_empty
+            self.boards[ids] = self._board[positions]
+            self._active[ids] = False
+            self._running[positions] = False
+
+            # retired boards cost as much as running ones, drop them once there are enough
+            retired = len(self._running) - int(self._running.sum())
+            if retired >= COMPACT_RETIRED_SHARE * len(self._running):
+                self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self._running)
+        self._ids = self._ids[keep]
+        self._board = self._board[keep]
+        self._running = self._running[keep]
+        self._since = self._since[keep]
+        self._hashes = self._hashes[keep]
+        self._allocate()
@@ -0,0 +1,192 @@
+"""
+Bit-packed engine: every board row is packed into uint64 words, 64 cells per word
+
+A generation is computed with bit-parallel adder logic (SWAR, SIMD within a register):
+all 64 cells of a word get their neighbour counts added at once with and/or/xor.
+1 bit per cell, a 10k x 10k board takes ~12 MB
+
+Bit j of words[x, w] is cell (x, w * 64 + j)
+"""
+
+import numpy as np
+
+from engines.base import Engine, Delta, life_bits
+from engines.dense import cell_array
+from patterns import read_csv, write_csv
+
+WORD_BITS = 64
+ONE = np.uint64(1)
+HIGH_BIT_SHIFT = np.uint64(WORD_BITS - 1)
+
+# live cell count of every possible byte, for population counts
+POPCOUNT_TABLE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+class BitPackedEngine(Engine):
+    name = "bitpacked"
+
+    def __init__(self, rows=20, columns=20, wrap=False):
+        super().__init__(rows, columns, wrap)
+        self._allocate()
+
+    def _allocate(self):
+        self.word_count = -(-self.columns // WORD_BITS)  # ceil
+        self.words = np.zeros((self.rows, self.word_count), dtype=np.uint64)
+
+        # bits past the last column in the last word have to stay 0
+        tail_bits = self.columns - (self.word_count - 1) * WORD_BITS
+        self._tail_mask = np.uint64((1 << tail_bits) - 1)
+
+    ## Cell access
+
+    def _bit(self, y):
+        return y // WORD_BITS, np.uint64(1 << (y % WORD_BITS))
+
+    def is_alive(self, x, y):
+        if not self.in_bounds(x, y):
+            return False
+
+        word, bit = self._bit(y)
+        return bool(self.words[x, word] & bit)
+
+    def set_cell(self, x, y, alive):
+        word, bit = self._bit(y)
+        if alive:
+            self.words[x, word] |= bit
+        else:
+            self.words[x, word] &= ~bit
+
+    def _clear(self):
+        self.words.fill(0)
+
+    def resize(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self._allocate()
+        self.generation = 0
+
+    @property
+    def population(self):
+        return int(POPCOUNT_TABLE[self.words.view(np.uint8)].sum(dtype=np.int64))
+
+    def unpack(self, start_row=0, stop_row=None):
+        """Rows start_row..stop_row as a (rows, columns) uint8 array of 0s and 1s"""
+        words = self.words[start_row:stop_row].astype("<u8", copy=False)  # byte order has to be little-endian
+        bits = np.unpackbits(words.view(np.uint8), axis=1, bitorder="little")
+        return bits[:, :self.columns]
+
+    def to_array(self):
+        return self.unpack()
+
+    def iter_cells(self, stripe_rows=256):
+        """Yields live cells, unpacking only a stripe of rows at a time (a whole 10k x 10k board would be 100 MB)"""
+        for start in range(0, self.rows, stripe_rows):
+            xs, ys = np.nonzero(self.unpack(start, start + stripe_rows))
+            yield from zip((xs + start).tolist(), ys.tolist())
+
+    @property
+    def cells(self):
+        return list(self.iter_cells())
+
+    def load(self, cells):
+        self.clear()
+        coords = cell_array(cells, self.rows, self.columns)
+        xs, ys = coords[:, 0], coords[:, 1]
+        bits = np.left_shift(ONE, (ys % WORD_BITS).astype(np.uint64))
+        np.bitwise_or.at(self.words, (xs, ys // WORD_BITS), bits)
+
+    def load_array(self, board):
+        """Replaces the board with a 2D array of 0s and 1s (its shape becomes the board size)"""
+        self.rows, self.columns = board.shape
+        self._allocate()
+        self.generation = 0
+
+        padded = np.zeros((self.rows, self.word_count * WORD_BITS), dtype=np.uint8)
+        padded[:, :self.columns] = board != 0
+        packed = np.packbits(padded, axis=1, bitorder="little")
+        self.words[:] = packed.view("<u8")
+
+    def load_words(self, words):
+        """Replaces the board with (rows, word_count) uint64 words as they are, no copy (e.g. a memory-mapped file)"""
+        if words.shape != (self.rows, self.word_count):
+            raise ValueError(f"Expected words of shape {(self.rows, self.word_count)}, got {words.shape}")
+
+        self.words = words
+        tail = words[:, -1]
+        if (tail & ~self._tail_mask).any():  # bits past the last column have to be 0 (only written if they aren't)
+            tail &= self._tail_mask
+
+    def step_delta(self, n=1):
+        before = self.words
+        self.step(n)  # every generation is a new array, before stays as it was
+
+        # only unpack rows where some word changed
+        births, deaths = [], []
+        changed_rows = np.nonzero((before != self.words).any(axis=1))[0]
+        for x in changed_rows.tolist():
+            old, new = before[x:x + 1], self.words[x:x + 1]
+            for words, cells in ((new & ~old, births), (old & ~new, deaths)):
+                bits = np.unpackbits(words.astype("<u8", copy=False).view(np.uint8), bitorder="little")
+                cells.extend((x, y) for y in np.nonzero(bits[:self.columns])[0].tolist())
+        return Delta(births=births, deaths=deaths)
+
+    ## Csv layouts
+
+    @classmethod
+    def from_csv(cls, filename, wrap=False):
+        rows, columns, cells, rule = read_csv(filename)
+        engine = cls(rows=rows, columns=columns, wrap=wrap)
+        if rule is not None:
+            engine.rule = rule
+        engine.load(cells)
+        return engine
+
+    def to_csv(self, filename):
+        write_csv(filename, self.rows, self.columns, self.iter_cells(), self.rule)
+
+    ## Evolution
+
+    def _west_east(self, words):
+        """Words shifted so every bit sees its y - 1 (west) and y + 1 (east) neighbour"""
+        # carry the bit that crosses a word boundary over from the neighbouring word
+        west = words << ONE
+        west[:, 1:] |= words[:, :-1] >> HIGH_BIT_SHIFT
+
+        east = words >> ONE
+        east[:, :-1] |= words[:, 1:] << HIGH_BIT_SHIFT
+
+        if self.wrap:
+            last_word, last_bit = self._bit(self.columns - 1)
+            last_shift = np.uint64(self.columns - 1 - last_word * WORD_BITS)
+
+            # y = 0 sees y = columns - 1 as its west neighbour and vice versa
+            west[:, 0] |= (words[:, last_word] >> last_shift) & ONE
+            east[:, last_word] &= ~last_bit
+            east[:, last_word] |= (words[:, 0] & ONE) << last_shift
+
+        return west, east
+
+    def _north_south(self, words):
+        """Rows shifted so every row sees its x - 1 (north) and x + 1 (south) neighbour"""
+        if self.wrap:
+            return np.roll(words, 1, axis=0), np.roll(words, -1, axis=0)
+
+        north = np.zeros_like(words)
+        north[1:] = words[:-1]
+        south = np.zeros_like(words)
+        south[:-1] = words[1:]
+        return north, south
+
+    def _step_once(self):
+        words = self.words
+
+        north, south = self._north_south(words)
+        north_west, north_east = self._west_east(north)
+        west, east = self._west_east(words)
+        south_west, south_east = self._west_east(south)
+
+        new_words = life_bits(north_west, north, north_east, west, east, south_west, south, south_east, words,
+                              self.rule)
+        new_words[:, -1] &= self._tail_mask
+
+        self.words = new_words
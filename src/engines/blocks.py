@@ -0,0 +1,155 @@
+"""
+Block engine: the board is advanced 2x2 cells at a time by looking up a precomputed table
+
+Every 2x2 block's next state only depends on the 4x4 block around it (the block plus a 1 cell ring),
+16 cells are a 16 bit number, so all 65536 possible 4x4 blocks get their centre 2x2 computed once per
+rule. A generation is then: pack the overlapping 4x4 blocks into 16 bit indices (a multiply and a few
+shifted-slice ors) and one table lookup per 2x2 block, no neighbour counting at all.
+Tables are cached on disk (TABLE_FOLDER), one .npy file per rule
+
+ engine = make_engine("blocks", rows=512, columns=512)
+"""
+
+import os
+
+import numpy as np
+
+from engines.dense import DenseEngine
+
+TABLE_FOLDER = os.path.join(os.path.expanduser("~"), ".cache", "game-of-life")
+
+# rule -> table, tables already loaded or built in this process
+_tables = dict()
+
+# multiplier that moves bits 0, 8, 16 and 24 of a uint32 to bits 24, 25, 26 and 27
+GATHER_BYTES = np.uint32(1 << 24 | 1 << 17 | 1 << 10 | 1 << 3)
+
+
+def build_table(rule):
+    """(65536, 2, 2) uint8 array: next state of the centre 2x2 of every 4x4 block, bit 4 * a + b is cell [a, b]"""
+    indices = np.arange(1 << 16, dtype=np.uint32)
+    blocks = ((indices[:, None] >> np.arange(16, dtype=np.uint32)) & 1).astype(np.uint8).reshape(-1, 4, 4)
+    rule_table = np.array(rule.table, dtype=np.uint8)
+
+    table = np.empty((1 << 16, 2, 2), dtype=np.uint8)
+    for a in range(2):
+        for b in range(2):
+            # 3x3 around centre cell [1 + a, 1 + b], minus the cell itself
+            alive = blocks[:, 1 + a, 1 + b]
+            counts = blocks[:, a:a + 3, b:b + 3].sum(axis=(1, 2), dtype=np.uint8) - alive
+            table[:, a, b] = rule_table[9 * alive + counts]
+    return table
+
+
+def block_table(rule, folder=TABLE_FOLDER):
+    """Table of a rule: from memory, from the disk cache or built (and cached) if it isn't there yet"""
+    table = _tables.get(rule)
+    if table is not None:
+        return table
+
+    filename = os.path.join(folder, f"blocks-{str(rule).replace('/', '_')}.npy") if folder else None
+    if filename is not None:
+        try:
+            table = np.load(filename)
+            if table.shape != (1 << 16, 2, 2) or table.dtype != np.uint8:
+                table = None  # some other file, built again below
+        except (OSError, ValueError):
+            table = None
+
+    if table is None:
+        table = build_table(rule)
+        if filename is not None:
+            try:
+                os.makedirs(folder, exist_ok=True)
+                # written under another name first, so a half-written file is never loaded
+                temporary = f"{filename}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as file:
+                    np.save(file, table)
+                os.replace(temporary, filename)
+            except OSError:  # read-only home etc, the table is only kept in memory then
+                pass
+
+    _tables[rule] = table
+    return table
+
+
+class BlockEngine(DenseEngine):
+    name = "blocks"
+
+    def __init__(self, rows=20, columns=20, wrap=False, table_folder=TABLE_FOLDER):
+        self.table_folder = table_folder  # None: don't cache tables on disk
+        super().__init__(rows, columns, wrap)
+        self._rule_changed()
+
+    def _rule_changed(self):
+        # top and bottom row (2 cells, 2 bytes) of every 4x4 block's next centre, as uint16 to be written
+        # straight into two board rows at once
+        table = block_table(self.rule, self.table_folder)
+        self._top = np.ascontiguousarray(table[:, 0]).view(np.uint16).reshape(-1)
+        self._bottom = np.ascontiguousarray(table[:, 1]).view(np.uint16).reshape(-1)
+
+    def _allocate(self):
+        super()._allocate()
+        rows, columns = self.rows, self.columns
+
+        # the board is covered by block_rows x block_columns 2x2 blocks (one row/column past the board if odd),
+        # board and spare are views of buffers of the whole blocks
+        block_rows, block_columns = -(-rows // 2), -(-columns // 2)
+        self._full = np.zeros((2 * block_rows, 2 * block_columns), dtype=np.uint8)
+        self._spare_full = np.zeros_like(self._full)
+        self.board = self._full[:rows, :columns]
+        self._spare = self._spare_full[:rows, :columns]
+
+        # padded board: 1 cell border and room for the last 4x4 block
+        padded = self._block_padded = np.zeros((2 * block_rows + 2, 2 * block_columns + 2), dtype=np.uint8)
+        # padded[x, 2j..2j + 3] as one little-endian uint32 for every block column j (overlapping, 2 bytes apart)
+        self._words = np.ndarray((padded.shape[0], block_columns), dtype="<u4", buffer=padded,
+                                 strides=(padded.strides[0], 2))
+
+        # scratch buffers, reused every generation
+        self._products = np.zeros((padded.shape[0], block_columns), dtype=np.uint32)
+        self._row_codes = np.zeros((padded.shape[0], block_columns), dtype=np.uint16)
+        self._pairs = np.zeros((block_rows + 1, block_columns), dtype=np.uint16)
+        self._shifted = np.zeros((block_rows + 1, block_columns), dtype=np.uint16)
+        self._indices = np.zeros((block_rows, block_columns), dtype=np.uint16)
+        self._lookup = np.zeros((block_rows, block_columns), dtype=np.uint16)  # gathering into contiguous memory is faster
+
+    def _pack_indices(self):
+        """16 bit index of the 4x4 block around every 2x2 block, bit 4 * a + b is padded[2i + a, 2j + b]"""
+        board, padded = self.board, self._block_padded
+        rows, columns = self.rows, self.columns
+
+        padded[1:rows + 1, 1:columns + 1] = board
+        if self.wrap:
+            padded[0, 1:columns + 1] = board[-1]
+            padded[rows + 1, 1:columns + 1] = board[0]
+            padded[:, 0] = padded[:, columns]  # corners come along with the columns
+            padded[:, columns + 1] = padded[:, 1]
+
+        # 4 cells of a row (bytes 0, 8, 16, 24 of a word) into 4 bits: one multiply moves them to bits 24-27
+        # (bytes are 0 or 1, so the partial products never overlap and nothing carries)
+        np.multiply(self._words, GATHER_BYTES, out=self._products)
+        codes = self._row_codes
+        np.right_shift(self._products, 24, out=codes, casting="unsafe")
+
+        # two rows of a block -> 8 bits, the 4x4 block is this pair and the next one
+        pairs, shifted, indices = self._pairs, self._shifted, self._indices
+        np.left_shift(codes[1::2], 4, out=shifted)
+        np.bitwise_or(codes[0::2], shifted, out=pairs)
+        np.left_shift(pairs[1:], 8, out=indices)
+        indices |= pairs[:-1]
+        return indices
+
+    def _step_once(self):
+        indices = self._pack_indices()
+
+        # each block's 2 cells of a row are 2 bytes next to each other: even rows get the top row of
+        # every block, odd rows the bottom row
+        rows_of_pairs, lookup = self._spare_full.view(np.uint16), self._lookup
+        np.take(self._top, indices, out=lookup, mode="clip")
+        rows_of_pairs[0::2] = lookup
+        np.take(self._bottom, indices, out=lookup, mode="clip")
+        rows_of_pairs[1::2] = lookup
+
+        self.board, self._spare = self._spare, self.board
+        self._full, self._spare_full = self._spare_full, self._full
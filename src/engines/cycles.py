@@ -0,0 +1,106 @@
+"""
+Detecting when a board stops changing: empty board, still life or a cycle of period p
+
+The board is identified by a Zobrist hash: XOR of a pseudo-random 64-bit key of every live cell.
+A cell that is born or dies flips its key in and out, so the hash is updated in O(births + deaths)
+per generation. Hashes of the last max_period generations are kept, a hash seen again means
+the board repeats (64-bit hashes, a false match is practically impossible)
+
+ detector = CycleDetector()
+ detector.reset(engine.cells, engine.generation)
+ while True:
+     births, deaths = engine.step_delta()
+     cycle = detector.update(births, deaths, engine.generation)
+     if cycle:
+         print(cycle)  # e.g. "period 2 from generation 14"
+         break
+"""
+
+from collections import deque, namedtuple
+
+MASK64 = (1 << 64) - 1
+
+
+def cell_key(x, y):
+    """Zobrist key of a cell: splitmix64 of its coordinates (works for any (x, y), no table needed)"""
+    z = (((x & 0xFFFFFFFF) << 32) | (y & 0xFFFFFFFF)) + 0x9E3779B97F4A7C15 & MASK64
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+    return z ^ (z >> 31)
+
+
+class Cycle(namedtuple("Cycle", ["period", "start_generation", "empty"])):
+    """Board repeats every period generations from start_generation on (period 1 is a still life)"""
+
+    def __str__(self):
+        if self.empty:
+            return f"empty from generation {self.start_generation}"
+        if self.period == 1:
+            return f"still life from generation {self.start_generation}"
+        return f"period {self.period} from generation {self.start_generation}"
+
+
+class CycleDetector:
+    def __init__(self, max_period=1024):
+        self.max_period = max_period
+
+        self.hash = 0
+        self.population = 0
+
+        # bounded table of recent hashes: hash -> generation, oldest evicted first
+        self._seen = dict()
+        self._recent = deque()
+
+    def reset(self, cells, generation=0):
+        """Starts over from a board (after edits, loading etc, when the history doesn't apply anymore)"""
+        self.hash = 0
+        self.population = 0
+        for (x, y) in cells:
+            self.hash ^= cell_key(x, y)
+            self.population += 1
+
+        self._seen.clear()
+        self._recent.clear()
+        self._remember(generation)
+
+    def _remember(self, generation):
+        self._seen[self.hash] = generation
+        self._recent.append((self.hash, generation))
+
+        while len(self._recent) > self.max_period:
+            old_hash, old_generation = self._recent.popleft()
+            if self._seen.get(old_hash) == old_generation:
+                del self._seen[old_hash]
+
+    def update(self, births, deaths, generation):
+        """Feeds one generation's births and deaths, returns a Cycle if the board repeats (or is empty)"""
+        key = cell_key
+        for (x, y) in births:
+            self.hash ^= key(x, y)
+            self.population += 1
+        for (x, y) in deaths:
+            self.hash ^= key(x, y)
+            self.population -= 1
+
+        if self.population == 0:
+            return Cycle(period=1, start_generation=generation, empty=True)
+
+        seen_at = self._seen.get(self.hash)
+        self._remember(generation)
+        if seen_at is not None:
+            return Cycle(period=generation - seen_at, start_generation=seen_at, empty=False)
+
+        return None
+
+
+def run_until_cycle(engine, max_generations, max_period=1024):
+    """Evolves until the board repeats (or is empty) or max_generations have passed, returns a Cycle or None"""
+    detector = CycleDetector(max_period)
+    detector.reset(engine.cells, engine.generation)
+
+    for frame in engine.iter_generations(stop=engine.generation + max_generations + 1):
+        cycle = detector.update(frame.births, frame.deaths, frame.generation)
+        if cycle:
+            return cycle
+
+    return None
@@ -0,0 +1,167 @@
+"""
+Dense engine: the whole board is a NumPy uint8 array, one generation is a handful of array operations
+
+Neighbour sums are 8 shifted-slice adds over a padded copy of the board (no Python loop over cells),
+which pays off for big and busy boards (20-50% density soups etc)
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from engines.base import Engine, Delta
+from engines.rules import LIFE
+
+
+def cell_array(cells, rows, columns):
+    """(n, 2) array of the cells' coordinates that are on a rows x columns board"""
+    # fromiter over the flattened coordinates, no Python call per cell
+    coords = np.fromiter(chain.from_iterable(cells), dtype=np.intp).reshape(-1, 2)
+    xs, ys = coords[:, 0], coords[:, 1]
+    return coords[(xs >= 0) & (xs < rows) & (ys >= 0) & (ys < columns)]
+
+
+def padded_neighbour_counts(padded, counts):
+    """
+    Live neighbour counts (0-8) of the inner part of a board with a 1 cell border, written into counts.
+    Boards are the last 2 axes, so a (boards, rows, columns) stack of boards works too
+    """
+    # sum of the 8 shifted views of the padded board
+    np.add(padded[..., :-2, :-2], padded[..., :-2, 1:-1], out=counts)
+    counts += padded[..., :-2, 2:]
+    counts += padded[..., 1:-1, :-2]
+    counts += padded[..., 1:-1, 2:]
+    counts += padded[..., 2:, :-2]
+    counts += padded[..., 2:, 1:-1]
+    counts += padded[..., 2:, 2:]
+
+    return counts
+
+
+def apply_rule(counts, board, out, rule=LIFE):
+    """Next generation into out (uint8), counts is overwritten"""
+    if rule.is_life:
+        # B3/S23: (count | alive) == 3 is true for 3 neighbours, or for 2 neighbours and alive
+        counts |= board
+        np.equal(counts, 3, out=out.view(np.bool_))
+        return out
+
+    # any other rule: one lookup per cell in the rule's table, at 9 * alive + count (out is the scratch space)
+    np.multiply(board, 9, out=out)
+    counts += out
+    np.take(rule_array(rule), counts, out=out, mode="clip")
+    return out
+
+
+_rule_arrays = dict()
+
+
+def rule_array(rule):
+    """The rule's table as a uint8 array, made once per rule"""
+    table = _rule_arrays.get(rule)
+    if table is None:
+        table = _rule_arrays[rule] = np.array(rule.table, dtype=np.uint8)
+    return table
+
+
+class DenseEngine(Engine):
+    name = "dense"
+
+    def __init__(self, rows=20, columns=20, wrap=False):
+        super().__init__(rows, columns, wrap)
+        self._allocate()
+
+    def _allocate(self):
+        # board[x, y] is 1 for a live cell, 0 for a dead one
+        self.board = np.zeros((self.rows, self.columns), dtype=np.uint8)
+
+        # scratch buffers, reused every generation so stepping doesn't allocate
+        # padded has a 1 cell border around the board: zeros (bounded) or the opposite edge (wrap)
+        self._padded = np.zeros((self.rows + 2, self.columns + 2), dtype=np.uint8)
+        self._counts = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        self._spare = np.zeros((self.rows, self.columns), dtype=np.uint8)  # next generation is written here
+
+    @property
+    def cells(self):
+        xs, ys = np.nonzero(self.board)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    @property
+    def population(self):
+        return int(np.count_nonzero(self.board))
+
+    def is_alive(self, x, y):
+        return self.in_bounds(x, y) and bool(self.board[x, y])
+
+    def set_cell(self, x, y, alive):
+        self.board[x, y] = 1 if alive else 0
+
+    def load(self, cells):
+        # bulk assignment instead of a set_cell call per cell
+        self.clear()
+        coords = cell_array(cells, self.rows, self.columns)
+        self.board[coords[:, 0], coords[:, 1]] = 1
+
+    def to_array(self):
+        # no copy, the array is only valid until the next step
+        return self.board
+
+    def bounding_box(self):
+        # first and last row and column with a live cell, without listing cells
+        xs = np.flatnonzero(self.board.any(axis=1))
+        if len(xs) == 0:
+            return None
+        ys = np.flatnonzero(self.board.any(axis=0))
+        return int(xs[0]), int(ys[0]), int(xs[-1]), int(ys[-1])
+
+    def load_array(self, board):
+        """Replaces the board with a 2D array of 0s and 1s (its shape becomes the board size)"""
+        self.rows, self.columns = board.shape
+        self._allocate()
+        self.board[:] = board != 0
+        self.generation = 0
+
+    def resize(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self._allocate()
+        self.generation = 0
+
+    def _clear(self):
+        self.board.fill(0)
+
+    def neighbour_counts(self):
+        """Array of live neighbour counts (0-8) for every cell"""
+        board, padded, counts = self.board, self._padded, self._counts
+
+        padded[1:-1, 1:-1] = board
+        if self.wrap:
+            padded[0, 1:-1] = board[-1]
+            padded[-1, 1:-1] = board[0]
+            padded[:, 0] = padded[:, -2]  # corners come along with the columns
+            padded[:, -1] = padded[:, 1]
+
+        return padded_neighbour_counts(padded, counts)
+
+    def _previous_board(self):
+        """Board of the generation before, right after a single step (the buffers were swapped, nothing copied)"""
+        return self._spare
+
+    def step_delta(self, n=1):
+        if n == 1:
+            self.step()
+            before = self._previous_board()
+        else:  # the spare buffer only goes back one generation
+            before = self.board.copy()
+            self.step(n)
+
+        # cells that differ, split by their new state
+        xs, ys = np.nonzero(before != self.board)
+        alive = self.board[xs, ys].astype(bool)
+        births = list(zip(xs[alive].tolist(), ys[alive].tolist()))
+        deaths = list(zip(xs[~alive].tolist(), ys[~alive].tolist()))
+        return Delta(births=births, deaths=deaths)
+
+    def _step_once(self):
+        apply_rule(self.neighbour_counts(), self.board, self._spare, self.rule)
+        self.board, self._spare = self._spare, self.board
@@ -0,0 +1,322 @@
+"""
+HashLife engine: the plane is a quadtree of canonical (hash-consed) nodes, results are memoized per node
+
+A node of level k is a 2^k x 2^k square made of 4 level k-1 quadrants (level 0 nodes are single cells).
+Equal squares are the same Node object, so the result of evolving a square is computed only once.
+successor() advances the centre of a node 2^j generations in one go, which makes
+jumping a million generations forward take milliseconds for regular patterns (guns, puffers)
+
+The plane is unbounded, rows x columns is only the part that is shown (cells outside it keep living).
+The node cache is bounded: when it grows past max_nodes, everything not reachable from the current
+board is dropped (see collect_garbage)
+"""
+
+from engines.base import Engine
+
+
+class Node:
+    """Canonical quadtree node, don't create these directly but through HashLifeEngine.join"""
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population")
+
+    def __init__(self, level, nw, ne, sw, se, population):
+        self.level = level
+        # quadrants: west/east is lower/higher x, north/south is lower/higher y
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.population = population
+
+
+OFF = Node(0, None, None, None, None, 0)
+ON = Node(0, None, None, None, None, 1)
+
+
+class HashLifeEngine(Engine):
+    name = "hashlife"
+
+    def __init__(self, rows=20, columns=20, wrap=False, max_nodes=1_000_000):
+        if wrap:
+            raise ValueError("HashLife engine works on an unbounded plane, wrapping edges are not supported")
+
+        super().__init__(rows, columns, wrap)
+
+        self.max_nodes = max_nodes
+
+        # (nw, ne, sw, se) -> canonical node
+        self._nodes = dict()
+        # (node, j) -> centre of node after 2^j generations
+        self._results = dict()
+        # level -> canonical empty node
+        self._empty = [OFF]
+
+        self.hits = 0
+        self.misses = 0
+        self.collections = 0
+
+        self._clear()
+
+    ## Building nodes
+
+    def join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(nw.level + 1, nw, ne, sw, se,
+                        nw.population + ne.population + sw.population + se.population)
+            self._nodes[key] = node
+        return node
+
+    def empty(self, level):
+        while len(self._empty) <= level:
+            e = self._empty[-1]
+            self._empty.append(self.join(e, e, e, e))
+        return self._empty[level]
+
+    def centre(self, node):
+        """Node one level up with given node in its centre"""
+        e = self.empty(node.level - 1)
+        return self.join(self.join(e, e, e, node.nw), self.join(e, e, node.ne, e),
+                         self.join(e, node.sw, e, e), self.join(node.se, e, e, e))
+
+    ## Board <-> quadtree
+
+    def _clear(self):
+        # root covers the board, its top left corner is at (origin_x, origin_y)
+        level = 3
+        while (1 << level) < max(self.rows, self.columns):
+            level += 1
+
+        self.root = self.empty(level)
+        self.origin_x = 0
+        self.origin_y = 0
+
+    def resize(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.clear()
+
+    def load(self, cells):
+        self.clear()
+
+        # build the tree bottom up: level by level, pair up children by their halved coordinates
+        level_nodes = {cell: ON for cell in cells if self.in_bounds(*cell)}
+        for level in range(self.root.level):
+            e = self.empty(level)
+            parents = dict()
+            for (x, y) in level_nodes:
+                parents[(x >> 1, y >> 1)] = None
+
+            get = level_nodes.get
+            for (px, py) in parents:
+                x, y = px << 1, py << 1
+                parents[(px, py)] = self.join(get((x, y), e), get((x + 1, y), e),
+                                              get((x, y + 1), e), get((x + 1, y + 1), e))
+            level_nodes = parents
+
+        if level_nodes:
+            self.root = level_nodes[(0, 0)]
+
+    def _expand_to(self, x, y):
+        """Grows the root until (x, y) is inside of it"""
+        size = 1 << self.root.level
+        while not (self.origin_x <= x < self.origin_x + size and self.origin_y <= y < self.origin_y + size):
+            self.origin_x -= size >> 1
+            self.origin_y -= size >> 1
+            self.root = self.centre(self.root)
+            size = 1 << self.root.level
+
+    def _set(self, node, x, y, alive):
+        if node.level == 0:
+            return ON if alive else OFF
+
+        half = 1 << (node.level - 1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if y < half:
+            if x < half:
+                nw = self._set(nw, x, y, alive)
+            else:
+                ne = self._set(ne, x - half, y, alive)
+        else:
+            if x < half:
+                sw = self._set(sw, x, y - half, alive)
+            else:
+                se = self._set(se, x - half, y - half, alive)
+        return self.join(nw, ne, sw, se)
+
+    def set_cell(self, x, y, alive):
+        self._expand_to(x, y)
+        self.root = self._set(self.root, x - self.origin_x, y - self.origin_y, alive)
+
+    def is_alive(self, x, y):
+        x -= self.origin_x
+        y -= self.origin_y
+        node = self.root
+        size = 1 << node.level
+        if not (0 <= x < size and 0 <= y < size):
+            return False
+
+        while node.level > 0 and node.population:
+            half = 1 << (node.level - 1)
+            if y < half:
+                node = node.nw if x < half else node.ne
+            else:
+                node = node.sw if x < half else node.se
+            x &= half - 1
+            y &= half - 1
+        return node.population == 1
+
+    def iter_cells(self):
+        """All live cells of the plane, including the ones outside of the board"""
+        stack = [(self.root, self.origin_x, self.origin_y)]
+        while stack:
+            node, x, y = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                yield (x, y)
+                continue
+
+            half = 1 << (node.level - 1)
+            stack.append((node.nw, x, y))
+            stack.append((node.ne, x + half, y))
+            stack.append((node.sw, x, y + half))
+            stack.append((node.se, x + half, y + half))
+
+    @property
+    def cells(self):
+        return [(x, y) for (x, y) in self.iter_cells() if self.in_bounds(x, y)]
+
+    @property
+    def total_population(self):
+        """Population of the whole plane (population only counts cells on the board)"""
+        return self.root.population
+
+    ## Evolution
+
+    def _life_4x4(self, node):
+        """Centre 2x2 of a level 2 node after one generation, the base case of successor"""
+        # 4x4 grid of 0s and 1s, grid[y][x]
+        grid = [[0] * 4 for _ in range(4)]
+        for qx, qy, quadrant in ((0, 0, node.nw), (2, 0, node.ne), (0, 2, node.sw), (2, 2, node.se)):
+            grid[qy][qx] = quadrant.nw.population
+            grid[qy][qx + 1] = quadrant.ne.population
+            grid[qy + 1][qx] = quadrant.sw.population
+            grid[qy + 1][qx + 1] = quadrant.se.population
+
+        table = self.rule.table
+
+        def next_state(x, y):
+            count = sum(grid[y + dy][x + dx] for dy in range(-1, 2) for dx in range(-1, 2)) - grid[y][x]
+            return ON if table[9 * grid[y][x] + count] else OFF
+
+        return self.join(next_state(1, 1), next_state(2, 1), next_state(1, 2), next_state(2, 2))
+
+    def successor(self, node, j):
+        """Centre (level k - 1) of a level k node, 2^j generations later (j <= k - 2)"""
+        if node.population == 0:
+            return node.nw
+
+        j = min(j, node.level - 2)
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        if node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            join, successor = self.join, self.successor
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+
+            # 9 overlapping level k - 1 squares, each advanced 2^j generations (half of the way if j is at max)
+            c1 = successor(join(nw.nw, nw.ne, nw.sw, nw.se), j)
+            c2 = successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = successor(join(ne.nw, ne.ne, ne.sw, ne.se), j)
+            c4 = successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = successor(join(sw.nw, sw.ne, sw.sw, sw.se), j)
+            c8 = successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = successor(join(se.nw, se.ne, se.sw, se.se), j)
+
+            if j < node.level - 2:
+                # already 2^j generations forward, only take the centre parts
+                result = join(join(c1.se, c2.sw, c4.ne, c5.nw), join(c2.se, c3.sw, c5.ne, c6.nw),
+                              join(c4.se, c5.sw, c7.ne, c8.nw), join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                # the other half of the way
+                result = join(successor(join(c1, c2, c4, c5), j), successor(join(c2, c3, c5, c6), j),
+                              successor(join(c4, c5, c7, c8), j), successor(join(c5, c6, c8, c9), j))
+
+        self._results[key] = result
+        return result
+
+    def _inner_population(self, node):
+        """Population of the centre quarter (level k - 2) of a node"""
+        return node.nw.se.se.population + node.ne.sw.sw.population + node.sw.ne.ne.population + node.se.nw.nw.population
+
+    def _advance(self, j):
+        """Moves the root 2^j generations forward"""
+        # pad until the whole pattern is in the centre quarter with at least 2^j cells of room around it,
+        # so it can't grow out of the result (patterns grow at most 1 cell per generation)
+        root = self.root
+        while root.level < j + 3 or self._inner_population(root) != root.population:
+            self.origin_x -= 1 << (root.level - 1)
+            self.origin_y -= 1 << (root.level - 1)
+            root = self.centre(root)
+
+        self.root = self.successor(root, j)
+        self.origin_x += 1 << (root.level - 2)
+        self.origin_y += 1 << (root.level - 2)
+
+    def step(self, n=1):
+        # n generations as a sum of powers of 2, every one of them is one successor call
+        j = 0
+        while n:
+            if n & 1:
+                self._advance(j)
+                self.generation += 1 << j
+                if len(self._nodes) > self.max_nodes:
+                    self.collect_garbage()
+            n >>= 1
+            j += 1
+
+    ## Cache
+
+    def _rule_changed(self):
+        self._results.clear()  # results of the old rule, nodes themselves don't depend on it
+
+    def collect_garbage(self):
+        """Drops all memoized results and every node that isn't part of the current board"""
+        self._results.clear()
+        self._nodes.clear()
+        self._empty = [OFF]
+        self.collections += 1
+
+        # re-register the nodes of the current board (they stay canonical, same objects)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in self._nodes:
+                self._nodes[key] = node
+                stack.extend(key)
+
+        # empty nodes are looked up through the table again, so they stay canonical too
+        self.empty(self.root.level)
+
+    def cache_report(self):
+        lookups = self.hits + self.misses
+        return {
+            "nodes": len(self._nodes),
+            "results": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "collections": self.collections,
+        }
@@ -0,0 +1,92 @@
+"""
+Life-like rules in B/S notation: "B3/S23" is born with 3 live neighbours, survives with 2 or 3 (Conway's Life)
+
+A rule is parsed once into a lookup table of next states, indexed by alive * 9 + live neighbour count,
+so engines look the next state up instead of checking counts one by one:
+
+ rule = parse_rule("B36/S23")   # or "highlife", "36/23" (S/B notation), "b36s23"
+ rule.table[9 * alive + count]  # 1 or 0
+
+Rules that give birth with 0 neighbours (B0) are not supported, on an unbounded plane every empty cell
+would be born. More rules: https://conwaylife.com/wiki/List_of_Life-like_rules
+"""
+
+import re
+from collections import namedtuple
+
+NAMED_RULES = {
+    "life": "B3/S23",
+    "highlife": "B36/S23",
+    "seeds": "B2/S",
+    "daynight": "B3678/S34678",
+    "day & night": "B3678/S34678",
+    "day and night": "B3678/S34678",
+    "lifewithoutdeath": "B3/S012345678",
+    "replicator": "B1357/S1357",
+    "2x2": "B36/S125",
+    "maze": "B3/S12345",
+    "diamoeba": "B35678/S5678",
+    "morley": "B368/S245",
+    "anneal": "B4678/S35678",
+}
+
+BS_NOTATION = re.compile(r"^b([0-8]*)/?s([0-8]*)$")  # B3/S23, b3s23
+SB_NOTATION = re.compile(r"^([0-8]*)/([0-8]*)$")  # 23/3 (survival first)
+
+
+class Rule(namedtuple("Rule", ["birth", "survival"])):
+    """birth and survival are frozensets of live neighbour counts"""
+
+    def __new__(cls, birth, survival):
+        birth, survival = frozenset(birth), frozenset(survival)
+        if 0 in birth:
+            raise ValueError("Rules with birth on 0 neighbours (B0) are not supported")
+        if not birth <= set(range(9)) or not survival <= set(range(9)):
+            raise ValueError("Neighbour counts have to be 0-8")
+
+        rule = super().__new__(cls, birth, survival)
+        # the one place where a rule is interpreted, engines use this
+        rule_table = [0] * 18
+        for count in range(9):
+            rule_table[count] = int(count in birth)
+            rule_table[9 + count] = int(count in survival)
+        rule._table = tuple(rule_table)
+        return rule
+
+    @property
+    def table(self):
+        """Next state indexed by alive * 9 + live neighbour count"""
+        return self._table
+
+    @property
+    def is_life(self):
+        return self == LIFE
+
+    def __str__(self):
+        return f"B{''.join(map(str, sorted(self.birth)))}/S{''.join(map(str, sorted(self.survival)))}"
+
+    def __repr__(self):
+        return f"Rule('{self}')"
+
+
+def parse_rule(rulestring):
+    """Rule from B/S notation ("B36/S23", "b36s23"), S/B notation ("23/36") or a name ("highlife")"""
+    if isinstance(rulestring, Rule):
+        return rulestring
+
+    text = rulestring.strip().lower()
+    text = NAMED_RULES.get(text, text).lower().replace(" ", "")
+
+    match = BS_NOTATION.match(text)
+    if match:
+        birth, survival = match.groups()
+    else:
+        match = SB_NOTATION.match(text)
+        if not match:
+            raise ValueError(f"Not a Life-like rule: '{rulestring}' (e.g. B3/S23, 23/3 or highlife)")
+        survival, birth = match.groups()
+
+    return Rule(map(int, birth), map(int, survival))
+
+
+LIFE = Rule({3}, {2, 3})
@@ -0,0 +1,81 @@
+"""
+Sparse engine: live cells are kept in a set, only live cells and their neighbours are checked
+
+Cost grows with population, not with board area (good for mostly empty boards)
+"""
+
+from collections import Counter
+
+from engines.base import Engine, Delta, NEIGHBOUR_OFFSETS
+
+
+class SparseEngine(Engine):
+    name = "sparse"
+
+    def __init__(self, rows=20, columns=20, wrap=False):
+        super().__init__(rows, columns, wrap)
+
+        # live cells as (x, y) tuples
+        self.live = set()
+
+    @property
+    def cells(self):
+        return self.live
+
+    @property
+    def population(self):
+        return len(self.live)
+
+    def is_alive(self, x, y):
+        return (x, y) in self.live
+
+    def set_cell(self, x, y, alive):
+        if alive:
+            self.live.add((x, y))
+        else:
+            self.live.discard((x, y))
+
+    def _clear(self):
+        self.live.clear()
+
+    def load(self, cells):
+        # one set comprehension instead of a set_cell call per cell
+        rows, columns = self.rows, self.columns
+        self.clear()
+        self.live = {(x, y) for (x, y) in cells if 0 <= x < rows and 0 <= y < columns}
+
+    def neighbour_counts(self):
+        """Live neighbour count for every cell that has at least one live neighbour"""
+        if self.wrap:
+            rows, columns = self.rows, self.columns
+            return Counter(((x + dx) % rows, (y + dy) % columns)
+                           for (x, y) in self.live for (dx, dy) in NEIGHBOUR_OFFSETS)
+
+        return Counter((x + dx, y + dy) for (x, y) in self.live for (dx, dy) in NEIGHBOUR_OFFSETS)
+
+    def step_delta(self, n=1):
+        # every generation is a new set, so the old one can be compared against without copying
+        before = self.live
+        self.step(n)
+        return Delta(births=self.live - before, deaths=before - self.live)
+
+    def _step_once(self):
+        live = self.live
+        rows, columns = self.rows, self.columns
+
+        counts = self.neighbour_counts()
+        if self.rule.is_life:
+            # B3/S23: born with 3 neighbours, survives with 2 or 3
+            self.live = {(x, y) for (x, y), count in counts.items()
+                         if (count == 3 or (count == 2 and (x, y) in live))
+                         and 0 <= x < rows and 0 <= y < columns}
+            return
+
+        # any other rule: next state from the rule's table, table[9 * alive + count]
+        table = self.rule.table
+        self.live = {(x, y) for (x, y), count in counts.items()
+                     if table[9 * ((x, y) in live) + count]
+                     and 0 <= x < rows and 0 <= y < columns}
+
+        if table[9]:  # S0: live cells without neighbours aren't counted at all, but survive
+            self.live.update(cell for cell in live if cell not in counts)
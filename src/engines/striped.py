@@ -0,0 +1,220 @@
+"""
+Striped engine: the board is split into horizontal stripes (ranges of x), one worker process per stripe
+
+The board lives in multiprocessing.shared_memory as two buffers: generation g is read from one and
+written into the other, so nothing is pickled between processes. Every generation a worker reads its
+stripe plus the one row halo above and below it straight from shared memory, and all workers meet
+at a barrier before the next generation (the only synchronisation there is).
+Workers are started once and kept waiting for step commands, so the per-step cost is one message per worker.
+A worker that dies or hangs breaks the barrier (after BARRIER_TIMEOUT) and step raises a RuntimeError
+
+For big boards (4096x4096 and up) on many cores, on small boards the dense engine is faster
+
+Scaling report (run from src/):
+ python benchmark.py scaling --size 4096 --generations 50
+"""
+
+import multiprocessing as mp
+import os
+import time
+import weakref
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from threading import BrokenBarrierError
+
+import numpy as np
+
+from engines.dense import DenseEngine, padded_neighbour_counts, apply_rule
+
+# seconds a worker waits for the others at the end of a generation, longer means one of them is gone
+BARRIER_TIMEOUT = 60
+
+
+def stripe_bounds(rows, workers):
+    """[(first_x, last_x + 1), ...] of workers roughly equal stripes"""
+    edges = [rows * i // workers for i in range(workers + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _stripe_worker(buffer_names, rows, columns, x0, x1, wrap, barrier, connection):
+    buffers = [shared_memory.SharedMemory(name=name) for name in buffer_names]
+    boards = [np.ndarray((rows, columns), dtype=np.uint8, buffer=shm.buf) for shm in buffers]
+
+    padded = np.zeros((x1 - x0 + 2, columns + 2), dtype=np.uint8)
+    counts = np.zeros((x1 - x0, columns), dtype=np.uint8)
+    board = next_board = None
+
+    while True:
+        command = connection.recv()
+        if command is None:  # stop
+            break
+
+        current, generations, rule = command
+        try:
+            for _ in range(generations):
+                board, next_board = boards[current], boards[1 - current]
+
+                # own stripe plus halo rows from the neighbouring stripes
+                padded[1:-1, 1:-1] = board[x0:x1]
+                if x0 > 0 or wrap:
+                    padded[0, 1:-1] = board[x0 - 1]  # x0 - 1 == -1 is the last row when wrapping
+                if x1 < rows or wrap:
+                    padded[-1, 1:-1] = board[x1 % rows]
+                if wrap:
+                    padded[:, 0] = padded[:, -2]
+                    padded[:, -1] = padded[:, 1]
+
+                padded_neighbour_counts(padded, counts)
+                apply_rule(counts, board[x0:x1], next_board[x0:x1], rule)
+
+                current = 1 - current
+                barrier.wait(BARRIER_TIMEOUT)  # everyone has written their stripe of the next generation
+        except BrokenBarrierError:  # another worker died or hung, the board is half a generation
+            connection.send(("error", f"a worker didn't finish a generation within {BARRIER_TIMEOUT} s"))
+            break
+
+        connection.send(current)
+
+    del boards, board, next_board
+    for shm in buffers:
+        shm.close()
+
+
+def _shutdown(processes, connections, buffers):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join(timeout=1)
+        if process.is_alive():  # hung (or stopped), SIGTERM wouldn't get through
+            process.kill()
+    for shm in buffers:
+        try:
+            shm.close()
+        except BufferError:  # someone still holds a view of the board, memory is freed when they let go
+            pass
+        shm.unlink()
+
+
+class StripedEngine(DenseEngine):
+    name = "striped"
+
+    def __init__(self, rows=20, columns=20, wrap=False, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._finalizer = None
+        super().__init__(rows, columns, wrap)
+
+    def _allocate(self):
+        self.close()
+
+        self._buffers = [shared_memory.SharedMemory(create=True, size=max(self.rows * self.columns, 1))
+                         for _ in range(2)]
+        self._boards = [np.ndarray((self.rows, self.columns), dtype=np.uint8, buffer=shm.buf)
+                        for shm in self._buffers]
+        for board in self._boards:
+            board.fill(0)
+        self._current = 0
+
+        # no more workers than rows
+        workers = max(1, min(self.workers, self.rows))
+        barrier = mp.Barrier(workers)
+        self._connections = []
+        self._processes = []
+        for (x0, x1) in stripe_bounds(self.rows, workers):
+            parent_end, child_end = mp.Pipe()
+            process = mp.Process(target=_stripe_worker, daemon=True,
+                                 args=([shm.name for shm in self._buffers], self.rows, self.columns,
+                                       x0, x1, self.wrap, barrier, child_end))
+            process.start()
+            child_end.close()  # so a crashed worker shows up as EOFError instead of a hang
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+        self._finalizer = weakref.finalize(self, _shutdown, self._processes, self._connections, self._buffers)
+
+    def close(self):
+        """Stops worker processes and frees shared memory"""
+        if self._finalizer is not None:
+            self._boards = []
+            self._finalizer()
+            self._finalizer = None
+
+    @property
+    def board(self):
+        return self._boards[self._current]
+
+    @board.setter
+    def board(self, value):
+        self._boards[self._current][:] = value
+
+    def _previous_board(self):
+        return self._boards[1 - self._current]  # workers write every generation into the other board
+
+    def step(self, n=1):
+        if n <= 0:
+            return
+
+        failure = None
+        started = []  # only workers that got the command will answer
+        for connection in self._connections:
+            try:
+                connection.send((self._current, n, self.rule))
+                started.append(connection)
+            except OSError:  # broken pipe, it's gone
+                failure = "a worker process died"
+        pending = started
+        while pending:
+            # once something went wrong, the others answer within BARRIER_TIMEOUT or they're hung too
+            ready = wait(pending, timeout=None if failure is None else BARRIER_TIMEOUT)
+            if not ready:
+                failure = failure or "a worker process stopped answering"
+                break
+            for connection in ready:
+                pending.remove(connection)
+                try:
+                    reply = connection.recv()
+                except (EOFError, OSError):  # crashed (e.g. out of memory or killed)
+                    reply = ("error", "a worker process died")
+                if isinstance(reply, tuple):
+                    failure = failure or reply[1]
+                else:
+                    self._current = reply
+
+        if failure is not None:
+            self.close()  # the others are stopped too, the board can't be trusted anymore
+            raise RuntimeError(f"Striped engine stopped: {failure}")
+        self.generation += n
+
+
+def scaling_report(size=4096, generations=20, worker_counts=None, density=0.35, seed=0):
+    """Generations/sec of a random soup for every worker count, compared to 1 worker"""
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus} | {cpus})
+
+    soup = (np.random.default_rng(seed).random((size, size)) < density).astype(np.uint8)
+
+    report = []
+    for workers in worker_counts:
+        engine = StripedEngine(size, size, workers=workers)
+        engine.load_array(soup)
+        engine.step()  # warm up
+
+        start = time.perf_counter()
+        engine.step(generations)
+        seconds = time.perf_counter() - start
+        engine.close()
+
+        gens_per_sec = generations / seconds
+        speedup = gens_per_sec / report[0]["gens_per_sec"] * report[0]["workers"] if report else 1.0
+        report.append({
+            "workers": workers,
+            "seconds": round(seconds, 4),
+            "gens_per_sec": round(gens_per_sec, 2),
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup / workers, 2),
+        })
+
+    return report
@@ -0,0 +1,190 @@
+"""
+Tiled engine: an unbounded plane stored as 64x64 tiles in a dict, only active tiles are recomputed
+
+A tile is only recomputed if it or one of its 8 neighbouring tiles changed in the last generation
+(otherwise its neighbourhood is the same as before and so is its next state).
+Tiles that become empty are freed, so cost follows the active frontier, not the covered area:
+gliders, spaceships and puffers can travel forever.
+
+Pure Python, every tile is one big integer during a generation: 66 x 66 bits with the 1 cell border
+copied over from neighbouring tiles, and all of its cells are evolved at once with bit-parallel adders
+
+The board (rows x columns) is only the part that is shown, like with the hashlife engine
+"""
+
+from engines.base import Engine, Delta, life_bits
+
+TILE_SIZE = 64
+TILE_SHIFT = 6  # TILE_SIZE == 1 << TILE_SHIFT
+TILE_MASK = TILE_SIZE - 1
+
+# padded tile: every row has 66 bits (1 border bit at both ends), 66 rows
+STRIDE = TILE_SIZE + 2
+ROW_MASK = (1 << TILE_SIZE) - 1
+
+EMPTY_TILE = (0,) * TILE_SIZE
+
+
+class TiledEngine(Engine):
+    name = "tiled"
+
+    def __init__(self, rows=20, columns=20, wrap=False):
+        if wrap:
+            raise ValueError("Tiled engine works on an unbounded plane, wrapping edges are not supported")
+
+        super().__init__(rows, columns, wrap)
+
+        # (tile_x, tile_y) -> tuple of 64 ints, int number lx has bit ly set if cell
+        # (tile_x * 64 + lx, tile_y * 64 + ly) is alive
+        self.tiles = dict()
+
+        # tiles that changed in the last generation (or were edited)
+        self.changed = set()
+        # rows the tiles changed in the last generation had before it (for step_delta)
+        self._previous = dict()
+
+    ## Cell access
+
+    def _tile_of(self, x, y):
+        return (x >> TILE_SHIFT, y >> TILE_SHIFT), x & TILE_MASK, y & TILE_MASK
+
+    def is_alive(self, x, y):
+        tile, lx, ly = self._tile_of(x, y)
+        return bool(self.tiles.get(tile, EMPTY_TILE)[lx] >> ly & 1)
+
+    def set_cell(self, x, y, alive):
+        tile, lx, ly = self._tile_of(x, y)
+        tile_rows = list(self.tiles.get(tile, EMPTY_TILE))
+
+        if alive:
+            tile_rows[lx] |= 1 << ly
+        else:
+            tile_rows[lx] &= ~(1 << ly)
+
+        self._put(tile, tuple(tile_rows))
+        self.changed.add(tile)
+
+    def _put(self, tile, tile_rows):
+        if any(tile_rows):
+            self.tiles[tile] = tile_rows
+        else:
+            self.tiles.pop(tile, None)  # empty tiles are freed
+
+    def _clear(self):
+        self.tiles.clear()
+        self.changed.clear()
+
+    def load(self, cells):
+        self.clear()
+
+        # group cells by tile first, then build every tile in one go
+        grouped = dict()
+        for (x, y) in cells:
+            if self.in_bounds(x, y):
+                tile, lx, ly = self._tile_of(x, y)
+                grouped.setdefault(tile, [0] * TILE_SIZE)[lx] |= 1 << ly
+
+        for tile, tile_rows in grouped.items():
+            self._put(tile, tuple(tile_rows))
+        self.changed = set(self.tiles)
+
+    def iter_cells(self):
+        """All live cells of the plane, including the ones outside of the board"""
+        for (tile_x, tile_y), tile_rows in self.tiles.items():
+            x0, y0 = tile_x << TILE_SHIFT, tile_y << TILE_SHIFT
+            for lx, row in enumerate(tile_rows):
+                while row:
+                    low_bit = row & -row
+                    yield (x0 + lx, y0 + low_bit.bit_length() - 1)
+                    row ^= low_bit
+
+    @property
+    def cells(self):
+        return [(x, y) for (x, y) in self.iter_cells() if self.in_bounds(x, y)]
+
+    @property
+    def total_population(self):
+        """Population of the whole plane (population only counts cells on the board)"""
+        return sum(row.bit_count() for tile_rows in self.tiles.values() for row in tile_rows)
+
+    ## Evolution
+
+    def _padded(self, tile):
+        """Tile with a 1 cell border from its neighbours as one integer, padded row r is local x = r - 1"""
+        tile_x, tile_y = tile
+        get = self.tiles.get
+
+        padded = 0
+        for dx, first, last in ((-1, TILE_MASK, TILE_SIZE), (0, 0, TILE_SIZE), (1, 0, 1)):
+            # tile above/below has only its last/first row in the border
+            west = get((tile_x + dx, tile_y - 1), EMPTY_TILE)
+            centre = get((tile_x + dx, tile_y), EMPTY_TILE)
+            east = get((tile_x + dx, tile_y + 1), EMPTY_TILE)
+
+            for lx in range(first, last):
+                padded = (padded << STRIDE) | ((east[lx] & 1) << (TILE_SIZE + 1)) | (centre[lx] << 1) | (west[lx] >> TILE_MASK)
+
+        return padded
+
+    def _next_tile(self, tile):
+        """Next generation of a tile as a tuple of rows"""
+        padded = self._padded(tile)
+
+        # the 8 neighbours of every cell are the padded grid shifted by a row (STRIDE bits) and/or by a bit,
+        # the order doesn't matter for counting (bits that wrap into the next row only land on the border)
+        north = padded >> STRIDE
+        south = padded << STRIDE
+        result = life_bits(north >> 1, north, north << 1,
+                           padded >> 1, padded << 1,
+                           south >> 1, south, south << 1,
+                           padded, self.rule)
+
+        # inner 64 rows and bits of the 66 x 66 result
+        return tuple((result >> ((TILE_SIZE - lx) * STRIDE + 1)) & ROW_MASK for lx in range(TILE_SIZE))
+
+    def _rule_changed(self):
+        self.changed = set(self.tiles)  # every tile may evolve differently now
+
+    def _step_once(self):
+        # tiles to recompute: changed ones and their neighbours
+        candidates = set()
+        for (tile_x, tile_y) in self.changed:
+            for dx in range(-1, 2):
+                for dy in range(-1, 2):
+                    candidates.add((tile_x + dx, tile_y + dy))
+
+        # compute everything from the old state first, then swap in the new tiles
+        updates = []
+        for tile in candidates:
+            new_rows = self._next_tile(tile)
+            if new_rows != self.tiles.get(tile, EMPTY_TILE):
+                updates.append((tile, new_rows))
+
+        self._previous = {tile: self.tiles.get(tile, EMPTY_TILE) for tile, _ in updates}
+        for tile, new_rows in updates:
+            self._put(tile, new_rows)
+        self.changed = {tile for tile, _ in updates}
+
+    def step_delta(self, n=1):
+        # only tiles that changed are compared: their rows before the first of the n generations against now
+        before = dict()
+        for _ in range(n):
+            self._step_once()
+            self.generation += 1
+            for tile, tile_rows in self._previous.items():
+                before.setdefault(tile, tile_rows)
+
+        births, deaths = [], []
+        for (tile_x, tile_y), old_rows in before.items():
+            x0, y0 = tile_x << TILE_SHIFT, tile_y << TILE_SHIFT
+            for lx, (old, new) in enumerate(zip(old_rows, self.tiles.get((tile_x, tile_y), EMPTY_TILE))):
+                if old == new:
+                    continue
+                for row, cells in ((new & ~old, births), (old & ~new, deaths)):
+                    while row:
+                        low_bit = row & -row
+                        cell = (x0 + lx, y0 + low_bit.bit_length() - 1)
+                        if self.in_bounds(*cell):  # like cells, only the board
+                            cells.append(cell)
+                        row ^= low_bit
+        return Delta(births=births, deaths=deaths)
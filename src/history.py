@@ -0,0 +1,178 @@
+"""
+Board history for rewinding: a journal of per-generation births and deaths plus a full keyframe every
+keyframe_interval generations, in a ring buffer with a memory cap
+
+Coordinates are stored in compact arrays (array("i"): 4 bytes per number), not as sets of tuples.
+Going to generation g replays deltas from the nearest keyframe at or before g, so rewinding
+10k generations doesn't need 10k full boards. When the cap is reached, the oldest keyframe
+is dropped together with its deltas, and a new keyframe is started early if the newest segment alone
+would go over it, so nbytes never exceeds max_bytes. A board whose keyframe takes more than half of the cap
+isn't recorded at all (off is True) until history is reset with a smaller one.
+Jumping forward (without recording every generation) starts a new keyframe, the generations jumped over
+are a gap in history
+
+Only cells on the board are recorded (unbounded engines lose what is outside of it on rewind)
+
+ history = History(max_bytes=64 * 2**20)
+ history.reset(engine.cells, engine.generation)
+ births, deaths = engine.step_delta()
+ history.record(engine.generation, births, deaths, lambda: engine.cells)
+ cells = history.state_at(0)
+"""
+
+from array import array
+from collections import deque
+
+# rough size of a Python list entry + tuple + 2 array objects, for memory accounting
+DELTA_OVERHEAD = 200
+KEYFRAME_OVERHEAD = 200
+
+
+def pack(cells):
+    """(x, y) coordinates into one flat array: x0, y0, x1, y1, ..."""
+    packed = array("i")
+    for (x, y) in cells:
+        packed.append(x)
+        packed.append(y)
+    return packed
+
+
+def unpack(packed):
+    return zip(packed[::2], packed[1::2])
+
+
+def delta_nbytes(births, deaths):
+    return DELTA_OVERHEAD + births.itemsize * (len(births) + len(deaths))
+
+
+class Segment:
+    """A keyframe (full board at generation) and the deltas of the generations after it"""
+    __slots__ = ("generation", "keyframe", "deltas", "nbytes")
+
+    def __init__(self, generation, cells):
+        self.generation = generation
+        self.keyframe = pack(cells)
+        self.deltas = []  # deltas[i] takes generation + i to generation + i + 1: (births, deaths)
+        self.nbytes = KEYFRAME_OVERHEAD + self.keyframe.itemsize * len(self.keyframe)
+
+    @property
+    def last_generation(self):
+        return self.generation + len(self.deltas)
+
+    def add_delta(self, births, deaths):
+        """Adds packed births and deaths, returns their bytes"""
+        self.deltas.append((births, deaths))
+        size = delta_nbytes(births, deaths)
+        self.nbytes += size
+        return size
+
+    def truncate(self, generation):
+        """Forgets generations after generation, returns freed bytes"""
+        freed = 0
+        while self.last_generation > generation:
+            freed += delta_nbytes(*self.deltas.pop())
+        self.nbytes -= freed
+        return freed
+
+    def state_at(self, generation):
+        cells = set(unpack(self.keyframe))
+        for births, deaths in self.deltas[:generation - self.generation]:
+            cells.difference_update(unpack(deaths))
+            cells.update(unpack(births))
+        return cells
+
+
+class History:
+    def __init__(self, max_bytes=64 * 2**20, keyframe_interval=100):
+        self.max_bytes = max_bytes
+        self.keyframe_interval = keyframe_interval
+
+        self.segments = deque()  # oldest first
+        self.nbytes = 0
+        self.off = False  # the board is too big to record in max_bytes, nothing is recorded until a reset
+
+    @property
+    def oldest(self):
+        """Oldest generation that can be gone back to (None if nothing is recorded)"""
+        return self.segments[0].generation if self.segments else None
+
+    @property
+    def newest(self):
+        return self.segments[-1].last_generation if self.segments else None
+
+    def _segment_of(self, generation):
+        # segments are in order, the last one starting at or before generation may have it
+        for segment in reversed(self.segments):
+            if segment.generation <= generation:
+                return segment if generation <= segment.last_generation else None
+        return None
+
+    def __contains__(self, generation):
+        return self._segment_of(generation) is not None
+
+    def clear(self):
+        self.segments.clear()
+        self.nbytes = 0
+        self.off = False
+
+    def truncate_after(self, generation):
+        """Forgets generations after generation (e.g. when going on from a rewound board)"""
+        while self.segments and self.segments[-1].generation > generation:
+            self.nbytes -= self.segments.pop().nbytes
+        if self.segments:
+            self.nbytes -= self.segments[-1].truncate(generation)
+
+    def reset(self, cells, generation):
+        """Board at generation was changed (edited, loaded): its old state and everything after it is forgotten"""
+        self.truncate_after(generation - 1)
+        self._add_segment(cells, generation)
+
+    def _add_segment(self, cells, generation):
+        segment = Segment(generation, cells)
+        # a keyframe needs room for deltas too, or every generation would be a new keyframe
+        if 2 * segment.nbytes > self.max_bytes:
+            self.segments.clear()
+            self.nbytes = 0
+            self.off = True
+            return
+
+        self.off = False
+        self.segments.append(segment)
+        self.nbytes += segment.nbytes
+        self._enforce_cap()
+
+    def record(self, generation, births, deaths, cells):
+        """
+        Records the births and deaths that led to generation.
+        cells is a function returning the current board's cells, only called when a keyframe is due
+        """
+        if self.off:
+            return
+        if generation - 1 != self.newest:
+            self.truncate_after(generation - 1)  # going on from a rewound board
+            if generation - 1 != self.newest:  # nothing to build on
+                self._add_segment(cells(), generation)
+                return
+
+        segment = self.segments[-1]
+        births, deaths = pack(births), pack(deaths)
+        # a new keyframe also when the newest segment alone would go over the cap
+        if (len(segment.deltas) >= self.keyframe_interval
+                or segment.nbytes + delta_nbytes(births, deaths) > self.max_bytes):
+            self._add_segment(cells(), generation)
+        else:
+            self.nbytes += segment.add_delta(births, deaths)
+            self._enforce_cap()
+
+    def _enforce_cap(self):
+        # the newest segment always stays (it fits, see record)
+        while self.nbytes > self.max_bytes and len(self.segments) > 1:
+            self.nbytes -= self.segments.popleft().nbytes
+
+    def state_at(self, generation):
+        """Live cells at a recorded generation, replayed from the nearest keyframe"""
+        segment = self._segment_of(generation)
+        if segment is None:
+            raise KeyError(f"Generation {generation} is not in history")
+
+        return segment.state_at(generation)
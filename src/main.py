@@ -1,11 +1,9 @@
 # public packages
 import tkinter as tk
 import tkinter.filedialog as tk_filedialog
-from copy import deepcopy
-from time import sleep
-from threading import Thread
-from math import log
-import csv
+import tkinter.messagebox as tk_messagebox
+import argparse
+from time import perf_counter
 
 # --- debugging mem leak --
 # from pympler import summary, muppy
@@ -21,10 +19,24 @@ import csv
 
 # internal packages
 from custom_hover_button import MyButton
-from timer import Timer  # for timing code execution
+from timer import Timer  # for timing code execution: named spans, see overlay.py for showing them
+from overlay import MetricsOverlay
+from engines import ENGINES, NAMED_RULES, make_engine, parse_rule, CycleDetector
+from patterns import read_pattern, write_csv
+from browser import PatternBrowser
+from renderers import RENDERERS
+from scheduler import Scheduler, RemoteScheduler
+from history import History
+
+try:
+    import snapshot  # binary snapshots (.snap) for big boards, needs NumPy
+except ImportError:
+    snapshot = None
 
 t = Timer()
 
+JUMP_SLICE_SECONDS = 0.03  # of jumping per frame, the window draws and handles keys in between
+
 # find & replace "#print" with "print" for more info
 
 def init_root():
@@ -109,6 +121,7 @@ class Controls:
         
         ## Setup buttons and controls
         button_padding = 10
+        box_padding = 15
         
         # | Column 0: |
         
@@ -124,18 +137,31 @@ class Controls:
         
         self.playing = False
         self.min_play_speed = 1
-        self.max_play_speed = 20
-        # play_speed changes seconds of sleep (see self.play_thread())
+        self.max_play_speed = 5000
+        # play_speed is generations per second
         # used as a tk variable in play_speed_slider 
         self.play_speed = tk.IntVar(value=self.min_play_speed)
         
+        # Playing runs in tkinter's main loop: generations per frame as needed, frames dropped if evolving is too slow
+        if self.game.remote:
+            # or in the simulation process, the main loop only draws its newest frame
+            self.scheduler = RemoteScheduler(self.master, self.game.engine, show=self.play_show,
+                                             gens_per_sec=self.play_speed.get(), on_frame=self.show_achieved_speed)
+        else:
+            self.scheduler = Scheduler(self.master, evolve=self.play_evolve, gens_per_sec=self.play_speed.get(),
+                                       on_frame=self.show_achieved_speed)
+        self.play_speed.trace_add("write", lambda *_: setattr(self.scheduler, "gens_per_sec", self.play_speed.get()))
+        
         # - Play speed slider
         self.play_speed_slider = self.speed_slider()
-        self.play_speed_slider["label"] = f"Simulation speed ({self.min_play_speed}-{self.max_play_speed})"
+        self.play_speed_slider["label"] = f"Generations / sec ({self.min_play_speed}-{self.max_play_speed})"
         self.play_speed_slider.grid(column=0, row=2, sticky="EWS", padx=button_padding, pady=button_padding)
         # Keyboard support - clamping speed to min and max speed is handled by tkinter scale widget (from_ and to) :)
-        self.master.bind("<Left>", lambda _: self.play_speed_slider.set(self.play_speed_slider.get() - 1))
-        self.master.bind("<Right>", lambda _: self.play_speed_slider.set(self.play_speed_slider.get() + 1))
+        # steps of 25% (but at least 1), the range is too big for steps of 1
+        self.master.bind("<Left>", lambda _: self.play_speed_slider.set(
+            min(self.play_speed_slider.get() - 1, int(self.play_speed_slider.get() / 1.25))))
+        self.master.bind("<Right>", lambda _: self.play_speed_slider.set(
+            max(self.play_speed_slider.get() + 1, int(self.play_speed_slider.get() * 1.25))))
         # Bind left click to right click on slider to change value according to where you click, not increment (decrement) by one
         self.play_speed_slider.bind("<Button-1>",
                                     lambda e: self.play_speed_slider.event_generate("<Button-3>", x=e.x, y=e.y))
@@ -146,6 +172,42 @@ class Controls:
         self.slider_hint_left = tk.Label(master=self.frame, text="(←)")
         self.slider_hint_left.grid(column=0, row=3, sticky="SW", padx=hints_padding)        
         
+        # actual generations per second while playing
+        self.achieved_speed_label = tk.Label(master=self.frame, text="")
+        self.achieved_speed_label.grid(column=0, row=3, sticky="S")
+        
+        # - Jump to generation N (fast with the hashlife engine)
+        self.jump_button = self.jump_button()
+        self.master.bind("j", lambda _: self.jump_button.invoke())
+        self.jump_button.grid(column=0, row=4, sticky="NEWS", padx=button_padding, pady=button_padding)
+        
+        self.jump_generation_box = self.jump_generation_box()
+        self.jump_generation_box.grid(column=1, row=4, sticky="SE", padx=box_padding)
+        
+        self.jump_generation_label = tk.Label(master=self.frame, text="Jump to generation")
+        self.jump_generation_label.grid(column=1, row=4, sticky="SW", padx=button_padding)
+        self.jump_after_id = None  # long jumps go on a slice per frame, see jump_button
+        
+        # - Pattern browser: searchable list of the layouts folder with thumbnails (indexed once, see catalog.py)
+        self.browse_button = self.browse_button()
+        self.master.bind("o", lambda _: self.browse_button.invoke())
+        self.browse_button.grid(column=0, row=6, sticky="NEWS", padx=button_padding, pady=button_padding)
+        self.browser = None
+        
+        # - Rewind one generation and a scrubber over all generations in history
+        self.rewind_button = self.rewind_button()
+        self.master.bind("b", lambda _: self.rewind_button.invoke())
+        self.rewind_button.grid(column=0, row=5, sticky="NEWS", padx=button_padding, pady=button_padding)
+        
+        self.history_scrubber = self.history_scrubber()
+        self.history_scrubber.grid(column=1, row=5, sticky="EWS", padx=button_padding, pady=button_padding)
+        # only moving it by hand goes back in time, not it following the game
+        self.history_scrubber.bind("<ButtonRelease-1>", lambda _: self.scrub(self.history_scrubber.get()))
+        self.history_scrubber.bind("<B1-Motion>", lambda _: self.scrub(self.history_scrubber.get()), add="+")
+        # clicks edit the board, which cuts history off at the current generation
+        self.game.canvas.bind("<Button-1>", lambda _: self.show_history(), add="+")
+        self.show_history()
+        
         # | Column 1: |
         
         # - Reset board
@@ -167,14 +229,20 @@ class Controls:
         
         # - Board width and height / a square
         self.board_min_size = 1
-        self.board_max_size = 100
+        self.board_max_size = self.game.renderer.max_board_size
         
         self.board_size_box = self.board_size_box()
-        box_padding = 15
         self.board_size_box.grid(column=1, row=3, columnspan=1, sticky="SE", padx=box_padding)
 
         self.board_size_label = tk.Label(master=self.frame, text=f"Board size ({self.board_min_size}-{self.board_max_size})")
         self.board_size_label.grid(column=1, row=3, sticky="SW", padx=button_padding)
+        
+        # - Rule (Life-like, B/S notation or a name like highlife), applied with Enter
+        self.rule_box = self.rule_box()
+        self.rule_box.grid(column=1, row=6, sticky="SE", padx=box_padding)
+        
+        self.rule_label = tk.Label(master=self.frame, text="Rule (B/S, Enter)")
+        self.rule_label.grid(column=1, row=6, sticky="SW", padx=button_padding)
 
     
     def forward_button(self):
@@ -182,14 +250,131 @@ class Controls:
                       bg_color=self.colors.get("blue_button"),
                       hover_color=self.colors.get("blue_button_hover"),
                       click_color=self.colors.get("blue_button_click"),
-                      command=lambda: self.game.evolve())
+                      command=lambda: self.evolve_once())
+
+    def evolve_once(self):
+        self.game.evolve()
+        self.show_history()
+
+    def rewind_button(self):
+        def rewind():
+            if self.playing:
+                self.play_button.invoke()
+            
+            self.game.rewind_to(self.game.engine.generation - 1)
+            self.show_history()
+        
+        return MyButton(master=self.frame, text="<< Rewind once (B)",
+                      bg_color=self.colors.get("blue_button"),
+                      hover_color=self.colors.get("blue_button_hover"),
+                      click_color=self.colors.get("blue_button_click"),
+                      command=lambda: rewind())
+    
+    def history_scrubber(self):
+        return tk.Scale(master=self.frame, from_=0, to=0, label="History (generation)",
+                        orient=tk.HORIZONTAL, width=self.height / 20, sliderlength=self.width / 22,
+                        troughcolor=self.colors.get("blue_button_hover"),
+                        borderwidth=0)
+    
+    def scrub(self, generation):
+        if generation == self.game.engine.generation:
+            return
+        
+        if self.playing:
+            self.play_button.invoke()
+        
+        self.game.rewind_to(generation)
+        self.show_history()
+    
+    def show_history(self):
+        # scrubber spans the generations in history and shows the current one
+        history = self.game.history
+        if history is None or history.oldest is None:
+            label = "History off (board too big for --history-mb)" if history is not None and history.off else \
+                "History (generation)"
+            self.history_scrubber.configure(from_=0, to=0, state="disabled", label=label)
+            return
+        
+        self.history_scrubber.configure(from_=history.oldest, to=history.newest, state="normal",
+                                        label="History (generation)")
+        self.history_scrubber.set(self.game.engine.generation)
 
+    def jump_button(self):
+        def jump():
+            if self.jump_after_id is not None:  # J again stops a jump that's still going
+                self.stop_jump()
+                return
+            if self.playing:  # stop playing, the jump is the only thing evolving the board
+                self.play_button.invoke()
+            
+            target = self.jump_generation_box.get()
+            if not target.isdigit():
+                return
+            
+            jump_slice(int(target))
+        
+        def jump_slice(target):
+            # a slice of the jump per frame, so the window keeps drawing and J can stop it (hashlife is there at once)
+            self.jump_after_id = None
+            if self.game.jump_to_generation(target, budget=JUMP_SLICE_SECONDS):
+                self.jump_generation_label["text"] = "Jump to generation"
+                self.show_history()
+                return
+            self.jump_generation_label["text"] = f"Jumping: {self.game.engine.generation}/{target} (J: stop)"
+            self.jump_after_id = self.frame.after(1, jump_slice, target)
+        
+        return MyButton(master=self.frame, text=">> Jump (J)",
+                      bg_color=self.colors.get("blue_button"),
+                      hover_color=self.colors.get("blue_button_hover"),
+                      click_color=self.colors.get("blue_button_click"),
+                      command=lambda: jump())
+    
+    def stop_jump(self):
+        if self.jump_after_id is None:
+            return
+        self.frame.after_cancel(self.jump_after_id)
+        self.jump_after_id = None
+        self.game.draw_whole_grid()  # slices aren't drawn, only where the jump stopped
+        self.jump_generation_label["text"] = "Jump to generation"
+        self.show_history()
+    
+    def jump_generation_box(self):
+        # digits only
+        vcmd = (self.frame.register(lambda i: i == "" or str.isdigit(i)))
+        
+        return tk.Entry(master=self.frame, textvariable=tk.StringVar(self.frame, value="1000000"),
+                        exportselection=0, width=10,
+                        validate="key", validatecommand=(vcmd, "%P"))
+    
+    def rule_box(self):
+        def apply_rule(_):
+            try:
+                self.game.set_rule(entry.get())
+            except ValueError as e:
+                tk_messagebox.showerror("Unknown rule", f"{e}\n\nNamed rules: {', '.join(NAMED_RULES)}")
+                return
+            self.show_rule()
+            self.show_history()
+        
+        entry = tk.Entry(master=self.frame, textvariable=tk.StringVar(self.frame, value=str(self.game.engine.rule)),
+                         exportselection=0, width=14)
+        entry.bind("<Return>", apply_rule)
+        # typed letters (B, S, ...) shouldn't reach the window's keyboard shortcuts
+        entry.bindtags((str(entry), "Entry", "all"))
+        return entry
+    
+    def show_rule(self):
+        self.rule_box.delete(0, tk.END)
+        self.rule_box.insert(0, str(self.game.engine.rule))
+    
     def reset_button(self):
         def reset():
             self.game.clear_grid()
             
             if self.playing:  # stop evolution & playing if board is reset
                 self.play_button.invoke()
+            
+            self.show_history()
         
         return MyButton(master=self.frame, text="Reset board (R)",
                       bg_color=self.colors.get("blue_button"),
@@ -211,12 +396,17 @@ class Controls:
             if self.playing:
                 #print("Starting playing.")
                 
-                Thread(target=self.play_thread).start()
+                self.stop_jump()  # playing goes on from wherever the jump got to
+                
+                self.scheduler.start()
                 
                 self.play_button["text"] = ">> Pause (P)"
             else:
                 #print("Pausing playing.")
                 
+                self.scheduler.stop()
+                self.achieved_speed_label["text"] = ""
+                
                 self.play_button["text"] = ">> Play (P)"
         
         
@@ -226,17 +416,25 @@ class Controls:
                       click_color=self.colors.get("blue_button_click"),
                       command=lambda: play_action())
     
-    def play_thread(self):  # started from play_action as a Thread
-        while self.playing:
-            #print("playing...")
-            
-            self.game.evolve()
-            
-            # sleep time formula between generations: a log curve
-            # if play_speed is between 1 and 20, then sleep_time is between 1 and 0.002 (sec)
-            sleep_time = log(self.play_speed.get(), 0.047) + 1
-            
-            sleep(sleep_time)
+    def play_evolve(self, n):  # called by scheduler while playing
+        cycle = self.game.evolve(n)
+        self.show_history()
+        self.stop_on_cycle(cycle)
+    
+    def play_show(self):  # called by remote scheduler when the simulation process has a new frame
+        cycle = self.game.show_frame()
+        self.stop_on_cycle(cycle)
+    
+    def stop_on_cycle(self, cycle):
+        if cycle and self.playing:
+            # stop by itself, board won't change anymore (or only repeats)
+            self.play_button.invoke()
+            self.achieved_speed_label["text"] = str(cycle).capitalize()
+    
+    def show_achieved_speed(self, scheduler):  # called by scheduler after every frame
+        text = f"{scheduler.achieved_gens_per_sec:.0f} gen/s, {scheduler.achieved_fps:.0f} fps"
+        if self.achieved_speed_label["text"] != text:
+            self.achieved_speed_label["text"] = text
     
     def load_layout(self):
         def load_layout_action():
@@ -245,30 +443,18 @@ class Controls:
             
             #print("Loading new board, opening file dialog...")
             filename = tk_filedialog.askopenfilename(title="Load a new Game of Life board layout",
-                                                 initialdir=self.default_layouts_folder, filetypes=[("Comma-separated values file", "*.csv")])
+                                                 initialdir=self.default_layouts_folder,
+                                                 filetypes=[("Pattern files", "*.csv *.rle *.mc *.cells *.txt *.snap"),
+                                                            ("Comma-separated values file", "*.csv"),
+                                                            ("Run Length Encoded", "*.rle"),
+                                                            ("Macrocell", "*.mc"),
+                                                            ("Plaintext", "*.cells *.txt"),
+                                                            ("Snapshot", "*.snap")])
 
             if filename == "":  # load dialog closed
                 return
-
-            with open(filename, "r") as file:
-                #print(f"{filename} opened. Reading...")
-                
-                csvreader = csv.reader(file)
-                
-                # layout file's first row should be board size (rows,cols)
-                board_rows, board_columns = next(csvreader)
-                self.game.change_grid_size(int(board_rows), int(board_columns))
-                
-                self.board_size_box.delete(0, tk.END)
-                self.board_size_box.insert(0, f"{board_rows}")
-                #print(f"Rows: {board_rows}, cols: {board_columns}")
-                
-                # every other row is live cell coordinates
-                for row in csvreader:
-                    self.game.create_cell(int(row[0]), int(row[1]))
             
-            #print("New board loaded.")
-            #print()
+            self.load_file(filename)
             
         return MyButton(master=self.frame, text="Load board (L)",
                       bg_color=self.colors.get("blue_button"),
@@ -276,32 +462,99 @@ class Controls:
                       click_color=self.colors.get("blue_button_click"),
                       command=lambda: load_layout_action())
     
+    def load_file(self, filename):
+        """Loads a layout or snapshot file onto the board, errors are shown in a message box"""
+        if self.playing:  # stop evolution & playing if new layout is beginning to be loaded
+            self.play_button.invoke()
+        
+        #print(f"{filename} opened. Reading...")
+        is_snapshot = filename.lower().endswith(".snap")
+        try:
+            with t.span("io"):
+                if is_snapshot:
+                    if snapshot is None:
+                        raise ValueError("Snapshots need NumPy (pip install numpy)")
+                    header = snapshot.read_header(filename)
+                    board_rows, board_columns = header.rows, header.columns
+                else:
+                    board_rows, board_columns, cells, rule = read_pattern(filename)
+                    if rule is not None:
+                        parse_rule(rule)  # an unknown rule is an error before the board is touched
+        except (ValueError, IndexError, OSError) as e:
+            tk_messagebox.showerror("Can't load layout", f"{filename}:\n{e}")
+            return
+        
+        if max(board_rows, board_columns) > self.board_max_size:
+            tk_messagebox.showerror("Can't load layout",
+                                    f"The pattern needs a {board_rows}x{board_columns} board, "
+                                    f"at most {self.board_max_size}x{self.board_max_size} fits "
+                                    f"(try a bigger board with --renderer raster)")
+            return
+        
+        try:
+            with t.span("io"):
+                if is_snapshot:
+                    self.game.load_snapshot(filename)
+                else:
+                    self.game.load_layout(board_rows, board_columns, cells, rule)
+        except (ValueError, OSError) as e:  # e.g. a corrupted snapshot, found before the board is touched
+            tk_messagebox.showerror("Can't load layout", f"{filename}:\n{e}")
+            return
+        
+        # without validation, it would resize (and wipe) the board again
+        self.board_size_box.configure(validate="none")
+        self.board_size_box.delete(0, tk.END)
+        self.board_size_box.insert(0, f"{board_rows}")
+        self.board_size_box.configure(validate="key")
+        #print(f"Rows: {board_rows}, cols: {board_columns}")
+        
+        self.show_rule()
+        self.show_history()
+        
+        #print("New board loaded.")
+        #print()
+    
+    def browse_button(self):
+        def browse():
+            if self.browser is not None and self.browser.winfo_exists():  # already open
+                self.browser.lift()
+                return
+            
+            self.browser = PatternBrowser(self.master, self.default_layouts_folder, on_load=self.load_file,
+                                          colors=self.game.colors, on_other_file=self.load_layout.invoke)
+        
+        return MyButton(master=self.frame, text="Browse patterns (O)",
+                      bg_color=self.colors.get("blue_button"),
+                      hover_color=self.colors.get("blue_button_hover"),
+                      click_color=self.colors.get("blue_button_click"),
+                      command=lambda: browse())
+    
     def save_layout(self):
         def save_layout_action():
             if self.playing:  # stop evolution & playing if current layout is beginning to be saved
                 self.play_button.invoke()            
             
             #print("Saving current board...")
+            filetypes = [("Comma-separated values file", "*.csv")]
+            if snapshot is not None:
+                # binary, with generation: much smaller and faster for big boards
+                filetypes.append(("Snapshot", "*.snap"))
+            
             filename = tk_filedialog.asksaveasfilename(title="Save your Game of Life current board layout",
                                                        initialdir=self.default_layouts_folder, defaultextension=".csv",
-                                                       filetypes=[("Comma-separated values file", "*.csv")])
+                                                       filetypes=filetypes)
             
             if filename == "":  # save dialog closed
                 return
             
-            with open(filename, "w", newline="") as file:  # newline="" removes blank lines between csv rows
-                #print(f"{filename} opened. Saving...")
-                
-                csvwriter = csv.writer(file)
-                
-                # write board size (rows,cols)
-                csvwriter.writerow([self.game.cell_rows, self.game.cell_columns])
-                
-                # write live cells' coordinates
-                data = [[x, y] for (x, y) in self.game.cell_objects.keys()]
-                #print(data)
-                csvwriter.writerows(data)
-                
+            #print(f"{filename} opened. Saving...")
+            with t.span("io"):
+                if snapshot is not None and filename.lower().endswith(".snap"):
+                    snapshot.save_snapshot(filename, self.game.engine)
+                else:
+                    write_csv(filename, self.game.cell_rows, self.game.cell_columns, self.game.engine.cells,
+                              self.game.engine.rule)
+            
             #print("New board saved.")
             #print()
         
@@ -334,6 +587,7 @@ class Controls:
             
             # Change board size
             self.game.change_grid_size(i, i)
+            self.show_history()
             
             return True
         
@@ -350,7 +604,8 @@ class Game:
     """
     Left side of the window: the game itself, including cell logic
     """
-    def __init__(self, master):
+    def __init__(self, master, engine="sparse", wrap=False, engine_options=None, renderer="pool", detect_cycles=True,
+                 history_bytes=64 * 2**20, rule=None, process=False):
         self.master = master
         
         self.colors = {
@@ -375,98 +630,114 @@ class Game:
         self.canvas.grid(column=0, row=0, sticky="W", padx=self.padding, pady=self.padding)
         
         ## Cells
-        self.cell_rows = 20
-        self.cell_columns = 20
+        # the rules live in a headless engine, Game only draws what the engine says
+        # engine: "sparse" (set of live cells) or "dense" (NumPy array, for big busy boards)
+        # rule: Life-like rule like "B36/S23" (HighLife), Conway's Life B3/S23 by default
+        # process: the engine evolves in a simulation process of its own and the window only draws its newest frame
+        # (see remote.py), the simulation stops on cycles by itself and there's no history to go back in
+        self.remote = process
+        if process:
+            from remote import RemoteEngine  # needs NumPy
+            self.engine = RemoteEngine(engine, rows=20, columns=20, wrap=wrap, rule=rule, detect_cycles=detect_cycles,
+                                       **(engine_options or {}))
+            detect_cycles, history_bytes = False, 0
+        else:
+            self.engine = make_engine(engine, rows=20, columns=20, wrap=wrap, rule=rule, **(engine_options or {}))
         
-        self.cell_width = self.width / self.cell_rows
-        self.cell_height = self.height / self.cell_columns
+        ## Drawing
+        # renderer: "pool" (a canvas rectangle per cell, only shown and hidden)
+        # or "raster" (one image, zoom with mouse wheel, pan with right mouse button, for big boards)
         self.cell_border_width = 1
-
-        # cell_objects' keys are coordinates as tuples: (cell_row, cell_col), e.g. (5, 2)
-        # cell_objects' values are object IDs as ints: id, e.g. 3
-        self.cell_objects = dict()
+        self.renderer = RENDERERS[renderer](self.canvas, self.width, self.height, self.colors, self.cell_border_width)
+        self.renderer.resize(self.cell_rows, self.cell_columns)
         
-        #self.cell_objects2 = [[0 for _ in range(self.cell_rows)] for _ in range(self.cell_columns)]
+        ## Stopping by itself: empty board, still life or an oscillator (see evolve)
+        self.cycle_detector = CycleDetector() if detect_cycles else None
         
+        ## Going back: births and deaths of every generation + a keyframe every 100, at most history_bytes of them
+        self.history = History(max_bytes=history_bytes) if history_bytes else None
+        self.reset_history()
         
-        ## Gridlines
-        self.draw_gridlines()
+        ## Jumping: generations evolved per step() call, see jump_to_generation
+        self.jump_chunk = 1
         
-        
-    def draw_gridlines(self):
-        # Vertical
-        for x in range(self.cell_rows):
-            self.canvas.create_line(x * self.cell_width, 0, x * self.cell_width, self.height,
-                                    fill=self.colors.get("gridline"), width=self.cell_border_width, tag="gridline")
-        # Horizontal
-        for y in range(self.cell_columns):
-            self.canvas.create_line(0, y * self.cell_height, self.width, y * self.cell_height,
-                                    fill=self.colors.get("gridline"), width=self.cell_border_width, tag="gridline")
+        ## Anything else following the board (exporters, metrics...): called with every generation's Frame
+        # (engines.Frame: generation, births, deaths, population), see subscribe
+        self.subscribers = []
+    
+    @property
+    def cell_rows(self):
+        return self.engine.rows
+    
+    @property
+    def cell_columns(self):
+        return self.engine.columns
     
     def change_grid_size(self, new_rows, new_columns, new_width=None, new_height=None):
         #print(f"Changing board size to {new_rows}x{new_columns}...")
         #print()
-        self.cell_rows = new_rows
-        self.cell_columns = new_columns
+        self.engine.resize(new_rows, new_columns)
         
         if new_width != None and new_height != None:
             self.width = new_width
             self.height = new_height
         
+        # new gridlines and a new pool of cells
+        self.renderer.resize(new_rows, new_columns, self.width, self.height)
+        self.draw_whole_grid()
+    
+    def load_layout(self, rows, columns, cells, rule=None):
+        """New board size and cells (and rule, if the layout has one), all cells go into the engine at once and the board is drawn once"""
+        self.engine.resize(rows, columns)
+        if rule is not None:
+            self.engine.rule = rule
+        self.engine.load(cells)
+        
+        self.renderer.resize(rows, columns, self.width, self.height)
+        self.draw_whole_grid()
+    
+    def load_snapshot(self, filename):
+        """Board size, cells and generation from a binary snapshot, mapped from the file instead of parsed"""
+        snapshot.load_snapshot(filename, self.engine)
         
-        self.cell_width = self.width / self.cell_rows
-        self.cell_height = self.height / self.cell_columns
-        
-        self.canvas.delete("gridline")
-        self.draw_gridlines()
+        self.renderer.resize(self.cell_rows, self.cell_columns, self.width, self.height)
         self.draw_whole_grid()
     
-#     def is_cell_alive(self, x, y): ### for cell_objects2
-#         try:
-#             if self.cell_objects2[x][y] != 0:
-#                 return True
-#         except IndexError:
-#             pass
-#         
-#         return False
+    def set_rule(self, rule):
+        """Board evolves by another rule from this generation on (ValueError if it isn't a Life-like rule)"""
+        self.engine.rule = rule
+        # cycles and recorded future generations were of the old rule
+        self.reset_cycle_detector()
+        self.reset_history()
     
     def create_cell(self, x, y):
-        cell_x0 = x * self.cell_width
-        cell_y0 = y * self.cell_height
-        cell_x1 = cell_x0 + self.cell_width
-        cell_y1 = cell_y0 + self.cell_height
-        
-        # cell is tkinter object-ID (int)
-        cell_id = self.canvas.create_rectangle(cell_x0, cell_y0, cell_x1, cell_y1,
-                                               width=self.cell_border_width, fill=self.colors.get("cell_fill"), tag="cell")
-        
-        self.cell_objects[(x, y)] = cell_id
-        #self.cell_objects2[x][y] = cell_id
+        self.engine.add(x, y)
+        self.renderer.update(births=[(x, y)], deaths=())
+        self.reset_cycle_detector()
+        self.reset_history()
         
-        
-        #print(f"New cell (id: {cell_id}) created.")
+        #print(f"New cell {(x, y)} created.")
         #print()
     
     def remove_cell(self, x, y):
-        cell_id = self.cell_objects.pop((x, y))
-        
-#         cell_id = self.cell_objects2[x][y] 
-#         self.cell_objects2[x][y] = 0
+        self.engine.remove(x, y)
+        self.renderer.update(births=(), deaths=[(x, y)])
+        self.reset_cycle_detector()
+        self.reset_history()
         
-        self.canvas.delete(cell_id)
-        
-        #print(f"Cell (id: {cell_id}) deleted.")
+        #print(f"Cell {(x, y)} deleted.")
         #print()
     
     def canvas_clicked(self, e):
         #print("Canvas clicked.")
         
         # Column and row number
-        x = int(e.x // self.cell_width)
-        y = int(e.y // self.cell_height)
+        x, y = self.renderer.cell_at(e.x, e.y)
+        
+        if not self.engine.in_bounds(x, y):
+            return
        
-        if (x, y) not in self.cell_objects:
-        #if not self.is_cell_alive(x, y):
+        if not self.engine.is_alive(x, y):
             #print("└ No cell, creating one...")
             self.create_cell(x, y)
         else:
@@ -478,88 +749,227 @@ class Game:
     def clear_grid(self):
         #print("Clearing grid...")
         
-        self.canvas.delete("cell")
-        
-        self.cell_objects.clear()
-        #self.cell_objects2 = [[0 for _ in range(self.cell_rows)] for _ in range(self.cell_columns)]
+        self.engine.clear()
+        self.renderer.sync(self.engine)
+        self.reset_cycle_detector()
+        self.reset_history()
         
         #print("Grid cleared.")
         #print()
     
     def draw_whole_grid(self):
-        # Clear whole canvas
-        self.clear_grid()
+        self.renderer.sync(self.engine)
+        self.reset_cycle_detector()
+        self.reset_history()
+    
+    def reset_cycle_detector(self):
+        # board was edited (or jumped), earlier generations don't count for cycles anymore
+        if self.cycle_detector is not None:
+            self.cycle_detector.reset(self.engine.cells, self.engine.generation)
+    
+    def reset_history(self):
+        # board was edited: this generation is replaced, generations before it can still be gone back to
+        if self.history is not None:
+            self.history.reset(self.engine.cells, self.engine.generation)
+    
+    def jump_to_generation(self, generation, budget=None):
+        """
+        Back only as far as history goes, forward as far as wanted. With a budget (seconds) going forward stops
+        after about that long, returns True once the board is at generation (called again, it goes on from there)
+        """
+        if generation < self.engine.generation:
+            self.rewind_to(generation)
+            return True
+        if generation == self.engine.generation:
+            return True
+        if self.remote:
+            self.engine.advance(generation - self.engine.generation)  # drawn when the simulation gets there
+            return True
         
-        # Draw live cells
-        for (x, y) in self.cell_objects:
-            self.create_cell(x, y)
-#         for x in range(self.cell_rows):
-#             for y in range(self.cell_columns):
-#                 if self.is_cell_alive(x, y):
-#                     self.create_cell(x, y)
-    
-    def alive_neighbours_count(self, x, y):
-        # Excludes itself
-        count = 0
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                
-                if (x + i, y + j) in self.cell_objects:
-                #if self.is_cell_alive(x + i, y + j):
-                    count += 1
+        if budget is None:
+            self.engine.step(generation - self.engine.generation)
+        
+        # generations per step() call: doubled while steps are quick (hashlife gets there in a few of them),
+        # halved when one takes longer than the budget
+        start = perf_counter()
+        while self.engine.generation < generation:
+            n = min(self.jump_chunk, generation - self.engine.generation)
+            step_start = perf_counter()
+            self.engine.step(n)
+            took = perf_counter() - step_start
+            
+            if took < budget / 4:
+                self.jump_chunk *= 2
+            elif took > budget:
+                self.jump_chunk = max(1, self.jump_chunk // 2)
+            if perf_counter() - start >= budget and self.engine.generation < generation:
+                return False
+        
+        self.draw_whole_grid()
+        return True
+    
+    def rewind_to(self, generation):
+        """Goes back (or forward again) to a generation in history, returns False if it's not there"""
+        if self.history is None or generation not in self.history:
+            return False
+        if generation == self.engine.generation:
+            return True
         
-        return count
+        # later generations are kept until the board is evolved or edited from here
+        self.engine.load(self.history.state_at(generation))
+        self.engine.generation = generation
+        self.renderer.sync(self.engine)
+        self.reset_cycle_detector()
+        return True
     
-    def evolve(self):
+    def evolve(self, n=1):
+        """Evolves n generations and draws once, returns a Cycle if the board stopped changing (or None)"""
         #print("Evolving...")
         
-        cell_objects_copy = deepcopy(self.cell_objects)
-        
-        # brute force
-        # We don't need to check cells that aren't neighbours of alive cells!? etc
-        cells_to_create = []
-        
-        # ~ 1.4 secs... w cell_objects (dict) / but i used self.width, not self.cell_rows !!!
-        # 0.0011 secs w cell_objects (dict)
-        # 0.0015 secs w cell_objects2 (2D list)
-        # TODO: times are for smaller board, test out performance on bigger boards w more cells
-        t.start()
-        for x in range(self.cell_rows):
-            for y in range(self.cell_columns):
-                alive_neighbours = self.alive_neighbours_count(x, y)
-                if alive_neighbours == 3 or (alive_neighbours == 2 and (x, y) in cell_objects_copy):
-                # if alive_neighbours == 3 or (alive_neighbours == 2 and self.is_cell_alive(x, y)):
-                    cells_to_create.append((x, y))
-        
-        # 0.0001 sec
-        self.clear_grid()
-        
-        if cells_to_create:        
-            # 0.0004 sec
-            [self.create_cell(x, y) for (x, y) in cells_to_create]
-        else:
-            # No cells to create, can pause game
-            # TODO
-            pass
-            
-            
-        t.stop()
+        if self.remote:
+            self.engine.advance(n)  # drawn when the simulation process has the frame, see show_frame
+            return None
+        
+        with t.span("evolve"):
+            if self.cycle_detector is None and self.history is None and not self.subscribers:
+                cycle = None
+                if self.renderer.prefers_deltas:
+                    # only born and dead cells are redrawn
+                    with t.span("compute"):
+                        delta = self.engine.step_delta(n)
+                    with t.span("render"):
+                        self.renderer.update(delta.births, delta.deaths)
+                else:
+                    with t.span("compute"):
+                        self.engine.step(n)
+                    with t.span("render"):
+                        self.renderer.sync(self.engine)
+            else:
+                cycle = self.evolve_tracked(n)
+        
         #print("Evolved.")
         #print("--------")
         #print()
+        
+        return cycle
+    
+    def show_frame(self):
+        """Draws the simulation process's newest frame, returns the Cycle it stopped on (or None)"""
+        with t.span("render"):
+            self.renderer.sync(self.engine)
+        return self.engine.take_cycle()
+    
+    def close(self):
+        if self.remote:
+            self.engine.close()
+    
+    def subscribe(self, callback):
+        """callback(frame) is called with every generation evolved from now on, returns a function to unsubscribe"""
+        self.subscribers.append(callback)
+        return lambda: self.subscribers.remove(callback)
+    
+    def evolve_tracked(self, n):
+        # one generation at a time, the cycle detector, history and subscribers need every generation's frame
+        births, deaths = set(), set()
+        cycle = None
+        cells = lambda: self.engine.cells  # only needed for history keyframes
+        frames = self.engine.iter_generations(stop=self.engine.generation + n + 1)
+        
+        while True:
+            with t.span("compute"):
+                frame = next(frames, None)
+            if frame is None:
+                break
+            
+            # everything done with the births and deaths: history, redraw bookkeeping, subscribers, cycles
+            with t.span("diff"):
+                if self.history is not None:
+                    self.history.record(frame.generation, frame.births, frame.deaths, cells)
+                
+                if self.renderer.prefers_deltas:
+                    # a cell born and then dead again within these n generations doesn't need redrawing
+                    for cell in frame.births:
+                        if cell in deaths:
+                            deaths.remove(cell)
+                        else:
+                            births.add(cell)
+                    for cell in frame.deaths:
+                        if cell in births:
+                            births.remove(cell)
+                        else:
+                            deaths.add(cell)
+                
+                for callback in self.subscribers:
+                    callback(frame)
+                
+                if self.cycle_detector is not None:
+                    cycle = self.cycle_detector.update(frame.births, frame.deaths, frame.generation)
+            
+            if cycle:
+                # No cells to change (or just the same ones over and over again), can pause game
+                self.reset_cycle_detector()  # playing again goes on for another round
+                break
+        
+        with t.span("render"):
+            if self.renderer.prefers_deltas:
+                self.renderer.update(births, deaths)
+            else:
+                self.renderer.sync(self.engine)
+        
+        return cycle
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Game of Life")
+    
+    parser.add_argument("--engine", choices=list(ENGINES), default="sparse", help="simulation engine (default: sparse)")
+    parser.add_argument("--wrap", action="store_true", help="board loops around its edges")
+    parser.add_argument("--rule", type=parse_rule, default="B3/S23",
+                        help="Life-like rule, e.g. B36/S23, highlife, seeds, daynight (default: B3/S23)")
+    parser.add_argument("--workers", type=int, help="worker processes for the striped engine (default: cpu count)")
+    parser.add_argument("--adaptive-mode", choices=["auto", "sparse", "dense", "hashlife"], default="auto",
+                        help="adaptive engine: switch between sparse, dense and hashlife by cost (auto, default) "
+                             "or stay in one (hashlife: whenever it can)")
+    parser.add_argument("--process", action="store_true",
+                        help="evolve in a separate process, the window only draws its newest frame (needs NumPy, "
+                             "no history)")
+    parser.add_argument("--no-autostop", action="store_true",
+                        help="keep playing when the board is empty, a still life or only oscillates")
+    parser.add_argument("--renderer", choices=list(RENDERERS), default="pool",
+                        help="pool: a canvas rectangle per cell (default), raster: one image with zoom and pan, for big boards")
+    parser.add_argument("--history-mb", type=float, default=64,
+                        help="memory for going back to earlier generations, 0 turns history off (default: 64)")
+    parser.add_argument("--overlay", action="store_true",
+                        help="show fps, generations/sec, population and time per phase on the board (toggle with M)")
+    parser.add_argument("--metrics", metavar="FILE", help="append the overlay's metrics to FILE as JSON lines")
+    
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+    
     root = init_root()
     root.update()  # makes root geometry info like winfo_width available to use for Game canvas and Controls frame
     
-    game_window = Game(root)
+    engine_options = {"workers": args.workers} if args.engine == "striped" else {}
+    if args.engine == "adaptive":
+        engine_options = {"mode": args.adaptive_mode}
+    game_window = Game(root, engine=args.engine, wrap=args.wrap, engine_options=engine_options, renderer=args.renderer,
+                       detect_cycles=not args.no_autostop, history_bytes=int(args.history_mb * 2**20), rule=args.rule,
+                       process=args.process)
     
     control_window = Controls(root, game_window)
     
-    root.mainloop()
+    overlay = MetricsOverlay(game_window.canvas, t, game_window, control_window.scheduler,
+                             visible=args.overlay, export=args.metrics)
+    root.bind("m", lambda _: overlay.toggle())
+    
+    try:
+        root.mainloop()
+    finally:
+        overlay.close()
+        game_window.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""
+Metrics overlay: FPS, generations/sec, population, hashlife's node cache and where the time goes, drawn on top of the board
+
+Every refresh (twice a second) the timer's span totals are compared to the previous refresh, so the
+breakdown is the share of wall time each phase (compute, diff, render, io) took since then. The rest is
+"other": tkinter drawing, handling events and waiting for the next frame.
+Optionally every refresh is also written to a file as a JSON line (when something was timed since the last one)
+
+ overlay = MetricsOverlay(game.canvas, t, game, scheduler, visible=True, export="metrics.jsonl")
+ root.bind("m", lambda _: overlay.toggle())
+"""
+
+import json
+import time
+
+
+def engine_label(engine):
+    """Engine's name, and what the adaptive engine is running on right now ("adaptive: dense")"""
+    representation = getattr(engine, "representation", None)
+    return f"{engine.name}: {representation}" if representation else engine.name
+
+
+class MetricsOverlay:
+    def __init__(self, canvas, timer, game, scheduler, interval=0.5, visible=False, export=None):
+        self.canvas = canvas
+        self.timer = timer
+        self.game = game
+        self.scheduler = scheduler
+        self.interval = interval
+        self.visible = visible
+
+        self.export_file = open(export, "a") if export else None
+
+        self.background = canvas.create_rectangle(0, 0, 0, 0, fill="#202020", outline="", tag="overlay")
+        self.text = canvas.create_text(8, 8, anchor="nw", fill="#FFFFFF", font=("TkFixedFont", 9), tag="overlay")
+        self._show(visible)
+
+        self._last_totals = timer.totals()
+        self._last_time = time.perf_counter()
+        self.canvas.after(int(interval * 1000), self.refresh)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._show(self.visible)
+        if self.visible:
+            self.refresh(reschedule=False)
+
+    def _show(self, visible):
+        self.canvas.itemconfigure("overlay", state="normal" if visible else "hidden")
+
+    def phase_shares(self):
+        """Span path -> (share of wall time since the last refresh, summary) and the wall time"""
+        now = time.perf_counter()
+        totals = self.timer.totals()
+        wall = max(now - self._last_time, 1e-9)
+
+        summaries = self.timer.summary()
+        shares = {path: ((total - self._last_totals.get(path, 0.0)) / wall, summaries[path])
+                  for path, total in sorted(totals.items())}  # parents before their nested spans
+
+        self._last_totals = totals
+        self._last_time = now
+        return shares, wall
+
+    def refresh(self, reschedule=True):
+        shares, wall = self.phase_shares()
+        playing = self.scheduler.running
+        fps = self.scheduler.achieved_fps if playing else 0.0
+        gens_per_sec = self.scheduler.achieved_gens_per_sec if playing else 0.0
+        engine = self.game.engine
+
+        if self.visible:
+            self._draw(shares, fps, gens_per_sec, engine)
+
+        if self.export_file is not None and any(share > 0 for (share, _) in shares.values()):
+            self.export_file.write(json.dumps({
+                "time": round(time.time(), 3),
+                "wall_seconds": round(wall, 3),
+                "engine": engine_label(engine),
+                "generation": engine.generation,
+                "population": engine.population,
+                "fps": round(fps, 1),
+                "gens_per_sec": round(gens_per_sec, 1),
+                "cache": engine.cache_report() if hasattr(engine, "cache_report") else None,
+                "phases": {path: {"share": round(share, 4), **summary} for path, (share, summary) in shares.items()},
+            }) + "\n")
+            self.export_file.flush()
+
+        if reschedule:
+            self.canvas.after(int(self.interval * 1000), self.refresh)
+
+    def _draw(self, shares, fps, gens_per_sec, engine):
+        lines = [f"{fps:5.0f} fps {gens_per_sec:7.0f} gen/s",
+                 f"gen {engine.generation}  pop {engine.population}  ({engine_label(engine)})"]
+        cache = engine.cache_report() if hasattr(engine, "cache_report") else None
+        if cache:  # hashlife's node cache
+            lines.append(f"cache {cache['nodes']} nodes  {cache['results']} results  {cache['hit_rate']:4.0%} hits"
+                         f"  {cache['collections']} gc")
+
+        timed = 0.0
+        for path, (share, summary) in shares.items():
+            if "/" not in path:  # top level spans add up to the time spent in code, nested ones are a part of it
+                timed += share
+            indent = "  " * path.count("/")
+            name = path.rsplit("/", 1)[-1]
+            lines.append(f"{indent}{name:<{12 - len(indent)}} {share:4.0%}  p50 {summary.get('p50_ms', 0):7.2f} ms"
+                         f"  p99 {summary.get('p99_ms', 0):7.2f} ms")
+        lines.append(f"{'other (tk)':<12} {max(0.0, 1 - timed):4.0%}")
+
+        self.canvas.itemconfigure(self.text, text="\n".join(lines))
+        x0, y0, x1, y1 = self.canvas.bbox(self.text)
+        self.canvas.coords(self.background, x0 - 4, y0 - 4, x1 + 4, y1 + 4)
+        self.canvas.tag_raise("overlay")  # renderers may have drawn over it
+
+    def close(self):
+        if self.export_file is not None:
+            self.export_file.close()
+            self.export_file = None
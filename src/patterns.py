@@ -0,0 +1,294 @@
+"""
+Reading and writing layout (pattern) files, see layouts/README.txt for the csv format
+
+Also reads the formats patterns come in from LifeWiki (https://conwaylife.com/wiki/Category:File_formats):
+Plaintext (.cells, .txt), RLE (.rle) and Macrocell (.mc). Files are read line by line into one list
+of cells, which the engine loads in one go. The board is made a square around the pattern with some
+padding for it to evolve into (convert.py converts between the formats in bulk)
+
+ rows, columns, cells, rule = read_csv("layouts/oscillators/blinker.csv")
+ write_csv("blinker_copy.csv", rows, columns, cells)
+ rows, columns, cells, rule = read_pattern("layouts/spaceships/mwss.cells.txt")  # any of the formats
+
+rule is the layout's rulestring ("B36/S23") if the file has one (RLE header, Macrocell "#R" line,
+third field of a csv header), otherwise None (Life)
+"""
+
+import csv
+import os.path
+import re
+from collections import namedtuple
+from itertools import compress, groupby, repeat
+
+# empty cells around patterns that don't say how big their board is
+PADDING = 10
+
+RLE_LINE_LENGTH = 70  # RLE lines are wrapped at 70 characters
+
+# byte tables for bytes.translate: 1 for a live cell's character, 0 for anything else
+PLAINTEXT_ALIVE = bytes(1 if chr(i) in "O*" else 0 for i in range(256))  # some files use "*"
+RLE_ALIVE = bytes(0 if chr(i) in "b." else 1 for i in range(256))  # "o", other letters are live cells of other states
+
+Layout = namedtuple("Layout", ["rows", "columns", "cells", "rule"])
+
+
+def read_csv(filename):
+    """Returns board size, a list of live cells' (x, y) coordinates and the rule (or None)"""
+    with open(filename, "r") as file:
+        csvreader = csv.reader(file)
+
+        # layout file's first row should be board size (rows,cols), optionally followed by a rule
+        board_rows, board_columns, *rule = next(csvreader)
+
+        # every other row is live cell coordinates
+        cells = [(int(row[0]), int(row[1])) for row in csvreader if row]
+
+    return Layout(int(board_rows), int(board_columns), cells, rule[0].strip() if rule else None)
+
+
+def write_csv(filename, rows, columns, cells, rule=None):
+    """rule is only written if it isn't Life, so Life layouts stay readable for older versions"""
+    with open(filename, "w", newline="") as file:  # newline="" removes blank lines between csv rows
+        csvwriter = csv.writer(file)
+
+        # write board size (rows,cols) and the rule
+        rule = str(rule) if rule is not None else None
+        csvwriter.writerow([rows, columns] if rule in (None, "B3/S23") else [rows, columns, rule])
+
+        # write live cells' coordinates
+        csvwriter.writerows(cells)
+
+
+def board_size(width, height, padding=PADDING):
+    """Square board for a width x height pattern with padding on every side"""
+    return max(width, height, 1) + 2 * padding
+
+
+def add_row(cells, row, y, alive_table, padding=PADDING):
+    """Adds live cells of a row of characters, picked out a whole row at a time (not a character at a time)"""
+    cells.extend(zip(compress(range(padding, padding + len(row)), row.encode().translate(alive_table)), repeat(y)))
+
+
+def read_plaintext(filename, padding=PADDING):
+    """Plaintext: "O" is a live cell, "." a dead one, lines starting with "!" are comments"""
+    cells = []
+    width = height = 0
+
+    with open(filename, "r") as file:
+        for y, line in enumerate((line for line in file if not line.startswith("!")), start=padding):
+            line = line.rstrip()
+            add_row(cells, line, y, PLAINTEXT_ALIVE, padding)
+            width = max(width, len(line))
+            height = y + 1 - padding
+
+    size = board_size(width, height, padding)
+    return Layout(size, size, cells, None)
+
+
+def read_rle(filename, padding=PADDING):
+    """
+    Run Length Encoded: header "x = width, y = height, rule = B3/S23", then runs like "3o2b$" where
+    o is live, b is dead, $ is end of row, ! is end of the pattern (runs may continue on the next line)
+    """
+    cells = []
+    width = height = 0
+    rule = None
+    y = padding
+    row = ""  # current row so far, runs expanded ("3o" -> "ooo")
+    carry = ""  # run count split over lines
+    counts = re.compile(r"(\d+)")
+
+    with open(filename, "r") as file:
+        header = False
+        for line in file:
+            if line.startswith("#"):  # comments, name, author etc
+                continue
+            if not header and line.lstrip().startswith("x"):
+                header = True
+                fields = dict(part.split("=", 1) for part in line.strip().replace(" ", "").split(",") if "=" in part)
+                width, height = int(fields.get("x", 0)), int(fields.get("y", 0))
+                rule = fields.get("rule")
+                continue
+
+            line = carry + line.strip()
+            body = line.rstrip("0123456789")
+            carry = line[len(body):]
+
+            body, end, _ = body.partition("!")
+
+            # "2o3b$" -> ["", "2", "o", "3", "b$"] -> "oobbb$"
+            parts = counts.split(body)
+            expanded = [parts[0]]
+            for count, run in zip(parts[1::2], parts[2::2]):
+                if run:
+                    expanded.append(run[0] * int(count) + run[1:])
+
+            *finished, row = (row + "".join(expanded)).split("$")
+            for finished_row in finished:
+                add_row(cells, finished_row, y, RLE_ALIVE, padding)
+                width = max(width, len(finished_row))
+                y += 1
+
+            if end:
+                break
+
+    add_row(cells, row, y, RLE_ALIVE, padding)
+    width = max(width, len(row))
+    height = max(height, y + 1 - padding)
+
+    size = board_size(width, height, padding)
+    return Layout(size, size, cells, rule)
+
+
+def read_macrocell(filename, padding=PADDING):
+    """
+    Macrocell (Golly's quadtree format): after the "[M2]" line and "#" comments, every line is a node,
+    numbered from 1. Leaves are 8x8 squares like "..*$*" (row by row, "$" ends a row),
+    other nodes are "level nw ne sw se" with child node numbers (0 is empty). The last node is the root.
+    "#R B36/S23" is the rule
+    """
+    # node number -> live cells of a leaf or (level, children) of other nodes
+    nodes = [None]
+    rule = None
+
+    with open(filename, "r") as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("#R"):
+                rule = line[2:].strip() or None
+                continue
+            if not line or line.startswith("[") or line.startswith("#"):
+                continue
+
+            if line[0] in ".*$":  # 8x8 leaf
+                leaf = []
+                for y, row in enumerate(line.split("$")):
+                    leaf.extend((x, y) for x, char in enumerate(row) if char == "*")
+                nodes.append(leaf)
+            else:
+                level, *children = map(int, line.split())
+                nodes.append((level, children))
+
+    # where every non-empty leaf is (walking the tree), then the pattern's bounding box from leaves only
+    leaves = []
+    stack = [(len(nodes) - 1, 0, 0)] if len(nodes) > 1 else []
+    while stack:
+        number, x0, y0 = stack.pop()
+        node = nodes[number]
+        if isinstance(node, list):
+            if node:
+                leaves.append((node, x0, y0))
+            continue
+
+        level, (nw, ne, sw, se) = node
+        half = 1 << (level - 1)
+        for child, dx, dy in ((nw, 0, 0), (ne, half, 0), (sw, 0, half), (se, half, half)):
+            if child:
+                stack.append((child, x0 + dx, y0 + dy))
+
+    if not leaves:
+        size = board_size(0, 0, padding)
+        return Layout(size, size, [], rule)
+
+    min_x = min(x0 + min(x for (x, _) in leaf) for (leaf, x0, _) in leaves)
+    min_y = min(y0 + min(y for (_, y) in leaf) for (leaf, _, y0) in leaves)
+    max_x = max(x0 + max(x for (x, _) in leaf) for (leaf, x0, _) in leaves)
+    max_y = max(y0 + max(y for (_, y) in leaf) for (leaf, _, y0) in leaves)
+
+    cells = []
+    for (leaf, x0, y0) in leaves:
+        x0 += padding - min_x
+        y0 += padding - min_y
+        cells.extend((x0 + x, y0 + y) for (x, y) in leaf)
+
+    size = board_size(max_x - min_x + 1, max_y - min_y + 1, padding)
+    return Layout(size, size, cells, rule)
+
+
+def _pattern_rows(cells):
+    """Bounding box of the cells and their xs a row (y) at a time: (min_x, min_y, max_x, max_y), [(y, xs), ...]"""
+    cells = sorted(set(cells), key=lambda cell: (cell[1], cell[0]))
+    if not cells:
+        return None, []
+
+    min_x = min(x for x, _ in cells)
+    max_x = max(x for x, _ in cells)
+    rows = [(y, [x for x, _ in row]) for y, row in groupby(cells, key=lambda cell: cell[1])]
+    return (min_x, rows[0][0], max_x, rows[-1][0]), rows
+
+
+def write_plaintext(filename, rows, columns, cells, rule=None):
+    """Plaintext of the pattern's bounding box, a line per row (the board size and rule aren't kept)"""
+    box, pattern_rows = _pattern_rows(cells)
+
+    with open(filename, "w") as file:
+        last_y = box[1] if box else 0
+        for y, xs in pattern_rows:
+            file.write("\n" * (y - last_y))  # empty rows
+            line = bytearray(b"." * (xs[-1] - box[0] + 1))
+            for x in xs:
+                line[x - box[0]] = ord("O")
+            file.write(line.decode())
+            last_y = y
+        file.write("\n")
+
+
+def write_rle(filename, rows, columns, cells, rule=None):
+    """RLE of the pattern's bounding box with the rule in the header (the board size isn't kept)"""
+    box, pattern_rows = _pattern_rows(cells)
+    width, height = (box[2] - box[0] + 1, box[3] - box[1] + 1) if box else (0, 0)
+
+    with open(filename, "w") as file:
+        file.write(f"x = {width}, y = {height}, rule = {rule if rule is not None else 'B3/S23'}\n")
+
+        line = ""
+
+        def put(count, tag):  # a run, lines wrapped so a run is never split
+            nonlocal line
+            run = f"{count if count > 1 else ''}{tag}"
+            if len(line) + len(run) > RLE_LINE_LENGTH:
+                file.write(line + "\n")
+                line = ""
+            line += run
+
+        last_y = box[1] if box else 0
+        for y, xs in pattern_rows:
+            if y > last_y:
+                put(y - last_y, "$")
+            # live runs, and the dead runs between them
+            x = box[0]
+            for _, run in groupby(enumerate(xs), key=lambda item: item[1] - item[0]):
+                run = [x_ for _, x_ in run]
+                if run[0] > x:
+                    put(run[0] - x, "b")
+                put(len(run), "o")
+                x = run[-1] + 1
+            last_y = y
+        file.write(line + "!\n")
+
+
+READERS = {
+    ".csv": read_csv,
+    ".rle": read_rle,
+    ".mc": read_macrocell,
+    ".cells": read_plaintext,
+    ".txt": read_plaintext,
+}
+
+
+WRITERS = {
+    ".csv": write_csv,
+    ".rle": write_rle,
+    ".cells": write_plaintext,
+}
+
+
+def read_pattern(filename, padding=PADDING):
+    """Layout (board size, live cells and rule) from any supported file (by file extension)"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unknown pattern file type: {extension} (supported: {', '.join(READERS)})")
+
+    if extension == ".csv":  # has its board size
+        return read_csv(filename)
+    return READERS[extension](filename, padding)
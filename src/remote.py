@@ -0,0 +1,432 @@
+"""
+Running the engine in a process of its own, so evolving a big board never freezes the window
+
+The simulation process evolves the board and publishes frames into a ring buffer in shared memory
+(multiprocessing.shared_memory): every frame is the board bit-packed like a snapshot's PLANE body,
+plus its sequence number, generation and population. The window only ever copies the newest frame,
+frames it was too slow for are skipped. Edits (clicks, loads, play/pause) go the other way as small
+commands on a queue, and every frame says which commands it already includes, so an older frame never
+undoes a click.
+
+A slot is written between two copies of its sequence number (first one before, second one after the plane):
+a reader that finds both equal after copying knows no newer frame was written into the slot meanwhile
+
+ engine = RemoteEngine("dense", rows=2048, columns=2048)
+ engine.load(cells)
+ engine.play(gens_per_sec=500)
+ ...
+ if engine.poll():              # a new frame came in
+     renderer.sync(engine)      # engine.to_array() and engine.cells are the newest frame
+ engine.close()
+"""
+
+import multiprocessing as mp
+import queue
+import time
+import weakref
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engines import make_engine, parse_rule, CycleDetector
+from engines.base import Engine
+from engines.bitpacked import WORD_BITS
+from snapshot import plane_chunks
+
+SLOTS = 4
+
+# uint64 words before the slots: rows, columns, words per row, slots, newest sequence number
+RING_HEADER = 8
+ROWS, COLUMNS, WORD_COUNT, SLOT_COUNT, LATEST = range(5)
+
+# uint64 words before every slot's plane
+SLOT_HEADER = 8
+SEQUENCE_START, SEQUENCE_END, GENERATION, POPULATION, APPLIED = range(5)
+
+Frame = namedtuple("Frame", ["sequence", "generation", "population", "applied", "words"])
+
+
+class FrameRing:
+    """Ring of bit-packed board frames in shared memory, one process writes and another one reads"""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner  # the creating side unlinks the memory when done
+
+        header = np.ndarray(RING_HEADER, dtype="<u8", buffer=shm.buf)
+        self.rows, self.columns, self.word_count, self.slots = (int(value) for value in header[:LATEST])
+        self.slot_words = SLOT_HEADER + self.rows * self.word_count
+        self.words = np.ndarray(RING_HEADER + self.slots * self.slot_words, dtype="<u8", buffer=shm.buf)
+
+    @classmethod
+    def create(cls, rows, columns, slots=SLOTS):
+        word_count = -(-columns // WORD_BITS)
+        size = 8 * (RING_HEADER + slots * (SLOT_HEADER + rows * word_count))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+
+        header = np.ndarray(RING_HEADER, dtype="<u8", buffer=shm.buf)
+        header[:] = 0
+        header[ROWS], header[COLUMNS], header[WORD_COUNT], header[SLOT_COUNT] = rows, columns, word_count, slots
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _slot(self, sequence):
+        start = RING_HEADER + (sequence % self.slots) * self.slot_words
+        return self.words[start:start + SLOT_HEADER], self.words[start + SLOT_HEADER:start + self.slot_words]
+
+    def publish(self, engine, applied):
+        """Writes the engine's board as the newest frame, applied is the last command it includes"""
+        sequence = int(self.words[LATEST]) + 1
+        header, plane = self._slot(sequence)
+
+        header[SEQUENCE_START] = sequence
+        plane_bytes = plane.view(np.uint8)
+        offset = 0
+        for chunk in plane_chunks(engine):
+            plane_bytes[offset:offset + len(chunk)] = np.frombuffer(chunk, dtype=np.uint8)
+            offset += len(chunk)
+        header[GENERATION] = engine.generation
+        header[POPULATION] = engine.population
+        header[APPLIED] = applied
+        header[SEQUENCE_END] = sequence
+
+        self.words[LATEST] = sequence
+
+    def latest(self, after=0, out=None):
+        """Newest frame if it is newer than sequence number after, else None. The plane is copied into out"""
+        for _ in range(self.slots):  # the writer would have to lap the whole ring for this to be retried
+            sequence = int(self.words[LATEST])
+            if sequence <= after:
+                return None
+
+            header, plane = self._slot(sequence)
+            if int(header[SEQUENCE_END]) != sequence:
+                continue  # already being overwritten by a newer frame
+            generation, population, applied = (int(value) for value in header[GENERATION:APPLIED + 1])
+            if out is None:
+                out = np.empty((self.rows, self.word_count), dtype="<u8")
+            np.copyto(out.reshape(-1), plane)
+            if int(header[SEQUENCE_START]) == sequence:
+                return Frame(sequence, generation, population, applied, out)
+        return None
+
+    def close(self):
+        self.words = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+## Simulation process
+
+def _evolve(engine, generations, detector):
+    """Evolves up to generations, returns a Cycle if the board stopped changing"""
+    if detector is None:
+        engine.step(generations)
+        return None
+
+    for _ in range(generations):
+        births, deaths = engine.step_delta()
+        cycle = detector.update(births, deaths, engine.generation)
+        if cycle:
+            return cycle
+    return None
+
+
+def _simulation_worker(ring_name, commands, events, engine_name, rows, columns, wrap, rule, options,
+                       detect_cycles, frame_rate):
+    engine = make_engine(engine_name, rows=rows, columns=columns, wrap=wrap, rule=rule, **options)
+    ring = FrameRing.attach(ring_name)
+    detector = CycleDetector() if detect_cycles else None
+    frame_time = 1 / frame_rate
+
+    playing = False
+    gens_per_sec = 1
+    due = 0.0
+    seconds_per_gen = None
+    applied = 0  # serial number of the last command applied
+    publish = True
+    last_tick = last_frame = time.perf_counter()
+
+    while True:
+        # every command that's waiting (paused with nothing to publish: wait for one)
+        wait = not playing and not publish
+        edited = False
+        while True:
+            try:
+                command = commands.get() if wait else commands.get_nowait()
+            except queue.Empty:
+                break
+            wait = False
+
+            applied, name, *args = command
+            if name == "stop":
+                ring.close()
+                if hasattr(engine, "close"):
+                    engine.close()
+                return
+            elif name == "set":
+                engine.set_cell(*args)
+            elif name == "load":
+                engine.load(args[0])
+            elif name == "clear":
+                engine.clear()
+            elif name == "resize":
+                rows, columns, ring_name = args
+                ring.close()
+                ring = FrameRing.attach(ring_name)
+                engine.resize(rows, columns)
+            elif name == "rule":
+                engine.rule = args[0]
+            elif name == "generation":
+                engine.generation = args[0]
+            elif name == "step":
+                engine.step(args[0])
+            elif name == "play":
+                playing, gens_per_sec = True, args[0]
+                due, last_tick = 0.0, time.perf_counter()
+            elif name == "speed":
+                gens_per_sec = args[0]
+            elif name == "pause":
+                playing = False
+            edited = True
+            publish = True
+
+        if edited and detector is not None:
+            detector.reset(engine.cells, engine.generation)
+
+        now = time.perf_counter()
+        if playing:
+            due += (now - last_tick) * gens_per_sec
+            last_tick = now
+
+            # no more than a frame's worth of work before looking at commands again, falling behind is dropped
+            most = max(1, int(frame_time / seconds_per_gen)) if seconds_per_gen else 1
+            generations = min(int(due), most)
+            due = min(due - generations, most)
+
+            if generations:
+                start = time.perf_counter()
+                cycle = _evolve(engine, generations, detector)
+                seconds = (time.perf_counter() - start) / generations
+                seconds_per_gen = seconds if seconds_per_gen is None else 0.8 * seconds_per_gen + 0.2 * seconds
+
+                if cycle:
+                    playing = False
+                    events.put(cycle)
+                    publish = True
+                elif now - last_frame >= frame_time:
+                    publish = True
+            else:
+                # nothing due yet: sleep until the next generation is (or a frame, whichever is first)
+                time.sleep(min(frame_time, (1 - due) / max(gens_per_sec, 1e-9)))
+
+        if publish:
+            ring.publish(engine, applied)
+            publish = False
+            last_frame = now
+
+
+## Window side
+
+class RemoteEngine(Engine):
+    """
+    Engine that runs in a simulation process: same interface as the other engines, cells are the newest frame
+    (plus edits that the simulation hasn't sent a frame with yet). step waits for the result, advance doesn't
+    """
+
+    def __init__(self, engine="sparse", rows=20, columns=20, wrap=False, rule=None, detect_cycles=True,
+                 frame_rate=60, **options):
+        self._commands = None
+        super().__init__(rows, columns, wrap)
+        self.name = engine
+
+        self._ring = FrameRing.create(rows, columns)
+        self._commands = mp.Queue()
+        self._events = mp.Queue()
+        self._process = mp.Process(target=_simulation_worker, daemon=True,
+                                   args=(self._ring.name, self._commands, self._events, engine, rows, columns,
+                                         wrap, rule, options, detect_cycles, frame_rate))
+        self._process.start()
+        if rule is not None:
+            self._rule = parse_rule(rule)  # the simulation got it already
+
+        self._sent = 0  # serial number of the last command sent
+        self._applied = 0  # last command the shown frame includes
+        self._sequence = 0  # newest frame seen
+        self.cycle = None  # set when the simulation stopped playing by itself
+        self._reset_board()
+
+        self._finalizer = weakref.finalize(self, _shutdown, self._process, self._commands, self._ring)
+
+    def _reset_board(self):
+        self._words = np.zeros((self._ring.rows, self._ring.word_count), dtype="<u8")
+        self._incoming = np.zeros_like(self._words)  # frames are copied here, kept only if they're taken
+        self._board = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        self._stale = False  # _board is behind _words
+        self._population = 0
+
+    def _send(self, *command):
+        if self._commands is None:  # still in Engine.__init__
+            return
+        self._sent += 1
+        self._commands.put((self._sent, *command))
+
+    ## Frames
+
+    def poll(self):
+        """Takes the newest frame if there is one that includes every command sent, returns True if it did"""
+        while True:
+            try:
+                self.cycle = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+        frame = self._ring.latest(self._sequence, out=self._incoming)
+        if frame is None:
+            return False
+        self._sequence = frame.sequence
+        if frame.applied < self._sent:  # from before the last edit, would undo it on screen
+            return False
+
+        self._words, self._incoming = self._incoming, self._words
+
+        self._applied = frame.applied
+        self._generation = frame.generation
+        self._population = frame.population
+        self._stale = True
+        return True
+
+    def wait(self, generation, timeout=None):
+        """Waits until a frame of at least generation comes in"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            self.poll()
+            if self._applied >= self._sent and self._generation >= generation:
+                return
+            if not self._process.is_alive():
+                raise RuntimeError("Simulation process has stopped")
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeoutError(f"No frame of generation {generation} in {timeout} s")
+            time.sleep(0.001)
+
+    def take_cycle(self):
+        """Cycle the simulation stopped on (once), or None"""
+        cycle, self.cycle = self.cycle, None
+        return cycle
+
+    @property
+    def board(self):
+        if self._stale:
+            # the only full copy on this side: newest frame's bits into a uint8 array
+            np.copyto(self._board, np.unpackbits(self._words.view(np.uint8), axis=1, count=self.columns,
+                                                 bitorder="little"))
+            self._stale = False
+        return self._board
+
+    ## Engine interface
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @generation.setter
+    def generation(self, generation):
+        self._generation = generation
+        self._send("generation", generation)
+
+    @property
+    def cells(self):
+        xs, ys = np.nonzero(self.board)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    @property
+    def population(self):
+        return self._population if self._stale else int(np.count_nonzero(self._board))
+
+    def is_alive(self, x, y):
+        return self.in_bounds(x, y) and bool(self.board[x, y])
+
+    def set_cell(self, x, y, alive):
+        self.board[x, y] = alive
+        self._send("set", x, y, alive)
+
+    def _clear(self):
+        self.board.fill(0)
+        self._send("clear")
+
+    def clear(self):
+        self._clear()
+        self._generation = 0  # the simulation resets its generation on clear too
+
+    def load(self, cells):
+        cells = [(x, y) for (x, y) in cells if self.in_bounds(x, y)]
+        board = self.board
+        board.fill(0)
+        if cells:
+            coords = np.array(cells, dtype=np.intp)
+            board[coords[:, 0], coords[:, 1]] = 1
+        self._generation = 0
+        self._send("load", cells)
+
+    def resize(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self._generation = 0
+
+        # frames of the new size go into a new ring
+        old_ring, self._ring = self._ring, FrameRing.create(rows, columns)
+        self._finalizer.detach()
+        self._finalizer = weakref.finalize(self, _shutdown, self._process, self._commands, self._ring)
+        self._sequence = 0
+        self._send("resize", rows, columns, self._ring.name)
+        old_ring.close()  # the simulation keeps its mapping until it has moved over
+        self._reset_board()
+
+    def to_array(self):
+        return self.board
+
+    def _rule_changed(self):
+        self._send("rule", str(self.rule))
+
+    def step(self, n=1):
+        target = self._generation + n
+        self.advance(n)
+        self.wait(target)
+
+    def advance(self, n=1):
+        """Evolves n generations without waiting for them, poll() picks the frame up when it's ready"""
+        if n > 0:
+            self._send("step", n)
+
+    def play(self, gens_per_sec):
+        self.cycle = None
+        self._send("play", gens_per_sec)
+
+    def set_speed(self, gens_per_sec):
+        self._send("speed", gens_per_sec)
+
+    def pause(self):
+        self._send("pause")
+
+    def close(self):
+        """Stops the simulation process and frees the shared memory"""
+        self._finalizer()
+
+
+def _shutdown(process, commands, ring):
+    if process.is_alive():
+        commands.put((0, "stop"))
+        process.join(timeout=2)
+        if process.is_alive():
+            process.terminate()
+    ring.close()
@@ -0,0 +1,273 @@
+"""
+Drawing the board on a tkinter canvas
+
+CellPoolRenderer creates one rectangle per cell once per board size (hidden), after that cells are only
+shown and hidden with itemconfigure. No canvas items are created or deleted while the game runs,
+so memory stays flat (deleted canvas items' IDs are never reused, which looked like a leak)
+and a generation costs as much as there are births and deaths
+
+RasterRenderer draws the visible part of the board into a single tk.PhotoImage (one PPM image per frame),
+with mouse wheel zoom and right (or middle) button drag to pan, for boards way bigger than 100x100
+
+Renderers have the same interface: resize, sync (whole board from an engine), draw, update, cell_at
+"""
+
+import tkinter as tk
+
+try:
+    import numpy as np
+except ImportError:  # the raster renderer needs NumPy, the cell pool renderer doesn't
+    np = None
+
+
+class CellPoolRenderer:
+    name = "pool"
+    max_board_size = 100  # one canvas item per cell, more gets slow
+    prefers_deltas = True  # give it births and deaths, not whole boards
+
+    def __init__(self, canvas, width, height, colors, border_width=1):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.colors = colors
+        self.border_width = border_width
+
+        self.rows = 0
+        self.columns = 0
+        self.cell_width = 0
+        self.cell_height = 0
+
+        # canvas item IDs of cells, pool[x * columns + y] is the rectangle of cell (x, y)
+        self.pool = []
+
+    def resize(self, rows, columns, width=None, height=None):
+        """Recreates gridlines and the pool of cell rectangles, all cells are hidden"""
+        if width is not None and height is not None:
+            self.width = width
+            self.height = height
+
+        self.rows = rows
+        self.columns = columns
+        self.cell_width = self.width / rows
+        self.cell_height = self.height / columns
+
+        self.canvas.delete("gridline")
+        self.canvas.delete("cell")
+        self.draw_gridlines()
+
+        create_rectangle = self.canvas.create_rectangle
+        fill = self.colors.get("cell_fill")
+        self.pool = [create_rectangle(x * self.cell_width, y * self.cell_height,
+                                      (x + 1) * self.cell_width, (y + 1) * self.cell_height,
+                                      width=self.border_width, fill=fill, state="hidden", tag="cell")
+                     for x in range(rows) for y in range(columns)]
+
+    def draw_gridlines(self):
+        # Vertical
+        for x in range(self.rows):
+            self.canvas.create_line(x * self.cell_width, 0, x * self.cell_width, self.height,
+                                    fill=self.colors.get("gridline"), width=self.border_width, tag="gridline")
+        # Horizontal
+        for y in range(self.columns):
+            self.canvas.create_line(0, y * self.cell_height, self.width, y * self.cell_height,
+                                    fill=self.colors.get("gridline"), width=self.border_width, tag="gridline")
+
+    def _set_state(self, cells, state):
+        pool, columns = self.pool, self.columns
+        itemconfigure = self.canvas.itemconfigure
+        for (x, y) in cells:
+            if 0 <= x < self.rows and 0 <= y < columns:
+                itemconfigure(pool[x * columns + y], state=state)
+
+    def sync(self, engine):
+        self.draw(engine.cells)
+
+    def draw(self, cells):
+        """Shows exactly the given cells"""
+        self.canvas.itemconfigure("cell", state="hidden")  # one call for all cells
+        self._set_state(cells, "normal")
+
+    def update(self, births, deaths):
+        """Shows born cells and hides dead ones, the rest of the board is left as is"""
+        self._set_state(deaths, "hidden")
+        self._set_state(births, "normal")
+
+    def cell_at(self, px, py):
+        """Cell (x, y) under canvas pixel (px, py)"""
+        return int(px // self.cell_width), int(py // self.cell_height)
+
+
+class RasterRenderer:
+    name = "raster"
+    max_board_size = 10000
+    prefers_deltas = False  # whole board arrays through sync are cheaper than millions of births/deaths
+
+    # zoom is in pixels per cell
+    max_zoom = 64
+    zoom_step = 1.25
+    gridline_min_zoom = 6  # no gridlines when cells are smaller than that
+
+    # palette indexes
+    BACKGROUND, CELL, GRIDLINE = 0, 1, 2
+
+    def __init__(self, canvas, width, height, colors, border_width=1):
+        if np is None:
+            raise ImportError("Raster renderer needs NumPy (pip install numpy)")
+
+        self.canvas = canvas
+        self.width = int(width)
+        self.height = int(height)
+        self.colors = colors
+
+        self.palette = np.array([self._rgb(colors.get("canvas_bg")), self._rgb(colors.get("cell_fill")),
+                                 self._rgb(colors.get("gridline"))], dtype=np.uint8)
+
+        self.image = tk.PhotoImage(width=self.width, height=self.height)
+        self.image_item = canvas.create_image(0, 0, anchor="nw", image=self.image)
+
+        self.rows = 0
+        self.columns = 0
+        self.board = np.zeros((0, 0), dtype=np.uint8)
+
+        # viewport: zoom and the (fractional) cell coordinates of the top left corner
+        self.zoom = 1.0
+        self.view_x = 0.0
+        self.view_y = 0.0
+
+        ## Zoom with mouse wheel (Windows, macOS: <MouseWheel>, Linux: buttons 4 and 5)
+        canvas.bind("<MouseWheel>", lambda e: self.zoom_at(e.x, e.y, e.delta > 0))
+        canvas.bind("<Button-4>", lambda e: self.zoom_at(e.x, e.y, True))
+        canvas.bind("<Button-5>", lambda e: self.zoom_at(e.x, e.y, False))
+
+        ## Pan by dragging with right or middle mouse button (left click is for cells)
+        self._drag_start = None
+        for button in (2, 3):
+            canvas.bind(f"<ButtonPress-{button}>", self.start_pan)
+            canvas.bind(f"<B{button}-Motion>", self.pan)
+
+    @staticmethod
+    def _rgb(color):
+        color = color.lstrip("#")
+        return [int(color[i:i + 2], 16) for i in (0, 2, 4)]
+
+    ## Board
+
+    def resize(self, rows, columns, width=None, height=None):
+        if width is not None and height is not None:
+            self.width = int(width)
+            self.height = int(height)
+            self.image.configure(width=self.width, height=self.height)
+
+        self.rows = rows
+        self.columns = columns
+        self.board = np.zeros((rows, columns), dtype=np.uint8)
+        self.fit()
+
+    def sync(self, engine):
+        # copied into the renderer's own board: the dense engine's to_array is its live board,
+        # which update() would otherwise write into
+        board = engine.to_array()
+        if board.shape != self.board.shape:
+            self.board = np.zeros(board.shape, dtype=np.uint8)
+        np.copyto(self.board, board, casting="unsafe")
+        self.render()
+
+    def draw(self, cells):
+        self.board.fill(0)
+        self.update(cells, ())
+
+    def update(self, births, deaths):
+        for state, cells in ((1, births), (0, deaths)):
+            coords = np.array([cell for cell in cells
+                               if 0 <= cell[0] < self.rows and 0 <= cell[1] < self.columns],
+                              dtype=np.intp).reshape(-1, 2)
+            self.board[coords[:, 0], coords[:, 1]] = state
+        self.render()
+
+    ## Viewport
+
+    def fit(self):
+        """Zoom so the whole board is visible"""
+        self.zoom = min(self.width / max(self.rows, 1), self.height / max(self.columns, 1))
+        self.view_x = 0.0
+        self.view_y = 0.0
+        self.render()
+
+    def cell_at(self, px, py):
+        return int(self.view_x + px / self.zoom), int(self.view_y + py / self.zoom)
+
+    def zoom_at(self, px, py, zoom_in):
+        """Zooms in or out keeping the cell under the mouse where it is"""
+        fit_zoom = min(self.width / max(self.rows, 1), self.height / max(self.columns, 1))
+        new_zoom = self.zoom * self.zoom_step if zoom_in else self.zoom / self.zoom_step
+        new_zoom = max(min(new_zoom, self.max_zoom), min(fit_zoom, self.max_zoom))
+
+        cell_x = self.view_x + px / self.zoom
+        cell_y = self.view_y + py / self.zoom
+        self.zoom = new_zoom
+        self.view_x = cell_x - px / new_zoom
+        self.view_y = cell_y - py / new_zoom
+        self.render()
+
+    def start_pan(self, e):
+        self._drag_start = (e.x, e.y, self.view_x, self.view_y)
+
+    def pan(self, e):
+        if self._drag_start is None:
+            return
+
+        start_px, start_py, start_view_x, start_view_y = self._drag_start
+        self.view_x = start_view_x - (e.x - start_px) / self.zoom
+        self.view_y = start_view_y - (e.y - start_py) / self.zoom
+        self.render()
+
+    ## Drawing
+
+    def _axis(self, pixels, view, cells):
+        """
+        For every pixel along an axis: index of the (first) cell it shows, clipped to the board,
+        and whether it is on the board at all. Also the end of the last pixel's cells
+        """
+        cell_index = np.floor(view + np.arange(pixels) / self.zoom).astype(np.intp)
+        on_board = (cell_index >= 0) & (cell_index < cells)
+        end = min(max(int(view + pixels / self.zoom) + 1, 1), cells)
+        return np.clip(cell_index, 0, max(cells - 1, 0)), on_board, end
+
+    def _sample(self, xs, x_end, ys, y_end):
+        """Board values under every pixel, (height, width) so it is image-shaped"""
+        if self.zoom >= 1:
+            return self.board[xs][:, ys].T
+
+        # more than one cell per pixel: a pixel is lit if any of its cells is alive (max over the block)
+        x_starts = np.unique(xs)
+        y_starts = np.unique(ys)
+        blocks = np.maximum.reduceat(self.board[x_starts[0]:max(x_end, x_starts[-1] + 1)],
+                                     x_starts - x_starts[0], axis=0)
+        blocks = np.maximum.reduceat(blocks[:, y_starts[0]:max(y_end, y_starts[-1] + 1)],
+                                     y_starts - y_starts[0], axis=1)
+        # back from unique blocks to pixels
+        return blocks[np.searchsorted(x_starts, xs)][:, np.searchsorted(y_starts, ys)].T
+
+    def render(self):
+        if self.board.size == 0:
+            return
+
+        xs, x_on_board, x_end = self._axis(self.width, self.view_x, self.rows)
+        ys, y_on_board, y_end = self._axis(self.height, self.view_y, self.columns)
+
+        frame = self._sample(xs, x_end, ys, y_end)  # 0 or 1 == BACKGROUND or CELL
+        frame[~(y_on_board[:, None] & x_on_board[None, :])] = self.BACKGROUND
+
+        if self.zoom >= self.gridline_min_zoom:
+            # a gridline where a new cell starts
+            frame[:, np.flatnonzero(np.diff(xs, prepend=-1) != 0)] = self.GRIDLINE
+            frame[np.flatnonzero(np.diff(ys, prepend=-1) != 0), :] = self.GRIDLINE
+
+        pixels = self.palette[frame]
+        header = f"P6 {self.width} {self.height} 255\n".encode()
+        self.image.configure(data=header + pixels.tobytes(), format="PPM")
+
+
+RENDERERS = {CellPoolRenderer.name: CellPoolRenderer}
+if np is not None:
+    RENDERERS[RasterRenderer.name] = RasterRenderer
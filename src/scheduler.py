@@ -0,0 +1,211 @@
+"""
+Runs the game from tkinter's main loop (root.after) instead of a thread
+
+Simulation and drawing run at separate rates: every frame (target_fps a second) the scheduler works out how
+many generations are due at gens_per_sec and evolves all of them before drawing once. If evolving takes
+longer than a frame allows, the generations that don't fit are dropped instead of piling up, so the
+window stays responsive and the board never falls behind
+
+ scheduler = Scheduler(root, evolve=game.evolve)  # evolve(n) evolves n generations and draws once
+ scheduler.gens_per_sec = 500
+ scheduler.start()
+"""
+
+from time import perf_counter
+
+
+class Scheduler:
+    def __init__(self, root, evolve, gens_per_sec=1, target_fps=60, on_frame=None):
+        self.root = root
+        self.evolve = evolve
+        self.on_frame = on_frame  # called after every frame with the scheduler, e.g. for showing speed
+
+        self.gens_per_sec = gens_per_sec
+        self.target_fps = target_fps
+
+        # share of a frame that evolving may use, the rest is left for tkinter (drawing, clicks)
+        self.compute_budget = 0.8
+
+        self.running = False
+        self._after_id = None
+        self._last_tick = None
+        self._due = 0.0  # generations due but not evolved yet (fractional)
+
+        # seconds per generation, measured (exponential moving average)
+        self._seconds_per_gen = None
+
+        ## Achieved rates, measured over the last ~second
+        self.achieved_gens_per_sec = 0.0
+        self.achieved_fps = 0.0
+        self.dropped_gens = 0
+        self._window_start = None
+        self._window_gens = 0
+        self._window_frames = 0
+
+    @property
+    def frame_time(self):
+        return 1 / self.target_fps
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self._last_tick = self._window_start = perf_counter()
+        self._due = 0.0
+        self._window_gens = self._window_frames = 0
+        self._after_id = self.root.after(0, self._tick)
+
+    def stop(self):
+        self.running = False
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _max_gens_per_frame(self):
+        if self._seconds_per_gen is None:
+            return 1  # nothing measured yet
+
+        return max(1, int(self.frame_time * self.compute_budget / self._seconds_per_gen))
+
+    def _tick(self):
+        if not self.running:
+            return
+
+        tick_start = perf_counter()
+        self._due += (tick_start - self._last_tick) * self.gens_per_sec
+        self._last_tick = tick_start
+
+        gens = int(self._due)
+        if gens:
+            fitting = min(gens, self._max_gens_per_frame())
+            self._due -= gens
+            self.dropped_gens += gens - fitting  # can't keep up: drop, don't fall behind
+
+            self.evolve(fitting)
+
+            seconds = (perf_counter() - tick_start) / fitting
+            if self._seconds_per_gen is None:
+                self._seconds_per_gen = seconds
+            else:
+                self._seconds_per_gen = 0.8 * self._seconds_per_gen + 0.2 * seconds
+
+            self._window_gens += fitting
+            self._window_frames += 1
+
+            if not self.running:  # evolve may have stopped it
+                return
+
+        self._measure(perf_counter())
+
+        if self.on_frame is not None:
+            self.on_frame(self)
+
+        if not self.running:  # on_frame may have stopped it
+            return
+
+        # next frame, minus the time this one took
+        delay = self.frame_time - (perf_counter() - tick_start)
+        self._after_id = self.root.after(max(1, int(delay * 1000)), self._tick)
+
+    def _measure(self, now):
+        window = now - self._window_start
+        if window < 1:
+            return
+
+        self.achieved_gens_per_sec = self._window_gens / window
+        self.achieved_fps = self._window_frames / window
+        self._window_start = now
+        self._window_gens = self._window_frames = 0
+
+
+class RemoteScheduler:
+    """
+    Scheduler for an engine evolving in a process of its own (remote.RemoteEngine): start, stop and gens_per_sec
+    are passed on to the simulation, which keeps its own pace. Every frame (target_fps a second, playing or not)
+    the newest frame it published is taken and drawn with show(), frames that came in between are skipped
+
+     scheduler = RemoteScheduler(root, engine, show=lambda: renderer.sync(engine))
+    """
+
+    def __init__(self, root, engine, show, gens_per_sec=1, target_fps=60, on_frame=None):
+        self.root = root
+        self.engine = engine
+        self.show = show
+        self.on_frame = on_frame
+
+        self._gens_per_sec = gens_per_sec
+        self.target_fps = target_fps
+
+        self.running = False
+
+        ## Achieved rates, measured over the last ~second
+        self.achieved_gens_per_sec = 0.0
+        self.achieved_fps = 0.0
+        self.dropped_gens = 0  # not known here, the simulation drops generations it can't keep up with
+        self._window_start = perf_counter()
+        self._window_generation = engine.generation
+        self._window_frames = 0
+
+        self._after_id = self.root.after(0, self._tick)
+
+    @property
+    def frame_time(self):
+        return 1 / self.target_fps
+
+    @property
+    def gens_per_sec(self):
+        return self._gens_per_sec
+
+    @gens_per_sec.setter
+    def gens_per_sec(self, gens_per_sec):
+        self._gens_per_sec = gens_per_sec
+        if self.running:
+            self.engine.set_speed(gens_per_sec)
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.engine.play(self.gens_per_sec)
+        self._window_start = perf_counter()
+        self._window_generation = self.engine.generation
+        self._window_frames = 0
+
+    def stop(self):
+        self.running = False
+        self.engine.pause()
+        self.achieved_gens_per_sec = self.achieved_fps = 0.0
+
+    def close(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        tick_start = perf_counter()
+
+        if self.engine.poll():
+            self.show()
+            self._window_frames += 1
+
+        if self.running:
+            self._measure(perf_counter())
+            if self.on_frame is not None:
+                self.on_frame(self)
+
+        delay = self.frame_time - (perf_counter() - tick_start)
+        self._after_id = self.root.after(max(1, int(delay * 1000)), self._tick)
+
+    def _measure(self, now):
+        window = now - self._window_start
+        if window < 1:
+            return
+
+        generation = self.engine.generation
+        self.achieved_gens_per_sec = max(generation - self._window_generation, 0) / window
+        self.achieved_fps = self._window_frames / window
+        self._window_start = now
+        self._window_generation = generation
+        self._window_frames = 0
@@ -0,0 +1,297 @@
+"""
+Searching random soups for long-lived patterns (methuselahs), headlessly and on all cores
+
+Every soup is a square of random cells (--soup-size, --density) in the middle of a bigger board, made from
+its seed alone, so a seed is all it takes to make it again. Soups are evolved until they are empty, a still
+life or a cycle (or --max-generations) on a process pool, --batch soups at a time. Two leaderboards are kept:
+longest-lived (generations until the board settled) and largest final population. After every batch the
+winners are written to the output folder as csv layouts (load them with Load layout, or copy the best ones
+to layouts/methuselahs/) and the search is checkpointed to search.json in it, --resume goes on from there
+
+ python search.py --soups 100000 -o soups/
+ python search.py --soups 200000 -o soups/ --resume    # another 100000, same options as the first run
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from engines import ENGINES, make_engine, parse_rule, run_until_cycle
+from patterns import write_csv
+
+try:
+    import numpy as np
+    from engines.batched import BatchEngine  # a whole chunk of soups as one array
+except ImportError:  # no NumPy
+    np = BatchEngine = None
+
+CHECKPOINT_FILENAME = "search.json"
+
+
+def make_soup(seed, board_size=100, soup_size=16, density=0.5):
+    """Live cells of a soup: a soup_size square of random cells in the middle of the board"""
+    rng = random.Random(seed)
+    offset = (board_size - soup_size) // 2
+    return [(offset + x, offset + y) for x in range(soup_size) for y in range(soup_size) if rng.random() < density]
+
+
+def run_soup(seed, board_size=100, soup_size=16, density=0.5, max_generations=20000, max_period=1024,
+             engine_name="sparse", rule="B3/S23", wrap=False):
+    """Evolves one soup until it settles, returns a dict of results"""
+    engine = make_engine(engine_name, rows=board_size, columns=board_size, wrap=wrap, rule=rule)
+    engine.load(make_soup(seed, board_size, soup_size, density))
+    start_population = engine.population
+
+    cycle = run_until_cycle(engine, max_generations, max_period)
+    return {
+        "seed": seed,
+        "start_population": start_population,
+        # generation the board started repeating from (or the most generations, if it never did)
+        "lifespan": cycle.start_generation if cycle else engine.generation,
+        "settled": cycle is not None,
+        "stasis": str(cycle) if cycle else None,
+        "population": engine.population,
+    }
+
+
+def run_soup_batch(seeds, board_size=100, soup_size=16, density=0.5, max_generations=20000, max_period=1024,
+                   engine_name="batch", rule="B3/S23", wrap=False):
+    """Evolves soups side by side in a BatchEngine, returns a list of results like run_soup's"""
+    soups = np.zeros((len(seeds), board_size, board_size), dtype=np.uint8)
+    for soup, seed in zip(soups, seeds):
+        cells = make_soup(seed, board_size, soup_size, density)
+        if cells:
+            xs, ys = zip(*cells)
+            soup[xs, ys] = 1
+
+    batch = BatchEngine(len(seeds), board_size, board_size, wrap=wrap, rule=rule, max_period=max_period)
+    batch.load_array(soups)
+    start_populations = np.count_nonzero(soups.reshape(len(seeds), -1), axis=1)
+    batch.step(max_generations)
+    populations = batch.populations()
+
+    results = []
+    for i, seed in enumerate(seeds):
+        cycle = batch.cycle(i)
+        results.append({
+            "seed": seed,
+            "start_population": int(start_populations[i]),
+            "lifespan": cycle.start_generation if cycle else batch.generation,
+            "settled": cycle is not None,
+            "stasis": str(cycle) if cycle else None,
+            "population": int(populations[i]),
+        })
+    return results
+
+
+class Leaderboard:
+    """The size best results by key (highest first, a lower seed first on a tie)"""
+
+    def __init__(self, key, size=10, entries=()):
+        self.key = key
+        self.size = size
+        self.entries = list(entries)
+
+    def _rank(self, result):
+        return -result[self.key], result["seed"]
+
+    def offer(self, result):
+        """Adds a result if it makes the board, returns True if it did"""
+        if len(self.entries) >= self.size and self._rank(result) >= self._rank(self.entries[-1]):
+            return False
+
+        self.entries.append(result)
+        self.entries.sort(key=self._rank)
+        del self.entries[self.size:]
+        return True
+
+    def seeds(self):
+        return [result["seed"] for result in self.entries]
+
+
+class Search:
+    """Progress of a search: next seed, soups done, time spent and the leaderboards, saved as a checkpoint"""
+
+    def __init__(self, options, leaderboard_size=10):
+        self.options = options
+        self.next_seed = 0
+        self.soups = 0
+        self.seconds = 0.0
+        self.longest = Leaderboard("lifespan", leaderboard_size)
+        self.largest = Leaderboard("population", leaderboard_size)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as file:
+            state = json.load(file)
+
+        search = cls(state["options"], state["leaderboard_size"])
+        search.next_seed = state["next_seed"]
+        search.soups = state["soups"]
+        search.seconds = state["seconds"]
+        search.longest.entries = state["longest"]
+        search.largest.entries = state["largest"]
+        return search
+
+    def save(self, filename):
+        state = {
+            "options": self.options,
+            "leaderboard_size": self.longest.size,
+            "next_seed": self.next_seed,
+            "soups": self.soups,
+            "seconds": round(self.seconds, 3),
+            "soups_per_sec": round(self.soups_per_sec, 2),
+            "longest": self.longest.entries,
+            "largest": self.largest.entries,
+        }
+
+        # written under another name first, so an interrupted save never leaves half a checkpoint
+        temporary = f"{filename}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(state, file, indent=1)
+        os.replace(temporary, filename)
+
+    @property
+    def soups_per_sec(self):
+        return self.soups / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, results):
+        for result in results:
+            self.longest.offer(result)
+            self.largest.offer(result)
+            self.soups += 1
+            self.next_seed = max(self.next_seed, result["seed"] + 1)
+
+    def winners(self):
+        return sorted(set(self.longest.seeds()) | set(self.largest.seeds()))
+
+    def summary(self):
+        text = f"{self.soups} soups, {self.soups_per_sec:.1f} soups/sec"
+        if self.longest.entries:
+            best = self.longest.entries[0]
+            text += f", longest-lived: {best['lifespan']} generations (seed {best['seed']})"
+        if self.largest.entries:
+            best = self.largest.entries[0]
+            text += f", largest: {best['population']} cells (seed {best['seed']})"
+        return text
+
+
+def write_winners(search, folder):
+    """Every soup on a leaderboard as seed-<seed>.csv, files of soups that dropped off are removed"""
+    options = search.options
+    winners = search.winners()
+
+    for seed in winners:
+        filename = os.path.join(folder, f"seed-{seed}.csv")
+        if not os.path.exists(filename):
+            cells = make_soup(seed, options["board_size"], options["soup_size"], options["density"])
+            write_csv(filename, options["board_size"], options["board_size"], cells, parse_rule(options["rule"]))
+
+    kept = {f"seed-{seed}.csv" for seed in winners}
+    for filename in os.listdir(folder):
+        if filename.startswith("seed-") and filename.endswith(".csv") and filename not in kept:
+            os.remove(os.path.join(folder, filename))
+
+
+def run_search(search, soups, folder, workers=None, batch_size=1000, log=sys.stderr):
+    """Runs soups until search has done soups of them, checkpointing after every batch"""
+    checkpoint = os.path.join(folder, CHECKPOINT_FILENAME)
+    batched = search.options["engine_name"] == "batch"
+    run = partial(run_soup_batch if batched else run_soup, **search.options)
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        while search.soups < soups:
+            seeds = range(search.next_seed, search.next_seed + min(batch_size, soups - search.soups))
+
+            start = time.perf_counter()
+            # soups are quick, chunks keep the pool from spending more time on passing them than running them
+            chunksize = max(1, len(seeds) // (4 * workers)) if executor is not None else len(seeds)
+            if batched:  # a chunk of soups is one BatchEngine
+                chunks = [seeds[i:i + chunksize] for i in range(0, len(seeds), chunksize)]
+                chunk_results = executor.map(run, chunks) if executor is not None else map(run, chunks)
+                results = [result for chunk in chunk_results for result in chunk]
+            elif executor is None:  # no pool, easier to debug and profile
+                results = list(map(run, seeds))
+            else:
+                results = list(executor.map(run, seeds, chunksize=chunksize))
+            search.seconds += time.perf_counter() - start
+
+            search.add(results)
+            write_winners(search, folder)
+            search.save(checkpoint)
+            print(search.summary(), file=log)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Search random soups for long-lived patterns (methuselahs)")
+
+    parser.add_argument("--soups", type=int, default=10000,
+                        help="soups to search in total, a resumed search included (default: 10000)")
+    parser.add_argument("-o", "--output", default="soups",
+                        help="folder for the winners (csv layouts) and the checkpoint (default: soups)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"go on from the checkpoint in the output folder ({CHECKPOINT_FILENAME}), with its options")
+    parser.add_argument("--board-size", type=int, default=100,
+                        help="board rows and columns, winners are loaded on a board this size: the game's default "
+                             "renderer takes up to 100, bigger needs --renderer raster (default: 100)")
+    parser.add_argument("--soup-size", type=int, default=16, help="random square in the middle (default: 16)")
+    parser.add_argument("--density", type=float, default=0.5, help="share of live cells in the soup (default: 0.5)")
+    parser.add_argument("--max-generations", type=int, default=20000,
+                        help="soups that haven't settled by then are stopped (default: 20000)")
+    parser.add_argument("--max-period", type=int, default=1024, help="longest cycle looked for (default: 1024)")
+    # the striped engine starts processes of its own, which pool workers can't do
+    parser.add_argument("--engine", choices=[name for name in ENGINES if name != "striped"] + ["batch"] * bool(BatchEngine),
+                        default="sparse",
+                        help="simulation engine (default: sparse), batch: a whole chunk of soups evolved as one array "
+                             "(cycles longer than --max-period aren't noticed, use e.g. 64)")
+    parser.add_argument("--rule", type=parse_rule, default="B3/S23", help="Life-like rule (default: B3/S23)")
+    parser.add_argument("--wrap", action="store_true", help="boards loop around their edges")
+    parser.add_argument("--leaderboard", type=int, default=10, help="soups kept on each leaderboard (default: 10)")
+    parser.add_argument("--batch", type=int, default=1000, help="soups between checkpoints (default: 1000)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: cpu count)")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    if args.soup_size > args.board_size:
+        print("Soup doesn't fit on the board (--soup-size is bigger than --board-size)", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    checkpoint = os.path.join(args.output, CHECKPOINT_FILENAME)
+
+    if args.resume and os.path.exists(checkpoint):
+        search = Search.load(checkpoint)
+        print(f"Resuming: {search.summary()}", file=sys.stderr)
+    else:
+        if args.resume:
+            print(f"No checkpoint in {args.output}, starting a new search", file=sys.stderr)
+        options = {"board_size": args.board_size, "soup_size": args.soup_size, "density": args.density,
+                   "max_generations": args.max_generations, "max_period": args.max_period,
+                   "engine_name": args.engine, "rule": str(args.rule), "wrap": args.wrap}
+        search = Search(options, args.leaderboard)
+
+    try:
+        run_search(search, args.soups, args.output, workers=args.workers, batch_size=args.batch)
+    except KeyboardInterrupt:
+        print(f"Interrupted, --resume goes on from the last checkpoint ({search.soups} soups)", file=sys.stderr)
+        return 130
+
+    print(search.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
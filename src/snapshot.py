@@ -0,0 +1,193 @@
+"""
+Binary snapshots of a board, for saving and restoring big boards and long runs quickly
+
+A snapshot is a 96 byte header and a body, all little-endian:
+
+ magic "LIFESNAP", version, body type, flags (1 = wrap), rows, columns, generation, population,
+ CRC-32 of the body, rule (e.g. "B3/S23")
+
+Body types:
+ PLANE: the board bit-packed like the bitpacked engine keeps it: every row is ceil(columns / 64) uint64 words,
+        bit j of word w is cell (x, w * 64 + j). Best for busy boards, 1 bit per cell
+ RUNS:  live cells as runs along rows: uint32 (x, first y, length) triples. Best for mostly empty boards
+
+Writing goes a stripe of rows at a time, so the whole board is never in memory twice. Reading maps the file
+with mmap: a PLANE body becomes the bitpacked engine's words without being copied or parsed (pages are read
+in by the OS as they are used, and copied only when written), the dense engine unpacks it straight from
+the mapping a stripe at a time
+
+ save_snapshot("run.snap", engine)
+ header = load_snapshot("run.snap", engine)  # engine is resized, generation is restored
+"""
+
+import mmap
+import struct
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from engines.bitpacked import BitPackedEngine, WORD_BITS
+from engines.dense import DenseEngine
+
+MAGIC = b"LIFESNAP"
+VERSION = 1
+PLANE, RUNS = 0, 1
+WRAP = 1
+
+# magic, version, body type, flags, reserved, rows, columns, generation, population, checksum, rule, padding
+HEADER = struct.Struct("<8sHBBIQQQQI32s12x")
+HEADER_SIZE = HEADER.size  # 96, a multiple of 8 so the body's uint64 words are aligned
+
+STRIPE_ROWS = 1024
+
+Header = namedtuple("Header", ["body", "wrap", "rows", "columns", "generation", "population", "checksum", "rule"])
+
+
+def _stripes(engine, stripe_rows=STRIPE_ROWS):
+    """(first row, (rows, columns) uint8 array) a stripe at a time"""
+    if isinstance(engine, (BitPackedEngine, DenseEngine)):
+        for start in range(0, engine.rows, stripe_rows):
+            if isinstance(engine, BitPackedEngine):
+                yield start, engine.unpack(start, start + stripe_rows)
+            else:
+                yield start, engine.board[start:start + stripe_rows]
+    else:
+        yield 0, engine.to_array()
+
+
+def plane_chunks(engine):
+    """Bytes of the bit-packed plane (little-endian uint64 words, rows padded to whole words), a stripe at a time"""
+    if isinstance(engine, BitPackedEngine):
+        for start in range(0, engine.rows, STRIPE_ROWS):
+            yield engine.words[start:start + STRIPE_ROWS].astype("<u8", copy=False).tobytes()
+        return
+
+    word_count = -(-engine.columns // WORD_BITS)
+    for _, stripe in _stripes(engine):
+        padded = np.zeros((stripe.shape[0], word_count * WORD_BITS), dtype=np.uint8)
+        padded[:, :engine.columns] = stripe
+        yield np.packbits(padded, axis=1, bitorder="little").tobytes()
+
+
+def _runs_body(engine):
+    """Bytes of (x, first y, length) triples of live runs, a stripe at a time"""
+    for start, stripe in _stripes(engine):
+        # +1 where a run starts, -1 where it ends (rows padded with a dead cell on both sides)
+        edges = np.diff(np.pad(stripe.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        xs, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)  # row by row in the same order as starts
+        runs = np.stack([xs + start, starts, ends - starts], axis=1).astype("<u4")
+        yield runs.tobytes()
+
+
+def save_snapshot(filename, engine, body=None, rule=None):
+    """
+    Writes the engine's board and rule (unless another one is given), body is PLANE, RUNS or None to
+    pick the smaller one (runs take at most 12 bytes per live cell, the plane 1 bit per cell)
+    """
+    rule = str(engine.rule if rule is None else rule)
+    population = engine.population
+    if body is None:
+        plane_size = engine.rows * -(-engine.columns // WORD_BITS) * 8
+        body = RUNS if population * 12 < plane_size else PLANE
+
+    chunks = plane_chunks(engine) if body == PLANE else _runs_body(engine)
+
+    with open(filename, "wb") as file:
+        file.write(bytes(HEADER_SIZE))  # header is written last, when the checksum is known
+
+        checksum = 0
+        for chunk in chunks:
+            checksum = zlib.crc32(chunk, checksum)
+            file.write(chunk)
+
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, body, WRAP if engine.wrap else 0, 0,
+                               engine.rows, engine.columns, engine.generation, population,
+                               checksum, rule.encode("ascii")))
+
+
+def _header(data):
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Not a snapshot: file is too short")
+
+    magic, version, body, flags, _, rows, columns, generation, population, checksum, rule = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a snapshot: wrong magic bytes")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    if body not in (PLANE, RUNS):
+        raise ValueError(f"Unknown snapshot body type {body}")
+
+    return Header(body, bool(flags & WRAP), rows, columns, generation, population, checksum,
+                  rule.rstrip(b"\0").decode("ascii"))
+
+
+def read_header(filename):
+    with open(filename, "rb") as file:
+        return _header(file.read(HEADER_SIZE))
+
+
+def load_snapshot(filename, engine, verify=True):
+    """
+    Replaces the engine's board (and size, generation and rule) with a snapshot, returns its Header.
+    verify checks the body's CRC-32 (reads the whole file once)
+    """
+    with open(filename, "rb") as file:
+        # copy-on-write mapping: the engine may change its board without touching the file
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header = _header(data)
+    body = memoryview(data)[HEADER_SIZE:]
+    if verify and zlib.crc32(body) != header.checksum:
+        raise ValueError(f"Snapshot {filename} is corrupted (checksum mismatch)")
+
+    # the engine keeps its own wrap setting, header.wrap tells how the board was run
+    rows, columns = header.rows, header.columns
+    engine.resize(rows, columns)
+    engine.rule = header.rule or "B3/S23"
+
+    if header.body == PLANE:
+        word_count = -(-columns // WORD_BITS)
+        words = np.frombuffer(data, dtype="<u8", count=rows * word_count, offset=HEADER_SIZE)
+        words = words.reshape(rows, word_count)
+
+        if isinstance(engine, BitPackedEngine):
+            engine.load_words(words)
+        elif isinstance(engine, DenseEngine):
+            board = engine.board
+            for start in range(0, rows, STRIPE_ROWS):
+                stripe = words[start:start + STRIPE_ROWS].view(np.uint8)
+                board[start:start + STRIPE_ROWS] = np.unpackbits(stripe, axis=1, count=columns, bitorder="little")
+        else:
+            engine.load(_plane_cells(words, columns))
+    else:
+        runs = np.frombuffer(data, dtype="<u4", offset=HEADER_SIZE).reshape(-1, 3).astype(np.intp)
+        xs, ys = _run_cells(runs)
+        if isinstance(engine, DenseEngine):
+            engine.board[xs, ys] = 1
+        else:
+            engine.load(zip(xs.tolist(), ys.tolist()))
+
+    engine.generation = header.generation
+    return header
+
+
+def _plane_cells(words, columns):
+    for start in range(0, words.shape[0], STRIPE_ROWS):
+        stripe = np.unpackbits(words[start:start + STRIPE_ROWS].view(np.uint8), axis=1, count=columns,
+                               bitorder="little")
+        xs, ys = np.nonzero(stripe)
+        yield from zip((xs + start).tolist(), ys.tolist())
+
+
+def _run_cells(runs):
+    """xs and ys of every cell of (x, first y, length) runs"""
+    lengths = runs[:, 2]
+    xs = np.repeat(runs[:, 0], lengths)
+    # position within its run: 0, 1, 2, 0, 1, 0, ...
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    ys = np.repeat(runs[:, 1], lengths) + offsets
+    return xs, ys
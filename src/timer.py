@@ -1,28 +1,132 @@
 """
 timer.py
 
-Source: https://realpython.com/python-timer/
+Source: https://realpython.com/python-timer/ (grew into named spans with rolling statistics)
+
+Spans are named and can be nested ("evolve/compute" is compute inside evolve). Every span's durations go
+into a rolling histogram of its last window samples (for percentiles) and a running total (for how the time
+is split between phases). Nothing is printed, read timer.summary() or show it with overlay.py
 
 
 
  ---- Usage ----
 
  t = Timer()
- t.start()
+ with t.span("evolve"):
+     with t.span("compute"):
+         ... <code>
+     with t.span("render"):
+         ... <code>
+ t.summary()  # {"evolve": {...}, "evolve/compute": {"count": 1, "mean_ms": ..., "p99_ms": ...}, ...}
+
+ t.start()  # the old way, same as a span named "timer"
  ... <code>
- t.stop()
- 
+ t.stop()   # returns elapsed seconds
+
  """
 
 import time
+from array import array
+
 
 class TimerError(Exception):
     """A custom exception used to report errors in use of Timer class"""
 
+
+class Histogram:
+    """Last size samples (seconds) in a ring buffer, percentiles are only computed when asked for"""
+    __slots__ = ("samples", "size", "position", "count", "total")
+
+    def __init__(self, size=512):
+        self.samples = array("d")
+        self.size = size
+        self.position = 0
+        self.count = 0  # all time
+        self.total = 0.0  # all time, seconds
+
+    def add(self, seconds):
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        else:
+            self.samples[self.position] = seconds
+            self.position = (self.position + 1) % self.size
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        """Count and total of all time, mean and percentiles (milliseconds) of the samples in the window"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": 0}
+
+        def ms(seconds):
+            return round(seconds * 1000, 3)
+
+        def percentile(q):
+            return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+        return {
+            "count": self.count,
+            "total_ms": ms(self.total),
+            "mean_ms": ms(sum(ordered) / len(ordered)),
+            "p50_ms": ms(percentile(50)),
+            "p90_ms": ms(percentile(90)),
+            "p99_ms": ms(percentile(99)),
+            "max_ms": ms(ordered[-1]),
+        }
+
+
+class Span:
+    """Context manager timing one run of a named span"""
+    __slots__ = ("timer", "name", "_start", "_path")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        stack = self.timer._stack
+        self._path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self._path)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        timer = self.timer
+        timer._stack.pop()
+        timer.record(self._path, elapsed)
+        return False
+
+
 class Timer:
-    def __init__(self):
+    def __init__(self, window=512, enabled=True):
+        self.window = window
+        self.enabled = enabled  # when False, spans cost next to nothing and nothing is recorded
+
+        self.histograms = dict()  # span path -> Histogram
+        self._stack = []  # paths of spans that are running
         self._start_time = None
 
+    def span(self, name):
+        return Span(self, name) if self.enabled else _NO_SPAN
+
+    def record(self, path, seconds):
+        histogram = self.histograms.get(path)
+        if histogram is None:
+            histogram = self.histograms[path] = Histogram(self.window)
+        histogram.add(seconds)
+
+    def totals(self):
+        """Span path -> all time total seconds (compare two of these to see where the time went in between)"""
+        return {path: histogram.total for path, histogram in self.histograms.items()}
+
+    def summary(self):
+        return {path: histogram.summary() for path, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        self.histograms.clear()
+
     def start(self):
         """Start a new timer"""
         if self._start_time is not None:
@@ -31,10 +135,26 @@ class Timer:
         self._start_time = time.perf_counter()
 
     def stop(self):
-        """Stop the timer, and report the elapsed time"""
+        """Stop the timer, record and return the elapsed time"""
         if self._start_time is None:
             raise TimerError(f"Timer is not running. Use .start() to start it")
 
         elapsed_time = time.perf_counter() - self._start_time
         self._start_time = None
-        print(f"Elapsed time: {elapsed_time:0.4f} seconds")
\ No newline at end of file
+        if self.enabled:
+            self.record("timer", elapsed_time)
+        #print(f"Elapsed time: {elapsed_time:0.4f} seconds")
+        return elapsed_time
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()